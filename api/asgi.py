@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+The live update stream (brolympics/live/<uuid>) only streams when served from here,
+e.g. gunicorn api.asgi:application -k uvicorn.workers.UvicornWorker
 """
 
 import os
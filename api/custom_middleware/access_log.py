@@ -0,0 +1,169 @@
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from threading import Lock
+from time import perf_counter
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('api.access')
+
+REDACTED = '[redacted]'
+
+
+## Writer ##
+class DeferredQueueHandler(QueueHandler):
+    # The record stays a dict until the listener thread formats it, off the request path
+    def prepare(self, record):
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg, separators=(',', ':'), default=str)
+
+
+_listener = None
+_listener_lock = Lock()
+
+def start_listener():
+    '''
+    Access lines go through an in-memory queue to a background thread that does the
+    formatting and the blocking write, so requests never wait on stdout.
+    '''
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JsonFormatter())
+
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(DeferredQueueHandler(log_queue))
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+        _listener = QueueListener(log_queue, stream_handler)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def emit(entry):
+    logger.info(entry)
+
+
+## Query counting ##
+_query_count = ContextVar('access_log_query_count', default=None)
+
+def count_query(execute, sql, params, many, context):
+    # A list so increments from sync_to_async threads land on the request's counter
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(connection, **kwargs):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+## Middleware ##
+class AccessLogMiddleware:
+    '''
+    One JSON line per sampled request: method, route, status, duration, DB queries
+    and response bytes. Errors and slow requests are always logged, and only the
+    headers listed in ACCESS_LOG_HEADERS are included, with credentials redacted.
+    Works in both the WSGI and ASGI handlers.
+    '''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.ACCESS_LOG_ENABLED:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+        self.sample_rate = settings.ACCESS_LOG_SAMPLE_RATE
+        self.slow_ms = settings.ACCESS_LOG_SLOW_MS
+        self.headers = [header.lower() for header in settings.ACCESS_LOG_HEADERS]
+        self.redact_headers = {header.lower() for header in settings.ACCESS_LOG_REDACT_HEADERS}
+
+        connection_created.connect(install_query_counter)
+        for connection in connections.all(initialized_only=True):
+            install_query_counter(connection)
+        start_listener()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        token = _query_count.set([0])
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+            self.log(request, response, start)
+            return response
+        finally:
+            _query_count.reset(token)
+
+    async def __acall__(self, request):
+        token = _query_count.set([0])
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+            self.log(request, response, start)
+            return response
+        finally:
+            _query_count.reset(token)
+
+    def is_sampled(self, status_code, duration_ms):
+        if status_code >= 500 or duration_ms >= self.slow_ms:
+            return True
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def get_headers(self, request):
+        headers = {}
+        for header in self.headers:
+            value = request.headers.get(header)
+            if value is not None:
+                headers[header] = REDACTED if header in self.redact_headers else value
+        return headers
+
+    def get_n_bytes(self, response):
+        if response.streaming:
+            return None
+        return len(response.content)
+
+    def log(self, request, response, start):
+        duration_ms = (perf_counter() - start) * 1000
+        if not self.is_sampled(response.status_code, duration_ms):
+            return
+
+        match = request.resolver_match
+        entry = {
+            'method': request.method,
+            'route': match.view_name if match else None,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 2),
+            'queries': _query_count.get()[0],
+            'bytes': self.get_n_bytes(response),
+        }
+        if self.headers:
+            entry['headers'] = self.get_headers(request)
+        emit(entry)
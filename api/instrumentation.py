@@ -0,0 +1,256 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from rest_framework.serializers import BaseSerializer
+
+PHASES = ('db', 'serialize', 'firebase', 'storage')
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+## Per request timings ##
+class RequestTimings:
+    def __init__(self):
+        self._lock = Lock()
+        self.durations = {}
+        self.counts = {}
+        self.active = set()
+
+    def add(self, phase, seconds):
+        with self._lock:
+            self.durations[phase] = self.durations.get(phase, 0) + seconds
+            self.counts[phase] = self.counts.get(phase, 0) + 1
+
+    def server_timing(self, total):
+        entries = []
+        for phase in PHASES:
+            if phase not in self.durations:
+                continue
+            entry = f'{phase};dur={self.durations[phase] * 1000:.1f}'
+            if phase == 'db':
+                entry += f';desc="{self.counts[phase]} queries"'
+            entries.append(entry)
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+
+_timings = ContextVar('request_timings', default=None)
+
+
+@contextmanager
+def timed(phase):
+    '''
+    Adds the time spent in the block to the current request's phase. Nested blocks of
+    the same phase only count once, and outside a request this does nothing.
+    Usable as a decorator too.
+    '''
+    timings = _timings.get()
+    if timings is None or phase in timings.active:
+        yield
+        return
+
+    timings.active.add(phase)
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timings.active.discard(phase)
+        timings.add(phase, perf_counter() - start)
+
+
+def time_query(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', perf_counter() - start)
+
+
+def install_query_timer(connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def instrument_serializers():
+    # Views build serializers all over the place, timing .data catches every one of them
+    data = BaseSerializer.data
+    if getattr(data.fget, 'instrumented', False):
+        return
+
+    def timed_data(self):
+        with timed('serialize'):
+            return data.fget(self)
+
+    timed_data.instrumented = True
+    BaseSerializer.data = property(timed_data)
+
+
+## Aggregates ##
+def format_labels(labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels)
+
+
+class Histogram:
+    def __init__(self, name, description, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = {'buckets': [0] * len(self.buckets), 'sum': 0, 'count': 0}
+
+        # Stored per bucket, made cumulative when rendered
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series['buckets'][index] += 1
+        series['sum'] += value
+        series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        for key, series in sorted(self.series.items()):
+            labels = format_labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['buckets']):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series["count"]}')
+            lines.append(f'{self.name}_sum{{{labels}}} {series["sum"]}')
+            lines.append(f'{self.name}_count{{{labels}}} {series["count"]}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.series = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        self.series[key] = self.series.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} counter']
+        for key, value in sorted(self.series.items()):
+            lines.append(f'{self.name}{{{format_labels(key)}}} {value}')
+        return lines
+
+
+class Metrics:
+    '''
+    In-process aggregates per URL name. Each worker process keeps its own, so scrape
+    every worker or read them as per-instance numbers.
+    '''
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._lock = Lock()
+        self.buckets = buckets
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter('brolympics_requests_total', 'Requests by route and status class.')
+            self.queries = Counter('brolympics_db_queries_total', 'Database queries by route.')
+            self.latency = Histogram('brolympics_request_duration_seconds', 'Total request latency by route.', self.buckets)
+            self.phases = Histogram('brolympics_request_phase_seconds', 'Time per request spent in db, serialize, firebase and storage.', self.buckets)
+
+    def record(self, route, status_code, total, timings):
+        with self._lock:
+            self.requests.inc(route=route, status=f'{status_code // 100}xx')
+            self.queries.inc(timings.counts.get('db', 0), route=route)
+            self.latency.observe(total, route=route)
+            for phase, seconds in timings.durations.items():
+                self.phases.observe(seconds, route=route, phase=phase)
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for metric in [self.requests, self.queries, self.latency, self.phases]:
+                lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+## Middleware ##
+class InstrumentationMiddleware:
+    '''
+    Times every request, the DB queries, serializers and Firebase calls inside it, adds a
+    Server-Timing header and feeds the per route aggregates served at /api/metrics.
+    '''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+        connection_created.connect(install_query_timer)
+        for connection in connections.all(initialized_only=True):
+            install_query_timer(connection)
+        instrument_serializers()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        return self.finish(request, response, timings, perf_counter() - start)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timings.reset(token)
+        return self.finish(request, response, timings, perf_counter() - start)
+
+    def finish(self, request, response, timings, total):
+        match = request.resolver_match
+        # Unmatched paths share one label so scanners can't blow up the series count
+        route = match.view_name if match else 'unmatched'
+
+        metrics.record(route, response.status_code, total, timings)
+        response['Server-Timing'] = timings.server_timing(total)
+        return response
+
+
+## Endpoint ##
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    if not token or not constant_time_compare(auth_header, f'Bearer {token}'):
+        return HttpResponseForbidden()
+
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,11 +1,15 @@
 from pathlib import Path
 import sys
-import firebase_admin
 import os
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 sys.path.insert(0, str(BASE_DIR / 'apps'))
 
+# Exported so processes started by the tests, like benchmark_cold_start and profile_startup, use the test database too
+RUNNING_TESTS = 'test' in sys.argv or 'test_coverage' in sys.argv or os.environ.get('DJANGO_RUNNING_TESTS') == 'True'
+if RUNNING_TESTS:
+    os.environ['DJANGO_RUNNING_TESTS'] = 'True'
+
 AUTH_USER_MODEL = 'authentication.FirebaseUser'
 DEFAULT_AUTHENTICATION_CLASSES='authentication.'
 
@@ -20,7 +24,6 @@ INSTALLED_APPS = [
     # Libs
     'rest_framework',
     'corsheaders',
-    'firebase_admin',
 
     # Apps
     'apps.authentication.apps.AuthenticationConfig',
@@ -28,7 +31,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'api.custom_middleware.loggers.RequestLoggingMiddleware',
+    'api.instrumentation.InstrumentationMiddleware',
+    'api.custom_middleware.access_log.AccessLogMiddleware',
     'api.custom_middleware.loggers.RedirectLoggingMiddleware',
 
     'django.middleware.security.SecurityMiddleware',
@@ -86,8 +90,60 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 DEFAULT_FILE_STORAGE = "storages.backend.firebase.FirebaseStorage"
 
+REDIS_URL = os.environ.get('REDIS_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+if REDIS_URL:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+
+# Firebase token/user caching
+FIREBASE_TOKEN_CACHE_ALIAS = 'default'
+FIREBASE_REVOCATION_CHECK_SECONDS = int(os.environ.get('FIREBASE_REVOCATION_CHECK_SECONDS', 300))
+FIREBASE_USER_CACHE_SIZE = int(os.environ.get('FIREBASE_USER_CACHE_SIZE', 1024))
+FIREBASE_USER_CACHE_SECONDS = int(os.environ.get('FIREBASE_USER_CACHE_SECONDS', 60))
+
+# Team count behind the points tables, dropped on roster changes
+ROSTER_SIZE_CACHE_SECONDS = int(os.environ.get('ROSTER_SIZE_CACHE_SECONDS', 300))
+
+# Image pipeline, set IMAGE_PIPELINE_SYNC to process uploads inside the request
+IMAGE_PIPELINE_SYNC = os.environ.get('IMAGE_PIPELINE_SYNC', 'False') == 'True'
+IMAGE_PIPELINE_WORKERS = int(os.environ.get('IMAGE_PIPELINE_WORKERS', 2))
+# process_image_uploads retries failed uploads, and ones processing this long are taken as dead
+IMAGE_PIPELINE_MAX_ATTEMPTS = int(os.environ.get('IMAGE_PIPELINE_MAX_ATTEMPTS', 3))
+IMAGE_PIPELINE_STALE_SECONDS = int(os.environ.get('IMAGE_PIPELINE_STALE_SECONDS', 600))
+
+# Live update stream, only streams when served through api.asgi
+LIVE_UPDATES_BROKER = 'apps.brolympics.live.RedisBroker' if REDIS_URL else 'apps.brolympics.live.InMemoryBroker'
+LIVE_UPDATES_QUEUE_SIZE = int(os.environ.get('LIVE_UPDATES_QUEUE_SIZE', 100))
+LIVE_UPDATES_HEARTBEAT_SECONDS = int(os.environ.get('LIVE_UPDATES_HEARTBEAT_SECONDS', 15))
+LIVE_UPDATES_RETRY_MS = 5000
+# Streams end after this and the client reconnects, a closed tab is never noticed otherwise
+LIVE_UPDATES_MAX_SECONDS = int(os.environ.get('LIVE_UPDATES_MAX_SECONDS', 300))
+
+# Access log, one JSON line per sampled request. Errors and slow requests are always logged
+ACCESS_LOG_ENABLED = os.environ.get('ACCESS_LOG_ENABLED', 'True') == 'True' and not RUNNING_TESTS
+ACCESS_LOG_SAMPLE_RATE = float(os.environ.get('ACCESS_LOG_SAMPLE_RATE', 1.0))
+ACCESS_LOG_SLOW_MS = int(os.environ.get('ACCESS_LOG_SLOW_MS', 1000))
+ACCESS_LOG_HEADERS = ['user-agent', 'referer', 'content-type', 'content-length', 'authorization']
+ACCESS_LOG_REDACT_HEADERS = ['authorization', 'cookie', 'x-csrftoken']
+
+# Server-Timing headers and /api/metrics, scraped with Authorization: Bearer METRICS_TOKEN
+INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', 'True') == 'True' and not RUNNING_TESTS
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Boot import budget for manage.py profile_startup, these modules are only imported where they're used
+STARTUP_IMPORT_BUDGET_MS = int(os.environ.get('STARTUP_IMPORT_BUDGET_MS', 1500))
+STARTUP_LAZY_MODULES = ['PIL', 'ckeditor', 'firebase_admin', 'google.cloud', 'grpc']
+
 # Placeholders for env specific values
 SECRET_KEY = None
 FIREBASE_STORAGE_BUCKET = None
-FIREBASE_CREDENTIALS_PATH = None
+FIREBASE_CREDENTIALS = None
 
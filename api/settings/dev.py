@@ -12,7 +12,7 @@ DEBUG = True
 ALLOWED_HOSTS = ['localhost', '127.0.0.1']
 SECRET_KEY = SECRET_KEY
 
-if 'test' in sys.argv or 'test_coverage' in sys.argv:  # Identifies when we're running tests
+if RUNNING_TESTS:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
@@ -71,10 +71,7 @@ CSRF_TRUSTED_ORIGINS = [
 
 
 
-# Firebase initialization for development
-FIREBASE_CREDENTIALS_PATH = BASE_DIR / '.serviceAccountKey.json'
-if not firebase_admin._apps:
-    cred = firebase_admin.credentials.Certificate(FIREBASE_CREDENTIALS_PATH)
-    firebase_admin.initialize_app(cred)
+# Firebase credentials for development, the app is created on first use
+FIREBASE_CREDENTIALS = str(BASE_DIR / '.serviceAccountKey.json')
 
 
@@ -1,24 +1,31 @@
 import os
 import json
 import logging
-from firebase_admin import credentials
 from urllib.parse import urlparse
-from google.cloud import secretmanager
 
 from .base import *
+from .secret_loader import SecretLoader
 
 GOOGLE_CLOUD_PROJECT = os.environ.get('GOOGLE_CLOUD_PROJECT')
-def access_secret_version(secret_id, version_id="latest"):
-    client = secretmanager.SecretManagerServiceClient()
-    project_id = GOOGLE_CLOUD_PROJECT
-    if not project_id:
-        raise ValueError("GOOGLE_CLOUD_PROJECT environment variable is not set")
-    name = f"projects/{project_id}/secrets/{secret_id}/versions/{version_id}"
-    response = client.access_secret_version(request={"name": name})
-    return response.payload.data.decode("UTF-8")
+
+# Every secret in one concurrent batch, SECRET_<ID> env vars or SECRETS_CACHE_FILE skip the round trips
+SECRET_IDS = [
+    'django_secret_key',
+    'api-cloudrun-service-url',
+    'firebase_storage_bucket',
+    'firebase_service_account',
+]
+if not RUNNING_TESTS:
+    SECRET_IDS += ['db_name', 'db_user', 'db_password', 'db_host']
+
+secrets = SecretLoader(
+    GOOGLE_CLOUD_PROJECT,
+    cache_path=os.environ.get('SECRETS_CACHE_FILE'),
+    write_cache=os.environ.get('SECRETS_CACHE_WRITE', 'False') == 'True',
+).load(*SECRET_IDS)
 
 ENV_TYPE = "PROD"
-SECRET_KEY = access_secret_version("django_secret_key")
+SECRET_KEY = secrets["django_secret_key"]
 DEBUG = False
 
 if "api" not in INSTALLED_APPS:
@@ -28,7 +35,7 @@ ALLOWED_HOSTS = [
     "brolympics-api-708202517048.us-east5.run.app",
 ]
 
-CLOUDRUN_SERVICE_URL = access_secret_version("api-cloudrun-service-url")
+CLOUDRUN_SERVICE_URL = secrets["api-cloudrun-service-url"]
 if CLOUDRUN_SERVICE_URL:
     ALLOWED_HOSTS.append(urlparse(CLOUDRUN_SERVICE_URL).netloc)
     SECURE_SSL_REDIRECT = False
@@ -37,7 +44,7 @@ else:
     raise ValueError("Must have cloudrun service url.")
 
 
-if 'test' in sys.argv or 'test_coverage' in sys.argv:
+if RUNNING_TESTS:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
@@ -48,10 +55,10 @@ else:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.postgresql',
-            'NAME': access_secret_version('db_name'),
-            'USER': access_secret_version('db_user'),
-            'PASSWORD': access_secret_version('db_password'),
-            'HOST': access_secret_version('db_host'),
+            'NAME': secrets['db_name'],
+            'USER': secrets['db_user'],
+            'PASSWORD': secrets['db_password'],
+            'HOST': secrets['db_host'],
         }
     }
 
@@ -70,11 +77,9 @@ CORS_ALLOWED_ORIGINS = [
 CORS_ALLOW_CREDENTIALS = True
 CORS_TRUSTED_ORIGINS = CORS_ALLOWED_ORIGINS
 
-FIREBASE_STORAGE_BUCKET = access_secret_version("firebase_storage_bucket")
-if not firebase_admin._apps:
-    firebase_credentials = json.loads(access_secret_version("firebase_service_account"))
-    cred = credentials.Certificate(firebase_credentials)
-    firebase_admin.initialize_app(cred, {'storageBucket': FIREBASE_STORAGE_BUCKET})
+# The Firebase app itself is created on first use, see apps.firebase_app
+FIREBASE_STORAGE_BUCKET = secrets["firebase_storage_bucket"]
+FIREBASE_CREDENTIALS = json.loads(secrets["firebase_service_account"])
 
 
 print(CLOUDRUN_SERVICE_URL)
@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+
+
+class SecretLoader:
+    '''
+    Resolves many secrets in one step at settings import. Each secret comes from the
+    SECRET_<ID> env var first, then the local JSON cache file, and whatever is left is
+    fetched from Secret Manager concurrently through one shared client.
+    '''
+    env_prefix = 'SECRET_'
+
+    def __init__(self, project_id, cache_path=None, write_cache=False, client=None):
+        self.project_id = project_id
+        self.cache_path = cache_path
+        self.write_cache = write_cache
+        self._client = client
+
+    @property
+    def client(self):
+        # Imported here so a fully cached start never loads the grpc stack
+        if self._client is None:
+            from google.cloud import secretmanager
+            self._client = secretmanager.SecretManagerServiceClient()
+        return self._client
+
+    def get_env_name(self, secret_id):
+        return self.env_prefix + secret_id.upper().replace('-', '_')
+
+    def read_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        with open(self.cache_path) as f:
+            return json.load(f)
+
+    def save_cache(self, values):
+        cached = self.read_cache()
+        cached.update(values)
+
+        fd = os.open(self.cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(cached, f)
+
+    def fetch(self, secret_id, version_id='latest'):
+        if not self.project_id:
+            raise ValueError("GOOGLE_CLOUD_PROJECT environment variable is not set")
+        name = f"projects/{self.project_id}/secrets/{secret_id}/versions/{version_id}"
+        response = self.client.access_secret_version(request={"name": name})
+        return response.payload.data.decode("UTF-8")
+
+    def load(self, *secret_ids):
+        values = {}
+        for secret_id in secret_ids:
+            value = os.environ.get(self.get_env_name(secret_id))
+            if value is not None:
+                values[secret_id] = value
+
+        cached = self.read_cache()
+        for secret_id in secret_ids:
+            if secret_id not in values and secret_id in cached:
+                values[secret_id] = cached[secret_id]
+
+        missing = [secret_id for secret_id in secret_ids if secret_id not in values]
+        if missing:
+            self.client  # Created before the threads start so they all share one
+            with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+                fetched = dict(zip(missing, executor.map(self.fetch, missing)))
+            values.update(fetched)
+
+            if self.write_cache and self.cache_path:
+                self.save_cache(fetched)
+
+        return values
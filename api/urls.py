@@ -19,13 +19,15 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from api.csrf import set_csrf_token
+from api.instrumentation import metrics_view
 
 
 urlpatterns = [
     path('api/admin/', admin.site.urls),
     path('api/auth/', include('apps.authentication.urls')),
     path('api/brolympics/', include('apps.brolympics.urls')),
-    path('api/set-csrf-token/', set_csrf_token)
+    path('api/set-csrf-token/', set_csrf_token),
+    path('api/metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -1,8 +1,9 @@
-from firebase_admin import auth, storage
 from rest_framework import authentication, exceptions
 from django.contrib.auth import get_user_model
 from django.db import IntegrityError
 
+from apps.authentication.token_cache import token_cache, user_cache
+
 
 User = get_user_model()
 
@@ -16,12 +17,17 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
 
         id_token = auth_header.split(" ").pop()
         try:
-            decoded_token = auth.verify_id_token(id_token, check_revoked=True, clock_skew_seconds=60)
+            decoded_token = token_cache.verify_id_token(id_token)
             uid = decoded_token["uid"]
         except Exception as e:
             print(f"Token verification failed: {str(e)}")
             raise exceptions.AuthenticationFailed("Invalid Token")
         
+        user = user_cache.get(uid)
+        if user is not None:
+            return user, id_token
+
+        version = user_cache.get_version(uid)
         try:
             user, created = User.objects.get_or_create(uid=uid)
             if created:
@@ -40,6 +46,7 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
         except IntegrityError:
             raise exceptions.AuthenticationFailed("User with this UID already exists")
 
+        user_cache.set(uid, user, version)
         return user, id_token
 
 
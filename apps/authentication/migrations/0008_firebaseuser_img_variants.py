@@ -0,0 +1,18 @@
+# Generated by Django 4.2.2 on 2026-10-18 06:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0007_alter_firebaseuser_img'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='firebaseuser',
+            name='img_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
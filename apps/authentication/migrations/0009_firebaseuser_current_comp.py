@@ -0,0 +1,23 @@
+# Generated by Django 4.2.2 on 2026-10-18 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0008_firebaseuser_img_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='firebaseuser',
+            name='current_comp_type',
+            field=models.CharField(blank=True, max_length=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='firebaseuser',
+            name='current_comp_uuid',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+    ]
@@ -32,8 +32,12 @@ class FirebaseUser(AbstractBaseUser, PermissionsMixin):
     last_name = models.CharField(max_length=60, null=True, blank=True)
     display_name = models.CharField(max_length=100, null=False, blank=False)
     img = models.ImageField(storage=FirebaseStorage(), null=True)
+    img_variants = models.JSONField(default=dict, blank=True)
 
     is_available = models.BooleanField(default=True)
+    # Set by Team.start_comp/end_comp so "am I in a competition" never needs a query
+    current_comp_type = models.CharField(max_length=8, null=True, blank=True)
+    current_comp_uuid = models.UUIDField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
@@ -1,12 +1,21 @@
 from rest_framework import serializers
 from authentication.models import FirebaseUser
+from apps.image_pipeline import ImageVariantsField
 
 class UserSerializer(serializers.ModelSerializer):
     account_complete = serializers.SerializerMethodField()
     img = serializers.ImageField(read_only=True)
+    img_variants = ImageVariantsField()
     class Meta:
         model = FirebaseUser
-        fields = ['uid', 'email', 'phone', 'first_name', 'last_name', 'display_name', 'img', 'is_available', 'date_joined', 'account_complete', 'provider']
+        fields = ['uid', 'email', 'phone', 'first_name', 'last_name', 'display_name', 'img', 'img_variants', 'is_available', 'date_joined', 'account_complete', 'provider']
 
     def get_account_complete(self, obj):
-        return bool(obj.display_name and obj.first_name and obj.last_name)
\ No newline at end of file
+        return bool(obj.display_name and obj.first_name and obj.last_name)
+
+    def update(self, instance, validated_data):
+        # Only the fields sent, so competition state written by another request survives
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
@@ -1,3 +1,178 @@
 from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework import exceptions
+from unittest.mock import patch, Mock
+from uuid import uuid4
+import time
+
+from apps.authentication.firebase import FirebaseAuthentication
+from apps.authentication.token_cache import TokenCache, UserCache, user_cache, stats
+
+User = get_user_model()
 
 # Create your tests here.
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        stats.reset()
+        self.claims = {'uid': '1', 'exp': time.time() + 3600}
+        self.verify = Mock(return_value=self.claims)
+        self.token_cache = TokenCache(alias='default', revocation_check_seconds=300, verify=self.verify)
+
+    def test_verify_id_token_cached(self):
+        self.assertEqual(self.token_cache.verify_id_token('token'), self.claims)
+        self.assertEqual(self.token_cache.verify_id_token('token'), self.claims)
+
+        self.verify.assert_called_once_with('token', check_revoked=True, clock_skew_seconds=60)
+        self.assertEqual(stats.snapshot(), {'token_miss': 1, 'token_hit': 1})
+
+    def test_key_is_hashed(self):
+        key = self.token_cache.make_key('token')
+        self.assertNotIn('token', key.split(':')[-1])
+        self.assertEqual(key, self.token_cache.make_key('token'))
+        self.assertNotEqual(key, self.token_cache.make_key('other token'))
+
+    def test_revocation_recheck(self):
+        self.token_cache.revocation_check_seconds = 0
+
+        self.token_cache.verify_id_token('token')
+        self.token_cache.verify_id_token('token')
+
+        self.assertEqual(self.verify.call_count, 2)
+        self.assertEqual(stats.snapshot(), {'token_miss': 1, 'token_revocation_check': 1})
+
+    def test_revoked_token_is_dropped(self):
+        self.token_cache.revocation_check_seconds = 0
+        self.token_cache.verify_id_token('token')
+
+        self.verify.side_effect = ValueError('revoked')
+        with self.assertRaises(ValueError):
+            self.token_cache.verify_id_token('token')
+
+        self.assertIsNone(cache.get(self.token_cache.make_key('token')))
+
+    def test_expired_token_not_cached(self):
+        self.verify.return_value = {'uid': '1', 'exp': time.time() - 10}
+
+        self.token_cache.verify_id_token('token')
+        self.token_cache.verify_id_token('token')
+
+        self.assertEqual(self.verify.call_count, 2)
+
+
+class UserCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        stats.reset()
+        self.user = User.objects.create_user(uid="1", display_name='John Doe')
+        self.user_2 = User.objects.create_user(uid="2", display_name='Jane Doe', email='jane@test.com')
+        self.user_cache = UserCache(max_size=1, ttl_seconds=60)
+
+    def test_get_returns_copy(self):
+        self.user_cache.set('1', self.user)
+        cached_user = self.user_cache.get('1')
+
+        self.assertEqual(cached_user, self.user)
+        self.assertIsNot(cached_user, self.user)
+
+        cached_user.is_available = False
+        self.assertTrue(self.user_cache.get('1').is_available)
+        self.assertEqual(stats.snapshot(), {'user_hit': 2})
+
+    def test_lru_eviction(self):
+        self.user_cache.set('1', self.user)
+        self.user_cache.set('2', self.user_2)
+
+        self.assertIsNone(self.user_cache.get('1'))
+        self.assertEqual(self.user_cache.get('2'), self.user_2)
+        self.assertEqual(len(self.user_cache), 1)
+
+    def test_ttl(self):
+        self.user_cache = UserCache(max_size=1, ttl_seconds=-1)
+        self.user_cache.set('1', self.user)
+        self.assertIsNone(self.user_cache.get('1'))
+
+    def test_save_evicts(self):
+        user_cache.set('1', self.user)
+        self.user.display_name = 'Johnny'
+        self.user.save()
+
+        self.assertIsNone(user_cache.get('1'))
+
+    def test_save_in_other_process_evicts(self):
+        # Another worker's cache, sharing only the cache backend
+        other_cache = UserCache(max_size=1, ttl_seconds=60)
+        other_cache.set('1', self.user, other_cache.get_version('1'))
+        self.assertEqual(other_cache.get('1'), self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        self.assertIsNone(other_cache.get('1'))
+
+    def test_version_read_before_load(self):
+        version = self.user_cache.get_version('1')
+        self.user_cache.bump_version('1')
+        self.user_cache.set('1', self.user, version)
+
+        self.assertIsNone(self.user_cache.get('1'))
+
+
+class UserViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.user = User.objects.create_user(uid="1", display_name='John Doe')
+        self.client = APIClient()
+
+    def test_put_keeps_competition_state(self):
+        # The authenticated user is a copy cached before the competition started elsewhere
+        cached_user = User.objects.get(pk=self.user.pk)
+        User.objects.filter(pk=self.user.pk).update(is_available=False, current_comp_uuid=uuid4())
+        self.client.force_authenticate(user=cached_user)
+
+        response = self.client.put(reverse('user_api'), {'display_name': 'Johnny'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['is_available'])
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.display_name, 'Johnny')
+        self.assertFalse(self.user.is_available)
+        self.assertIsNotNone(self.user.current_comp_uuid)
+
+
+class FirebaseAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.factory = APIRequestFactory()
+        self.authentication = FirebaseAuthentication()
+        self.claims = {'uid': '1', 'exp': time.time() + 3600, 'name': 'John Doe', 'email': 'jon_doe@test.com'}
+
+    def get_request(self):
+        return self.factory.get('/', HTTP_AUTHORIZATION='Bearer token')
+
+    @patch('firebase_admin.auth.verify_id_token')
+    def test_authenticate_hot_path(self, mock_verify):
+        mock_verify.return_value = self.claims
+
+        user, token = self.authentication.authenticate(self.get_request())
+        self.assertEqual(user.uid, '1')
+        self.assertEqual(user.display_name, 'John Doe')
+        self.assertEqual(token, 'token')
+
+        with self.assertNumQueries(0):
+            user, _ = self.authentication.authenticate(self.get_request())
+
+        self.assertEqual(user.uid, '1')
+        mock_verify.assert_called_once()
+
+    @patch('firebase_admin.auth.verify_id_token')
+    def test_authenticate_invalid_token(self, mock_verify):
+        mock_verify.side_effect = ValueError('bad token')
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authentication.authenticate(self.get_request())
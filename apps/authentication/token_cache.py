@@ -0,0 +1,195 @@
+from __future__ import annotations
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+from uuid import uuid4
+import copy
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from api.instrumentation import timed
+from apps.firebase_app import get_app
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = Lock()
+        self.counts = {}
+
+    def incr(self, name):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def reset(self):
+        with self._lock:
+            self.counts = {}
+
+
+stats = CacheStats()
+
+
+class TokenCache:
+    '''
+    Caches decoded Firebase ID tokens by a hash of the token. Entries never outlive the
+    token's exp, and revocation is re-checked with Firebase once every
+    FIREBASE_REVOCATION_CHECK_SECONDS instead of on every request.
+    '''
+    key_prefix = 'firebase-token'
+
+    def __init__(self, alias=None, revocation_check_seconds=None, verify=None):
+        self.alias = alias
+        self.revocation_check_seconds = revocation_check_seconds
+        self.verify = verify
+
+    @property
+    def cache(self):
+        return caches[self.alias or settings.FIREBASE_TOKEN_CACHE_ALIAS]
+
+    def get_revocation_check_seconds(self):
+        if self.revocation_check_seconds is not None:
+            return self.revocation_check_seconds
+        return settings.FIREBASE_REVOCATION_CHECK_SECONDS
+
+    def make_key(self, id_token):
+        return f'{self.key_prefix}:{sha256(id_token.encode()).hexdigest()}'
+
+    def verify_id_token(self, id_token):
+        key = self.make_key(id_token)
+        now = time.time()
+        entry = self.cache.get(key)
+
+        if entry is not None and entry['claims']['exp'] > now:
+            if now - entry['revocation_checked_at'] < self.get_revocation_check_seconds():
+                stats.incr('token_hit')
+                return entry['claims']
+            stats.incr('token_revocation_check')
+        else:
+            stats.incr('token_miss')
+
+        try:
+            verify = self.verify or self.verify_with_firebase
+            with timed('firebase'):
+                claims = verify(id_token, check_revoked=True, clock_skew_seconds=60)
+        except Exception:
+            self.cache.delete(key)
+            raise
+
+        timeout = int(claims['exp'] - now)
+        if timeout > 0:
+            self.cache.set(key, {'claims': claims, 'revocation_checked_at': now}, timeout)
+        return claims
+
+    def verify_with_firebase(self, id_token, **kwargs):
+        from firebase_admin import auth
+        return auth.verify_id_token(id_token, app=get_app(), **kwargs)
+
+    def invalidate(self, id_token):
+        self.cache.delete(self.make_key(id_token))
+
+
+class UserCache:
+    '''
+    In-process LRU of uid -> user rows. Every get returns a copy so a request can
+    never mutate another request's user.
+
+    Each entry remembers the uid's version from the shared cache when it was loaded,
+    and saves/deletes bump that version on commit. A get that finds a different version
+    is a miss, so a save in another worker or instance evicts the row here too.
+    '''
+    key_prefix = 'firebase-user-version'
+
+    def __init__(self, max_size=None, ttl_seconds=None, alias=None):
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self.alias = alias
+        self._users = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def max_size(self):
+        return self._max_size if self._max_size is not None else settings.FIREBASE_USER_CACHE_SIZE
+
+    @property
+    def ttl_seconds(self):
+        return self._ttl_seconds if self._ttl_seconds is not None else settings.FIREBASE_USER_CACHE_SECONDS
+
+    @property
+    def cache(self):
+        return caches[self.alias or settings.FIREBASE_TOKEN_CACHE_ALIAS]
+
+    def make_key(self, uid):
+        return f'{self.key_prefix}:{uid}'
+
+    def get_version(self, uid):
+        return self.cache.get(self.make_key(uid))
+
+    def bump_version(self, uid):
+        # Outlives every entry loaded under the old version, so an expired key can't match one again
+        self.cache.set(self.make_key(uid), uuid4().hex, max(self.ttl_seconds, 0) * 2 + 1)
+
+    def get(self, uid):
+        with self._lock:
+            entry = self._users.get(uid)
+        if entry is not None and entry[1] >= time.monotonic() and entry[2] == self.get_version(uid):
+            with self._lock:
+                if uid in self._users:
+                    self._users.move_to_end(uid)
+            stats.incr('user_hit')
+            return copy.copy(entry[0])
+
+        with self._lock:
+            if self._users.get(uid) is entry:
+                self._users.pop(uid, None)
+        stats.incr('user_miss')
+        return None
+
+    def set(self, uid, user, version=None):
+        '''
+        version should be read with get_version before the row was loaded, so a save
+        that lands in between leaves the entry already stale.
+        '''
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._users[uid] = (copy.copy(user), time.monotonic() + self.ttl_seconds, version)
+            self._users.move_to_end(uid)
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+
+    def evict(self, uid):
+        with self._lock:
+            self._users.pop(uid, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+    def __len__(self):
+        return len(self._users)
+
+
+token_cache = TokenCache()
+user_cache = UserCache()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def evict_cached_user(sender, instance, **kwargs):
+    user_cache.evict(instance.pk)
+
+    def expire():
+        # Again after commit, a request here may have cached the old row in between
+        user_cache.evict(instance.pk)
+        user_cache.bump_version(instance.pk)
+
+    transaction.on_commit(expire)
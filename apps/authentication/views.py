@@ -10,10 +10,10 @@ from rest_framework.authentication import SessionAuthentication
 from apps.authentication.firebase import FirebaseAuthentication
 from rest_framework import status
 import logging
-from firebase_admin import auth, storage
 from django.conf import settings
 
 from .serializers import UserSerializer
+from apps.image_pipeline import image_pipeline
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -44,6 +44,8 @@ class UserView(APIView):
         return Response(serializer.data)
 
     def put(self, request):
+        # request.user can be a cached copy, write on top of the current row
+        request.user.refresh_from_db()
         serializer = UserSerializer(request.user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -63,15 +65,13 @@ class UserImageView(APIView):
         try:
             logger.info(f"Attempting to upload image: {image.name}, size: {image.size} bytes")
             
-            # Update the user's image field
-            request.user.img = image
-            request.user.save()
+            # Variants are generated and uploaded in the background
+            image_pipeline.submit(request.user, image.read())
+            request.user.refresh_from_db(fields=['img', 'img_variants'])
+            image_url = request.user.img.url if request.user.img else None
             
-            # Get the URL of the uploaded image
-            image_url = request.user.img.url
-            
-            logger.info(f"Image uploaded successfully for user {request.user.uid}")
-            return Response({'message': 'Image uploaded successfully', 'image_url': image_url}, status=status.HTTP_200_OK)
+            logger.info(f"Image accepted for user {request.user.uid}")
+            return Response({'message': 'Image upload accepted', 'image_url': image_url}, status=status.HTTP_202_ACCEPTED)
         except Exception as e:
             logger.exception(f"Error in image upload process: {str(e)}")
             return Response({'error': f"An error occurred: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
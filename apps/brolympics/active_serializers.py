@@ -3,6 +3,8 @@ from django.contrib.auth import get_user_model
 from apps.brolympics.models import *
 from django.core.exceptions import ObjectDoesNotExist
 from django.shortcuts import get_object_or_404
+from apps.image_pipeline import ImageVariantsField
+from apps.brolympics.loaders import H2H_RELATED, load_bracket_matchups
 from apps.brolympics.serializers import CompetitionSerializer_H2h, CompetitionSerializer_Ind, CompetitionSerializer_Team, BracketCompetitionSerializer_H2h, PlayerSerializer, DateTimeLocalField
 
 class HomeEventSerializer_H2h(serializers.ModelSerializer):
@@ -108,8 +110,8 @@ class EventRankingSerializer_H2h(serializers.ModelSerializer):
         comps = Competition_H2H.objects.filter(
             Q(team_1=obj.team) | Q(team_2=obj.team),
             event=obj.event
-        )
-        return CompetitionSerializer_H2h(comps, many=True).data
+        ).select_related(*H2H_RELATED)
+        return CompetitionSerializer_H2h(comps, many=True, context=self.context).data
     
     def get_type(self, obj):
         return 'h2h'
@@ -240,9 +242,10 @@ class TeamPageSerailizer(serializers.ModelSerializer):
     overall_ranking = serializers.SerializerMethodField()
     player_1 = PlayerSerializer()
     player_2 = PlayerSerializer()
+    img_variants = ImageVariantsField()
     class Meta:
         model = Team
-        fields = ['name', 'player_1', 'player_2', 'overall_ranking', 'img']
+        fields = ['name', 'player_1', 'player_2', 'overall_ranking', 'img', 'img_variants']
 
     def get_overall_ranking(self, obj):
         bro_rankings = obj.brolympics.overall_ranking.filter(team=obj)
@@ -252,10 +255,11 @@ class TeamPageSerailizer(serializers.ModelSerializer):
         return None
 
 class SmallTeamSerializer(serializers.ModelSerializer):
+    img_variants = ImageVariantsField()
 
     class Meta:
         model = Team
-        fields = ['name', 'uuid', 'img']
+        fields = ['name', 'uuid', 'img', 'img_variants']
 
 class EventRankingPageSerailzier_AbstractBase(serializers.ModelSerializer):
     event = serializers.SerializerMethodField()
@@ -321,7 +325,7 @@ class BracketMatchupSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = BracketMatchup
-        fields = ['team_1_seed', 'team_2_seed', 'team_1', 'team_2', 'team_1_score', 'team_2_score', 'uuid', 'winner']
+        fields = ['team_1_seed', 'team_2_seed', 'team_1', 'team_2', 'team_1_score', 'team_2_score', 'uuid', 'winner', 'index', 'side', 'round', 'is_bye', 'is_complete']
 
     def get_team_1(self, obj):
         return SmallTeamSerializer(obj.team_1, context=self.context).data
@@ -334,25 +338,53 @@ class BracketMatchupSerializer(serializers.ModelSerializer):
 
 
 class BracketSerializer(serializers.ModelSerializer):
+    '''
+    Builds the tree from context['bracket_matchups'] (see loaders.load_bracket_matchups).
+    Brackets missing from it are loaded one query each.
+    '''
     event = serializers.SerializerMethodField()
     match_1 = serializers.SerializerMethodField()
     match_2 = serializers.SerializerMethodField()
-    championship = BracketMatchupSerializer()
-    loser_bracket_finals = BracketMatchupSerializer()
+    championship = serializers.SerializerMethodField()
+    loser_bracket_finals = serializers.SerializerMethodField()
+    matchups = serializers.SerializerMethodField()
     class Meta:
         model = Bracket_4
-        fields = ['championship', 'loser_bracket_finals', 'is_complete', 'uuid', 'match_1', 'match_2', 'is_active','event']
+        fields = ['championship', 'loser_bracket_finals', 'is_complete', 'uuid', 'match_1', 'match_2', 'is_active', 'is_double_elimination', 'event', 'matchups']
+
+    def get_matchup_map(self, obj):
+        loaded = self.context.setdefault('bracket_matchups', {})
+        if obj.pk not in loaded:
+            loaded.update(load_bracket_matchups([obj]))
+        return loaded[obj.pk]
+
+    def serialize_matchup(self, obj, matchup_id):
+        matchup = self.get_matchup_map(obj).get(matchup_id)
+        if matchup is None:
+            return None
+        return BracketMatchupSerializer(matchup, context=self.context).data
 
     def get_event(self, obj):
         return obj.event.name
 
+    def get_championship(self, obj):
+        return self.serialize_matchup(obj, obj.championship_id)
+
+    def get_loser_bracket_finals(self, obj):
+        return self.serialize_matchup(obj, obj.loser_bracket_finals_id)
+
     def get_match_1(self, obj):
-        match_serailizer = BracketMatchupSerializer(obj.championship.left, context=self.context)
-        return match_serailizer.data
+        championship = self.get_matchup_map(obj).get(obj.championship_id)
+        return self.serialize_matchup(obj, championship and championship.left_id)
 
     def get_match_2(self, obj):
-        match_serailizer = BracketMatchupSerializer(obj.championship.right, context=self.context)
-        return match_serailizer.data
+        championship = self.get_matchup_map(obj).get(obj.championship_id)
+        return self.serialize_matchup(obj, championship and championship.right_id)
+
+    def get_matchups(self, obj):
+        # Every match in plan order, for brackets bigger than four teams
+        matchups = list(self.get_matchup_map(obj).values())
+        return BracketMatchupSerializer(matchups, many=True, context=self.context).data
     
 class OverallRankingSerializer(serializers.ModelSerializer):
     team = serializers.SerializerMethodField()
@@ -372,8 +404,8 @@ class EventCompSerailizer_h2h(serializers.ModelSerializer):
         fields = ['name', 'comps']
 
     def get_comps(self, obj):
-        comps = Competition_H2H.objects.filter(event=obj)
-        comps_data = CompetitionSerializer_H2h(comps, many=True).data
+        comps = Competition_H2H.objects.filter(event=obj).select_related(*H2H_RELATED)
+        comps_data = CompetitionSerializer_H2h(comps, many=True, context=self.context).data
         return comps_data
     
 class EventCompSerailizer_ind(serializers.ModelSerializer):
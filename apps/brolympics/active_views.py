@@ -7,9 +7,20 @@ from datetime import datetime
 from apps.brolympics.models import *
 from apps.brolympics.serializers import *
 from apps.brolympics.active_serializers import *
+from apps.brolympics.current_comp import CURRENT_COMP_FIELDS, RESPONSE_TYPES, get_active_comps, repair_current_comp
+from apps.brolympics.loaders import ActiveHomeLoader, H2H_RELATED, load_bracket_matchups, load_h2h_records
+from apps.brolympics.snapshots import get_standings_snapshot, rebuild_standings_snapshot
+from apps.brolympics.conditional import conditional_on_revision, brolympics_revision, event_revision
 from django.shortcuts import get_object_or_404
 from rest_framework.exceptions import PermissionDenied
-from django.db.models import Q
+from django.utils.http import parse_etags
+from django.views import View
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from apps.authentication.firebase import FirebaseAuthentication
+from apps.brolympics.live import get_channel, stream_updates
 
 
 ## Home Page Start
@@ -104,39 +115,23 @@ class GetActiveHome(APIView):
         brolympics = get_object_or_404(Brolympics, uuid=uuid)
         return brolympics
     
-    def get_available(self, qset):
-        available = [
-            event.find_available_comps(self.request.user)
-            for event in qset
-        ]
-        return available
-    
-    def get_active(self, qset):
-        active = [
-            event.find_active_comps()
-            for event in qset
-        ]
-        return active
-    
+    @conditional_on_revision(brolympics_revision)
     def get(self, request, uuid):
         brolympics = self.get_object(uuid)  
-        event_map = brolympics.get_active_events()
+        home = ActiveHomeLoader(brolympics, request.user).load()
+        context = {'request': request}
 
         # Active Events
-        h2h = event_map['h2h']
-        ind = event_map['ind']
-        team = event_map['team']
-
         h2h_event_serialized = HomeEventSerializer_H2h(
-            h2h, 
+            home.active_events['h2h'], 
             many=True, 
             ).data
         ind_event_serialized = HomeEventSerializer_Ind(
-            ind, 
+            home.active_events['ind'], 
             many=True
             ).data
         team_event_serialized = HomeEventSerializer_Team(
-            team, 
+            home.active_events['team'], 
             many=True
             ).data
 
@@ -144,100 +139,32 @@ class GetActiveHome(APIView):
         all_serialized.sort(key=lambda x: x['start_time'] if x['start_time'] is not None else datetime.max, reverse=False)
 
         #Available_competitions
-        h2h_available = {'std':[], 'bracket':[]}
-        for event in h2h:
-            comps = event.find_available_comps(request.user)
-            h2h_available['std'].extend(comps['std'])
-            if event.is_round_robin_complete:
-                h2h_available['bracket'].extend(comps['bracket'])
-        
-        ind_available = self.get_available(ind)
-        team_available = self.get_available(team)
-        
-        h2h_comp_serialized = CompetitionSerializer_H2h(
-            h2h_available['std'], 
-            many=True,
-            context={'request': request}
-            ).data 
-        
-        h2h_bracket_serialized = BracketCompetitionSerializer_H2h(
-            h2h_available['bracket'], 
-            many=True,
-            context={'request': request}
-            ).data 
-
-        ind_comp_serialized = [
-            comp 
-            for qset in ind_available
-            for comp in CompetitionSerializer_Ind(qset, many=True, context={'request': request}).data 
-
-        ]
-        team_comp_serializerd = [
-            comp
-            for qset in team_available
-            for comp in CompetitionSerializer_Team(qset, many=True, context={'request': request}).data 
-        ]
+        h2h_comp_serialized = CompetitionSerializer_H2h(home.available['std'], many=True, context=context).data 
+        h2h_bracket_serialized = BracketCompetitionSerializer_H2h(home.available['bracket'], many=True, context=context).data 
+        ind_comp_serialized = CompetitionSerializer_Ind(home.available['ind'], many=True, context=context).data 
+        team_comp_serializerd = CompetitionSerializer_Team(home.available['team'], many=True, context=context).data 
+
         available_comps = h2h_comp_serialized + ind_comp_serialized + team_comp_serializerd
         
         #Active
-        h2h_active = {'std': [], 'bracket':[]}
-        for event in h2h:
-            comps = event.find_active_comps()
-            h2h_active['std'].extend(comps['std'])
-            h2h_active['bracket'].extend(comps['bracket'])
-
-        ind_active = self.get_active(ind)
-        team_active = self.get_active(team)
-
-        bracket_active_serialized = BracketCompetitionSerializer_H2h(
-            h2h_active['bracket'], 
-            many=True,
-            context={'request': request}
-            ).data
-        h2h_active_serialized = CompetitionSerializer_H2h(
-            h2h_active['std'], 
-            many=True,
-            context={'request': request}
-            ).data
-
-        ind_active_serialized = [
-            comp
-            for qset in ind_active
-            for comp in CompetitionSerializer_Ind(
-                    qset, 
-                    many=True,
-                    context={'request': request}
-                ).data
-        ]
-
-        team_active_serialized = [
-            comp
-            for qset in team_active
-            for comp in CompetitionSerializer_Team(
-                    qset, 
-                    many=True,
-                    context={'request': request}
-                ).data 
-        ] 
+        h2h_active_serialized = CompetitionSerializer_H2h(home.active['std'], many=True, context=context).data
+        bracket_active_serialized = BracketCompetitionSerializer_H2h(home.active['bracket'], many=True, context=context).data
+        ind_active_serialized = CompetitionSerializer_Ind(home.active['ind'], many=True, context=context).data
+        team_active_serialized = CompetitionSerializer_Team(home.active['team'], many=True, context=context).data
 
         all_active_data = h2h_active_serialized + ind_active_serialized + team_active_serialized + bracket_active_serialized
 
         #Upcoming Events
-        upcoming_map = brolympics.get_upcoming_events()
-        up_h2h = upcoming_map['h2h']
-        up_ind = upcoming_map['ind']
-        up_team = upcoming_map['team']
-
         up_h2h_event_serialized = HomeEventSerializer_H2h(
-            up_h2h, 
+            home.upcoming_events['h2h'], 
             many=True, 
             ).data
         up_ind_event_serialized = HomeEventSerializer_Ind(
-            up_ind, 
+            home.upcoming_events['ind'], 
             many=True
             ).data
         up_team_event_serialized = HomeEventSerializer_Team(
-            up_team, 
+            home.upcoming_events['team'], 
             many=True
             ).data
 
@@ -290,55 +217,24 @@ class StartCompetition(APIView):
 class IsInCompetition(APIView):
     permission_classes = [IsAuthenticated]
 
-    def find_comp(self, user):
-        h2h = Competition_H2H.objects.filter(
-            Q(team_1__player_1=user) | Q(team_1__player_2=user) | 
-            Q(team_2__player_1=user) | Q(team_2__player_2=user),
-            is_active=True,
-        )
-        if h2h.exists():
-            return h2h.first(), 'h2h'
-
-        bracket = BracketMatchup.objects.filter(
-            Q(team_1__player_1=user) | Q(team_1__player_2=user) | 
-            Q(team_2__player_1=user) | Q(team_2__player_2=user),
-            is_active=True,
-        )
-        if bracket.exists():
-            return bracket.first(), 'h2h'
-
-        ind = Competition_Ind.objects.filter(
-            Q(team__player_1=user) | Q(team__player_2=user),
-            is_active=True,
-        )
-        if ind.exists():
-            return ind.first(), 'ind'
-
-        team = Competition_Team.objects.filter(
-            Q(team__player_1=user) | Q(team__player_2=user),
-            is_active=True,
-        )
-        if team.exists():
-            return team.first(), 'team'
-        
-        user.is_available = True
-        user.save()
-        raise ValueError('No Competition currently exists')
-
-
-
     def get(self, request):
+        # request.user can be a cached copy from before a teammate started a competition
         user = request.user
+        user.refresh_from_db(fields=CURRENT_COMP_FIELDS)
+
+        if not user.is_available and user.current_comp_uuid is None:
+            # Unavailable without a pointer, the competition tables have the final say
+            repair_current_comp(user, get_active_comps())
+
         data = {
             'is_available' : True,
             'comp_uuid' : ''
         }
         if not user.is_available:
-            comp, type = self.find_comp(user)
             data = {
                 'is_available' : False,
-                'comp_uuid' : comp.uuid,
-                'type': type
+                'comp_uuid' : user.current_comp_uuid,
+                'type': RESPONSE_TYPES.get(user.current_comp_type, user.current_comp_type)
             }
 
         return Response(data, status=status.HTTP_200_OK)
@@ -529,18 +425,20 @@ class GetTeamInfo(APIView):
 class GetEventInfo(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_on_revision(event_revision)
     def get(self, request, uuid, type):
         if type == 'h2h':
             event = get_object_or_404(Event_H2H, uuid=uuid)
 
             if event.is_active or event.is_complete:
-                event_rankings = EventRanking_H2H.objects.filter(event=event)
+                event_rankings = EventRanking_H2H.objects.filter(event=event).select_related('event', 'team')
                 ranking_data = EventPageSerializer_h2h(event_rankings, many=True, context={'request': request})
 
-                comps = Competition_H2H.objects.filter(event=event)
-                comp_data = CompetitionSerializer_H2h(comps, many=True, context={'request': request})
+                comps = Competition_H2H.objects.filter(event=event).select_related(*H2H_RELATED)
+                comp_data = CompetitionSerializer_H2h(comps, many=True, context={'request': request, 'h2h_records': load_h2h_records([event])})
 
-                bracket = BracketSerializer(event.bracket_4, context={'request': request})
+                bracket = Bracket_4.objects.select_related('event').get(event=event)
+                bracket = BracketSerializer(bracket, context={'request': request, 'bracket_matchups': load_bracket_matchups([bracket])})
 
                 data = {
                     'type' : 'h2h',
@@ -602,51 +500,17 @@ class GetEventInfo(APIView):
 class GetStandingsInfo(APIView):
     permission_classes = [IsAuthenticated]
     
-    def get_podiums(self, events, ranking_model):
-        event_data = []
-        for event in events:
-            podium_data = { 'event' : event.name}
-
-            first = ranking_model.objects.filter(event=event, rank=1)
-            second = ranking_model.objects.filter(event=event, rank=2)
-            third = ranking_model.objects.filter(event=event, rank=3)
-            
-
-            teams_first = [ranking.team for ranking in first] if first.exists() else []
-            podium_data['first'] = SmallTeamSerializer(teams_first, many=True, context={'request': self.request}).data
-
-            teams_second = [ranking.team for ranking in second] if second.exists() else []
-            podium_data['second'] = SmallTeamSerializer(teams_second, many=True, context={'request': self.request}).data
-
-            teams_third = [ranking.team for ranking in third] if third.exists() else []
-            podium_data['third'] = SmallTeamSerializer(teams_third, many=True, context={'request': self.request}).data
-   
-            event_data.append(podium_data)
-
-        return event_data
-    
     def get(self, request, uuid):
-        brolympics = get_object_or_404(Brolympics, uuid=uuid)
-        all_rankings = brolympics.overall_ranking.all()
+        snapshot = get_standings_snapshot(uuid)
+        if snapshot is None:
+            brolympics = get_object_or_404(Brolympics, uuid=uuid)
+            snapshot = rebuild_standings_snapshot(brolympics)
 
-        overall_rank_serializer = OverallRankingSerializer(all_rankings, many=True, context={'request':request})
-
-        completed_events_h2h = Event_H2H.objects.filter(is_complete=True, brolympics=brolympics)
-        completed_events_ind = Event_IND.objects.filter(is_complete=True, brolympics=brolympics)
-        completed_events_team = Event_Team.objects.filter(is_complete=True, brolympics=brolympics)
-
-        h2h_podiums = self.get_podiums(completed_events_h2h, EventRanking_H2H)
-        ind_podiums = self.get_podiums(completed_events_ind, EventRanking_Ind)
-        team_podiums = self.get_podiums(completed_events_team, EventRanking_Team)
-
-        podiums = h2h_podiums + ind_podiums + team_podiums
-            
-        data = {
-            'standings': overall_rank_serializer.data,
-            'podiums' : podiums
-        }
+        headers = {'ETag': snapshot.etag}
+        if snapshot.etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
-        return Response(data, status=status.HTTP_200_OK)
+        return Response(snapshot.data, status=status.HTTP_200_OK, headers=headers)
 
 
 class ForceOverallUpdate(APIView):
@@ -656,3 +520,38 @@ class ForceOverallUpdate(APIView):
 
         return Response(status=status.HTTP_200_OK)
 
+
+# Live Updates
+def authenticate_stream(request):
+    # EventSource can't set headers, so the id token may come in the query string instead
+    if 'HTTP_AUTHORIZATION' not in request.META and 'token' in request.GET:
+        request.META['HTTP_AUTHORIZATION'] = f"Bearer {request.GET['token']}"
+
+    result = FirebaseAuthentication().authenticate(request)
+    return result[0] if result else None
+
+
+class LiveUpdates(View):
+    '''
+    Server-sent events for one brolympics: competition, event and standings diffs as
+    they are committed. Plain Django async view, DRF views can't stream from the event loop.
+    '''
+    async def get(self, request, uuid):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({'detail': 'Live updates are only served through api.asgi.'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        try:
+            user = await sync_to_async(authenticate_stream)(request)
+        except AuthenticationFailed as e:
+            return JsonResponse({'detail': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+        if user is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        brolympics_id = await Brolympics.objects.filter(uuid=uuid).values_list('pk', flat=True).afirst()
+        if brolympics_id is None:
+            return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        response = StreamingHttpResponse(stream_updates(get_channel(brolympics_id)), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class BrolympicsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.brolympics'
+
+    def ready(self):
+        # Registers the receivers that feed the live update stream
+        from apps.brolympics import live
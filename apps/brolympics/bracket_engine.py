@@ -0,0 +1,321 @@
+from __future__ import annotations
+from dataclasses import dataclass, field, replace
+from functools import cached_property, lru_cache
+
+
+WINNERS = 'winners'
+LOSERS = 'losers'
+THIRD = 'third'
+FINAL = 'final'
+
+BRACKET_TYPES = (
+    ('single', 'Single Elimination'),
+    ('double', 'Double Elimination'),
+)
+
+BRACKET_SIDES = (
+    (WINNERS, 'Winners'),
+    (LOSERS, 'Losers'),
+    (THIRD, 'Third Place'),
+    (FINAL, 'Grand Final'),
+)
+
+
+@dataclass(frozen=True)
+class BracketNode:
+    index: int
+    side: str
+    round: int
+    position: int
+    seeds: tuple = None
+    winner_to: tuple = None
+    loser_to: tuple = None
+    winner_place: int = None
+    loser_place: int = None
+
+
+def get_bracket_size(n_teams):
+    size = 1
+    while size < n_teams:
+        size *= 2
+    return size
+
+
+def get_seed_order(size):
+    # 1 v size, then each half repeats the split so the top seeds meet as late as possible
+    order = [1]
+    while len(order) < size:
+        total = len(order) * 2 + 1
+        order = [seed for top in order for seed in (top, total - top)]
+    return order
+
+
+@dataclass
+class BracketPlan:
+    '''
+    The shape of a bracket as a flat table. Nodes are numbered so every match comes after
+    the matches feeding it, and each node knows which (index, slot) its winner and loser
+    move to, so advancing a result is a lookup instead of a walk over FKs.
+    Works on anything with the BracketMatchup team/seed/result attributes, keyed by index.
+    '''
+    n_teams: int
+    size: int
+    nodes: list = field(default_factory=list)
+    root: int = None
+    consolation: int = None
+
+    def add(self, side, round, position, **kwargs):
+        node = BracketNode(len(self.nodes), side, round, position, **kwargs)
+        self.nodes.append(node)
+        return node.index
+
+    def link(self, index, **kwargs):
+        self.nodes[index] = replace(self.nodes[index], **kwargs)
+
+    # Plans are cached and never change once built
+    @cached_property
+    def first_round(self):
+        return [node for node in self.nodes if node.seeds]
+
+    @cached_property
+    def terminal(self):
+        return [node for node in self.nodes if node.winner_to is None]
+
+    def get_sources(self):
+        # {index: {slot: (source index, 'winner' or 'loser')}}
+        sources = {node.index: {} for node in self.nodes}
+        for node in self.nodes:
+            for result, target in [('winner', node.winner_to), ('loser', node.loser_to)]:
+                if target is not None:
+                    sources[target[0]][target[1]] = (node.index, result)
+        return sources
+
+    def get_void_slots(self, n_entrants):
+        '''
+        {index: slots that will never get a team} when fewer than size teams enter. A
+        seed past the field is empty, a winner is empty when both sides of its match
+        are, and a loser is empty when its match was a bye.
+        '''
+        sources = self.get_sources()
+        voids = {}
+        for node in self.nodes:
+            empty = set()
+            for slot in (1, 2):
+                if node.seeds:
+                    if node.seeds[slot-1] > n_entrants:
+                        empty.add(slot)
+                    continue
+
+                source_index, result = sources[node.index][slot]
+                source_voids = voids.get(source_index, ())
+                if len(source_voids) == 2 or (result == 'loser' and source_voids):
+                    empty.add(slot)
+            if empty:
+                voids[node.index] = empty
+        return voids
+
+    ## Results ##
+    def seed(self, matchups, teams, resolve_byes=False):
+        '''
+        Puts teams, best first, into the first round. Byes are only resolved once the
+        bracket goes live so provisional seeding can be redone freely.
+        '''
+        changed = set()
+        for node in self.first_round:
+            matchup = matchups[node.index]
+            for slot, seed in enumerate(node.seeds, 1):
+                team = teams[seed-1] if seed <= len(teams) else None
+                if getattr(matchup, f'team_{slot}') != team:
+                    setattr(matchup, f'team_{slot}', team)
+                    changed.add(node.index)
+
+        if resolve_byes:
+            voids = self.get_void_slots(len(teams))
+            for index, slots in voids.items():
+                matchup = matchups[index]
+                matchup.is_bye = True
+                matchup.is_complete = len(slots) == 2
+                changed.add(index)
+
+            for node in self.first_round:
+                if len(voids.get(node.index, ())) == 1:
+                    matchup = matchups[node.index]
+                    self._complete_bye(matchups, node.index, matchup.team_1 or matchup.team_2, changed)
+
+        return [matchups[index] for index in sorted(changed)]
+
+    def advance(self, matchups, index):
+        '''
+        Moves the winner and loser of a finished match into the matches they feed, and
+        straight through any byes waiting there. Returns every matchup it changed.
+        '''
+        changed = set()
+        self._advance(matchups, index, changed)
+        return [matchups[index] for index in sorted(changed)]
+
+    def _advance(self, matchups, index, changed):
+        node = self.nodes[index]
+        matchup = matchups[index]
+        if matchup.winner is None:
+            return
+
+        if node.winner_to is not None:
+            self._place(matchups, matchup.winner, self._get_seed(matchup, matchup.winner), node.winner_to, changed)
+        if node.loser_to is not None and matchup.loser is not None:
+            self._place(matchups, matchup.loser, self._get_seed(matchup, matchup.loser), node.loser_to, changed)
+
+    def _place(self, matchups, team, seed, target, changed):
+        index, slot = target
+        matchup = matchups[index]
+        setattr(matchup, f'team_{slot}', team)
+        setattr(matchup, f'team_{slot}_seed', seed)
+        changed.add(index)
+
+        if matchup.is_bye:
+            self._complete_bye(matchups, index, team, changed)
+
+    def _complete_bye(self, matchups, index, team, changed):
+        matchup = matchups[index]
+        matchup.winner = team
+        matchup.loser = None
+        matchup.is_complete = True
+        changed.add(index)
+        self._advance(matchups, index, changed)
+
+    def _get_seed(self, matchup, team):
+        return matchup.team_1_seed if team == matchup.team_1 else matchup.team_2_seed
+
+    def is_complete(self, matchups):
+        # Done once every match that decides a final place has a result
+        for node in self.terminal:
+            matchup = matchups[node.index]
+            if matchup.is_bye and matchup.is_complete:
+                continue
+            if matchup.winner is None or (matchup.loser is None and not matchup.is_bye):
+                return False
+        return True
+
+    def get_final_order(self, matchups):
+        '''
+        Teams by where they finished: the places each match decides, with teams knocked
+        out in the same round ordered by seed.
+        '''
+        placed = []
+        for node in self.nodes:
+            matchup = matchups[node.index]
+            for place, team in [(node.winner_place, matchup.winner), (node.loser_place, matchup.loser)]:
+                if place is not None and team is not None:
+                    seed = self._get_seed(matchup, team) or self.size + 1
+                    placed.append((place, seed, team))
+
+        placed.sort(key=lambda entry: entry[:2])
+        return [team for _, _, team in placed]
+
+
+## Plans ##
+def add_winners_bracket(plan):
+    rounds = []
+    order = get_seed_order(plan.size)
+    n_matches = plan.size // 2
+
+    first_round = []
+    for position in range(n_matches):
+        seeds = (order[2*position], order[2*position+1])
+        # The bottom half lists the lower seed first, the mirror image of the top half
+        if position >= n_matches // 2 and n_matches > 1:
+            seeds = seeds[::-1]
+        first_round.append(plan.add(WINNERS, 1, position, seeds=seeds))
+    rounds.append(first_round)
+
+    while len(rounds[-1]) > 1:
+        previous = rounds[-1]
+        current = []
+        for position in range(len(previous) // 2):
+            index = plan.add(WINNERS, len(rounds) + 1, position)
+            plan.link(previous[2*position], winner_to=(index, 1))
+            plan.link(previous[2*position+1], winner_to=(index, 2))
+            current.append(index)
+        rounds.append(current)
+    return rounds
+
+
+def set_single_elimination_places(plan, winners_rounds, third_place):
+    for round_indexes in winners_rounds:
+        for index in round_indexes:
+            plan.link(index, loser_place=len(round_indexes) + 1)
+
+    plan.root = winners_rounds[-1][0]
+    plan.link(plan.root, winner_place=1, loser_place=2)
+
+    if third_place and len(winners_rounds) >= 2:
+        semifinals = winners_rounds[-2]
+        plan.consolation = plan.add(THIRD, 1, 0, winner_place=3, loser_place=4)
+        for slot, index in enumerate(semifinals, 1):
+            plan.link(index, loser_to=(plan.consolation, slot), loser_place=None)
+
+
+def add_losers_bracket(plan, winners_rounds):
+    '''
+    Losers of the first winners round play each other, then every later winners round
+    drops its losers in against the losers bracket survivors, in reverse order so early
+    rematches are avoided. Alternate rounds halve the field.
+    '''
+    rounds = []
+    first_round = []
+    for position in range(len(winners_rounds[0]) // 2):
+        index = plan.add(LOSERS, 1, position)
+        plan.link(winners_rounds[0][2*position], loser_to=(index, 1))
+        plan.link(winners_rounds[0][2*position+1], loser_to=(index, 2))
+        first_round.append(index)
+    rounds.append(first_round)
+
+    for dropping in winners_rounds[1:]:
+        previous = rounds[-1]
+        if len(previous) > len(dropping):
+            halved = []
+            for position in range(len(previous) // 2):
+                index = plan.add(LOSERS, len(rounds) + 1, position)
+                plan.link(previous[2*position], winner_to=(index, 1))
+                plan.link(previous[2*position+1], winner_to=(index, 2))
+                halved.append(index)
+            rounds.append(halved)
+            previous = halved
+
+        drop_round = []
+        for position, survivor in enumerate(previous):
+            index = plan.add(LOSERS, len(rounds) + 1, position)
+            plan.link(survivor, winner_to=(index, 1))
+            plan.link(dropping[len(dropping) - 1 - position], loser_to=(index, 2))
+            drop_round.append(index)
+        rounds.append(drop_round)
+
+    alive = plan.size
+    for round_indexes in rounds:
+        alive -= len(round_indexes)
+        for index in round_indexes:
+            plan.link(index, loser_place=alive + 1)
+    return rounds
+
+
+@lru_cache(maxsize=64)
+def plan_bracket(n_teams, double_elimination=False, third_place=True):
+    '''
+    Single or double elimination for any number of teams, padded with byes to the next
+    power of two. Single elimination optionally has a third place match; double
+    elimination finishes with a grand final between the two bracket winners.
+    '''
+    plan = BracketPlan(n_teams, get_bracket_size(n_teams))
+    if n_teams < 2:
+        return plan
+
+    winners_rounds = add_winners_bracket(plan)
+    if not double_elimination or plan.size < 4:
+        set_single_elimination_places(plan, winners_rounds, third_place)
+        return plan
+
+    losers_rounds = add_losers_bracket(plan, winners_rounds)
+    plan.root = plan.add(FINAL, 1, 0, winner_place=1, loser_place=2)
+    plan.link(winners_rounds[-1][0], winner_to=(plan.root, 1))
+    plan.link(losers_rounds[-1][0], winner_to=(plan.root, 2))
+    plan.consolation = losers_rounds[-1][0]
+    return plan
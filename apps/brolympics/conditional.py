@@ -0,0 +1,102 @@
+from __future__ import annotations
+from functools import wraps
+from hashlib import md5
+
+from django.db.models import Q
+from django.utils.http import http_date, parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.brolympics.models import Brolympics, Event_H2H, Event_IND, Event_Team
+
+
+EVENT_MODELS = {
+    'h2h': Event_H2H,
+    'ind': Event_IND,
+    'team': Event_Team,
+}
+
+
+def make_etag(request, *parts):
+    # Responses differ per user and per endpoint, so both are part of the validator
+    user_id = getattr(request.user, 'pk', None)
+    key = ':'.join(str(part) for part in (request.get_full_path(), user_id, *parts))
+    return f'W/"{md5(key.encode()).hexdigest()}"'
+
+
+def is_not_modified(request, etag):
+    # Only the ETag is trusted, HTTP dates are whole seconds and a revision can move twice in one
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+
+    client_etags = [tag.removeprefix('W/') for tag in parse_etags(if_none_match)]
+    return '*' in client_etags or etag.removeprefix('W/') in client_etags
+
+
+def conditional_on_revision(get_revision):
+    '''
+    Wraps an APIView handler so that If-None-Match is answered from the brolympics
+    revision before the handler runs. get_revision(request, *args, **kwargs) returns
+    (revision, revised_at), or None to let the handler deal with the request.
+    Last-Modified is informational, If-Modified-Since alone always gets a full response.
+    '''
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            revision = get_revision(request, *args, **kwargs)
+            if revision is None:
+                return handler(self, request, *args, **kwargs)
+
+            revision, revised_at = revision
+            etag = make_etag(request, revision)
+            headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+            if revised_at is not None:
+                headers['Last-Modified'] = http_date(revised_at.timestamp())
+
+            if is_not_modified(request, etag):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                for header, value in headers.items():
+                    response[header] = value
+            return response
+        return wrapper
+    return decorator
+
+
+## Revision lookups ##
+def brolympics_revision(request, uuid, **kwargs):
+    return Brolympics.objects.filter(uuid=uuid).values_list('revision', 'revised_at').first()
+
+
+def owned_brolympics_revision(request, uuid, **kwargs):
+    return Brolympics.objects.filter(
+        uuid=uuid,
+        league__league_owner=request.user,
+    ).values_list('revision', 'revised_at').first()
+
+
+def event_revision(request, uuid, type, **kwargs):
+    event_model = EVENT_MODELS.get(type)
+    if event_model is None:
+        return None
+
+    return event_model.objects.filter(uuid=uuid).values_list(
+        'brolympics__revision',
+        'brolympics__revised_at',
+    ).first()
+
+
+def upcoming_revision(request, **kwargs):
+    user = request.user
+    revisions = Brolympics.objects.filter(
+        Q(players=user) | Q(league__league_owner=user) | Q(is_active=True, is_complete=False)
+    ).distinct().order_by('pk').values_list('pk', 'revision', 'revised_at')
+
+    # Every brolympics in the listing is part of the key, so one joining or leaving the set changes it too
+    revisions = list(revisions)
+    revision = ','.join(f'{pk}.{revision}' for pk, revision, _ in revisions)
+    revised_at = max((revised_at for _, _, revised_at in revisions), default=None)
+    return revision, revised_at
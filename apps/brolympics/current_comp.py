@@ -0,0 +1,67 @@
+from __future__ import annotations
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from apps.brolympics.models import (
+    Competition_H2H,
+    BracketMatchup,
+    Competition_Ind,
+    Competition_Team,
+)
+
+User = get_user_model()
+
+# In the order IsInCompetition has always checked them
+ACTIVE_COMP_MODELS = [
+    ('h2h', Competition_H2H, ['team_1', 'team_2']),
+    ('bracket', BracketMatchup, ['team_1', 'team_2']),
+    ('ind', Competition_Ind, ['team']),
+    ('team', Competition_Team, ['team']),
+]
+
+# Brackets are served by the h2h competition page
+RESPONSE_TYPES = {'h2h': 'h2h', 'bracket': 'h2h', 'ind': 'ind', 'team': 'team'}
+
+CURRENT_COMP_FIELDS = ['is_available', 'current_comp_type', 'current_comp_uuid']
+
+
+def get_active_comps():
+    '''
+    {uid: (comp_type, comp_uuid)} from the competition tables themselves. Only a
+    handful of competitions are ever active at once, so this is four small queries.
+    '''
+    active = {}
+    for comp_type, model, team_fields in ACTIVE_COMP_MODELS:
+        player_fields = [f'{team}__{player}' for team in team_fields for player in ['player_1', 'player_2']]
+        rows = model.objects.filter(is_active=True).order_by('id').values_list('uuid', *player_fields)
+        for comp_uuid, *uids in rows:
+            for uid in uids:
+                if uid is not None:
+                    active.setdefault(uid, (comp_type, comp_uuid))
+    return active
+
+
+def repair_current_comp(user, active, commit=True):
+    '''
+    Points user at the competition they are really in, or clears the pointer and frees
+    them. Returns True when the stored row was wrong.
+    '''
+    comp_type, comp_uuid = active.get(user.uid, (None, None))
+    is_available = comp_uuid is None
+
+    if (user.is_available, user.current_comp_type, user.current_comp_uuid) == (is_available, comp_type, comp_uuid):
+        return False
+    if not commit:
+        return True
+
+    user.is_available = is_available
+    user.current_comp_type = comp_type
+    user.current_comp_uuid = comp_uuid
+    user.save(update_fields=CURRENT_COMP_FIELDS)
+    return True
+
+
+def get_stale_candidates(active):
+    return User.objects.filter(
+        Q(is_available=False) | Q(current_comp_uuid__isnull=False) | Q(uid__in=list(active))
+    )
@@ -0,0 +1,11 @@
+from django.db import models
+
+
+class RichTextField(models.TextField):
+    '''
+    TextField edited with CKEditor in admin forms. ckeditor and its widget stack are
+    only imported when a form is built, not whenever the models load.
+    '''
+    def formfield(self, **kwargs):
+        from ckeditor.fields import RichTextFormField
+        return super().formfield(**{'form_class': RichTextFormField, **kwargs})
@@ -0,0 +1,265 @@
+from __future__ import annotations
+from collections import defaultdict
+from threading import Lock
+import asyncio
+import json
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from apps.brolympics.models import (
+    revision_bumped,
+    EventAbstactBase,
+    Competition_H2H_Base,
+    Competition_Ind,
+    Competition_Team,
+)
+
+logger = logging.getLogger(__name__)
+
+COMPETITION_ACTIONS = {'start', 'end', 'admin_end', 'cancel'}
+EVENT_ACTIONS = {'start', 'finalize'}
+
+
+def get_channel(brolympics_id):
+    return f'brolympics:{brolympics_id}'
+
+
+def encode(message):
+    return json.dumps(message, separators=(',', ':'), default=str)
+
+
+## Brokers ##
+class InMemorySubscription:
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, message):
+        # Runs on the subscriber's loop, a slow client loses its oldest messages, not the newest
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InMemoryBroker:
+    '''
+    Process local pub/sub. publish() is safe to call from the sync request threads,
+    messages are handed to each subscriber's event loop.
+    '''
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or settings.LIVE_UPDATES_QUEUE_SIZE
+        self._subscriptions = defaultdict(set)
+        self._lock = Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:
+                # Loop already closed, the subscription is on its way out
+                self.unsubscribe(subscription)
+
+    def subscribe(self, channel):
+        subscription = InMemorySubscription(self, channel, self.queue_size)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def n_subscribers(self, channel):
+        with self._lock:
+            return len(self._subscriptions.get(channel, ()))
+
+
+class RedisSubscription:
+    def __init__(self, client, channel):
+        self.client = client
+        self.channel = channel
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self._subscribed = False
+
+    async def get(self, timeout=None):
+        if not self._subscribed:
+            await self.pubsub.subscribe(self.channel)
+            self._subscribed = True
+
+        message = await self.pubsub.get_message(timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+    async def close(self):
+        await self.pubsub.unsubscribe(self.channel)
+        await self.pubsub.close()
+
+
+class RedisBroker:
+    '''
+    Redis pub/sub for running more than one instance. Needs the redis package, which
+    the redis cache backend already requires.
+    '''
+    def __init__(self, url=None):
+        import redis
+        import redis.asyncio
+
+        self.url = url or settings.REDIS_URL
+        self._client = redis.Redis.from_url(self.url)
+        self._async_client = redis.asyncio.Redis.from_url(self.url)
+
+    def publish(self, channel, message):
+        self._client.publish(channel, encode(message))
+
+    def subscribe(self, channel):
+        return RedisSubscription(self._async_client, channel)
+
+
+_broker = None
+_broker_lock = Lock()
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.LIVE_UPDATES_BROKER)()
+        return _broker
+
+
+def publish(brolympics_id, message):
+    channel = get_channel(brolympics_id)
+
+    def send():
+        try:
+            get_broker().publish(channel, message)
+        except Exception:
+            logger.exception(f'Live update publish failed for {channel}')
+
+    transaction.on_commit(send)
+
+
+## Diffs ##
+def get_competition_diff(comp, action):
+    diff = {
+        'type': 'competition',
+        'action': action,
+        'uuid': comp.uuid,
+        'event': comp.event.uuid,
+        'is_active': comp.is_active,
+        'is_complete': comp.is_complete,
+    }
+    if isinstance(comp, Competition_H2H_Base):
+        diff.update(team_1_score=comp.team_1_score, team_2_score=comp.team_2_score)
+    elif isinstance(comp, Competition_Ind):
+        diff.update(player_1_score=comp.player_1_score, player_2_score=comp.player_2_score, team_score=comp.team_score)
+    else:
+        diff.update(team_score=comp.team_score)
+    return diff
+
+
+def get_event_diff(event, action):
+    return {
+        'type': 'event',
+        'action': action,
+        'uuid': event.uuid,
+        'is_active': event.is_active,
+        'is_complete': event.is_complete,
+    }
+
+
+def get_standings_diff(old_data, new_data, version):
+    old_rows = {row['team']['uuid']: row for row in old_data.get('standings', [])}
+    new_rows = {row['team']['uuid']: row for row in new_data.get('standings', [])}
+
+    changed = []
+    for team_uuid, row in new_rows.items():
+        old_row = old_rows.get(team_uuid, {})
+        fields = {key: value for key, value in row.items() if key != 'team' and old_row.get(key) != value}
+        if fields:
+            changed.append({'team': team_uuid, **fields})
+
+    diff = {
+        'type': 'standings',
+        'version': version,
+        'changed': changed,
+        'removed': [team_uuid for team_uuid in old_rows if team_uuid not in new_rows],
+    }
+    if old_data.get('podiums') != new_data.get('podiums'):
+        diff['podiums'] = new_data.get('podiums')
+    return diff
+
+
+@receiver(revision_bumped)
+def publish_state_change(sender, instance, action, brolympics_id, **kwargs):
+    if brolympics_id is None:
+        return
+
+    if isinstance(instance, (Competition_H2H_Base, Competition_Ind, Competition_Team)) and action in COMPETITION_ACTIONS:
+        message = get_competition_diff(instance, action)
+    elif isinstance(instance, EventAbstactBase) and action in EVENT_ACTIONS:
+        message = get_event_diff(instance, action)
+    else:
+        # Anything else only tells clients their conditional GETs are worth re-sending
+        message = {'type': 'revision', 'model': sender._meta.model_name, 'action': action}
+
+    publish(brolympics_id, message)
+
+
+## Stream ##
+def format_event(message):
+    return f"event: {message['type']}\ndata: {encode(message)}\n\n"
+
+
+async def stream_updates(channel, heartbeat_seconds=None, max_seconds=None):
+    '''
+    Server-sent event stream for one channel. The subscription is made on the loop that
+    serves the response, and a comment goes out whenever the channel is quiet so
+    proxies keep the connection open.
+
+    Django's ASGI handler doesn't watch for http.disconnect while streaming and uvicorn
+    drops sends to a closed socket, so a closed tab is never noticed here. Every stream
+    ends after max_seconds instead, which releases the subscription, and EventSource
+    reconnects after the retry delay.
+    '''
+    heartbeat_seconds = heartbeat_seconds or settings.LIVE_UPDATES_HEARTBEAT_SECONDS
+    max_seconds = max_seconds or settings.LIVE_UPDATES_MAX_SECONDS
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+
+    subscription = get_broker().subscribe(channel)
+    try:
+        yield f'retry: {settings.LIVE_UPDATES_RETRY_MS}\n\n'
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            message = await subscription.get(timeout=min(heartbeat_seconds, remaining))
+            if message is not None:
+                yield format_event(message)
+            elif loop.time() < deadline:
+                yield ': ping\n\n'
+    finally:
+        await subscription.close()
@@ -0,0 +1,138 @@
+from __future__ import annotations
+from django.db.models import Q, OuterRef, Subquery
+
+from apps.brolympics.models import (
+    Event_H2H,
+    Event_IND,
+    Event_Team,
+    Competition_H2H,
+    Competition_Ind,
+    Competition_Team,
+    BracketMatchup,
+    EventRanking_H2H,
+    CompetitionParticipation,
+)
+
+
+def team_related(*team_fields):
+    related = []
+    for field in team_fields:
+        related += [field, f'{field}__player_1', f'{field}__player_2']
+    return related
+
+
+H2H_RELATED = ['event'] + team_related('team_1', 'team_2', 'winner', 'loser')
+TEAM_COMP_RELATED = ['event'] + team_related('team')
+BRACKET_MATCHUP_RELATED = ['team_1', 'team_2', 'winner']
+
+
+def load_h2h_records(events):
+    '''
+    {(event_id, team_id): (wins, losses, ties)} for every H2H ranking in events. Passed
+    to BaseCompetitionSerializer as context['h2h_records'] so a page of competitions
+    builds its records from one query.
+    '''
+    rankings = EventRanking_H2H.objects.filter(event__in=events).values_list('event_id', 'team_id', 'wins', 'losses', 'ties')
+    return {(event_id, team_id): (wins, losses, ties) for event_id, team_id, wins, losses, ties in rankings}
+
+
+def load_bracket_matchups(brackets):
+    '''
+    {bracket_id: {matchup_id: matchup}} for every matchup in brackets, with its teams,
+    from one query. Passed to BracketSerializer as context['bracket_matchups'] so the
+    tree is put together in memory instead of following FKs a hop at a time.
+    '''
+    loaded = {bracket.pk: {} for bracket in brackets}
+    matchups = BracketMatchup.objects.filter(bracket__in=list(loaded)).select_related(*BRACKET_MATCHUP_RELATED).order_by('bracket_id', 'index')
+    for matchup in matchups:
+        loaded[matchup.bracket_id][matchup.pk] = matchup
+    return loaded
+
+
+def with_h2h_records(queryset):
+    '''
+    Annotates team_1/team_2 wins, losses and ties from EventRanking_H2H so
+    BaseCompetitionSerializer can build records without a query per row.
+    '''
+    annotations = {}
+    for slot in ['team_1', 'team_2']:
+        ranking = EventRanking_H2H.objects.filter(
+            event=OuterRef('event'),
+            team=OuterRef(slot),
+        )
+        for stat in ['wins', 'losses', 'ties']:
+            annotations[f'{slot}_{stat}'] = Subquery(ranking.values(stat)[:1])
+
+    return queryset.annotate(**annotations)
+
+
+class ActiveHomeLoader:
+    '''
+    Loads everything GetActiveHome renders for one brolympics in a fixed number
+    of queries, no matter how many events, competitions or teams there are.
+    '''
+    def __init__(self, brolympics, user):
+        self.brolympics = brolympics
+        self.user = user
+
+    ## Events ##
+    def _split_events(self, model):
+        events = list(
+            model.objects.filter(
+                Q(is_active=True) | Q(is_complete=False),
+                brolympics=self.brolympics,
+            ).with_completion_counts()
+        )
+        active = [event for event in events if event.is_active]
+        upcoming = [event for event in events if not event.is_active and not event.is_complete]
+        return active, upcoming
+
+    def load_events(self):
+        self.active_events = {}
+        self.upcoming_events = {}
+
+        for key, model in [('h2h', Event_H2H), ('ind', Event_IND), ('team', Event_Team)]:
+            active, upcoming = self._split_events(model)
+            self.active_events[key] = active
+            self.upcoming_events[key] = upcoming
+
+    ## Competitions ##
+    def _user_on_team(self, comp_type):
+        return Q(pk__in=CompetitionParticipation.comp_ids(self.user, comp_type, available=True))
+
+    def _h2h_queryset(self, model, events):
+        qset = model.objects.filter(event__in=events).select_related(*H2H_RELATED)
+        return with_h2h_records(qset).order_by('event_id', 'id')
+
+    def _team_queryset(self, model, events):
+        return model.objects.filter(event__in=events).select_related(*TEAM_COMP_RELATED).order_by('event_id', 'id')
+
+    def load_available(self):
+        h2h_events = self.active_events['h2h']
+        bracket_events = [event for event in h2h_events if event.is_round_robin_complete]
+
+        available_h2h = Q(is_complete=False, team_1__isnull=False, team_2__isnull=False)
+        available_team = Q(is_complete=False)
+
+        self.available = {
+            'std': list(self._h2h_queryset(Competition_H2H, h2h_events).filter(available_h2h, self._user_on_team('h2h'))),
+            'bracket': list(self._h2h_queryset(BracketMatchup, bracket_events).filter(available_h2h, self._user_on_team('bracket'))),
+            'ind': list(self._team_queryset(Competition_Ind, self.active_events['ind']).filter(available_team, self._user_on_team('ind'))),
+            'team': list(self._team_queryset(Competition_Team, self.active_events['team']).filter(available_team, self._user_on_team('team'))),
+        }
+
+    def load_active(self):
+        h2h_events = self.active_events['h2h']
+
+        self.active = {
+            'std': list(self._h2h_queryset(Competition_H2H, h2h_events).filter(is_active=True)),
+            'bracket': list(self._h2h_queryset(BracketMatchup, h2h_events).filter(is_active=True)),
+            'ind': list(self._team_queryset(Competition_Ind, self.active_events['ind']).filter(is_active=True)),
+            'team': list(self._team_queryset(Competition_Team, self.active_events['team']).filter(is_active=True)),
+        }
+
+    def load(self):
+        self.load_events()
+        self.load_available()
+        self.load_active()
+        return self
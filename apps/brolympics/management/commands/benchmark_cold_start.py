@@ -0,0 +1,80 @@
+from statistics import median
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so nothing is already imported or initialized
+COLD_START_SCRIPT = '''
+from time import perf_counter
+start = perf_counter()
+
+import json, sys
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+loaded = perf_counter()
+
+from django.conf import settings
+hosts = [host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')]
+environ = {
+    'PATH_INFO': sys.argv[1],
+    'REQUEST_METHOD': 'GET',
+    'HTTP_HOST': hosts[0] if hosts else 'localhost',
+    'wsgi.input': BytesIO(),
+}
+setup_testing_defaults(environ)
+
+statuses = []
+body = b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+responded = perf_counter()
+
+print(json.dumps({
+    'status': statuses[0],
+    'import_ms': (loaded - start) * 1000,
+    'first_response_ms': (responded - loaded) * 1000,
+    'total_ms': (responded - start) * 1000,
+}))
+'''
+
+PHASES = ['import_ms', 'first_response_ms', 'total_ms']
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures cold start, from a fresh interpreter importing the WSGI application to '
+        'its first response, the way a new Cloud Run instance or gunicorn worker boots.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--path', default='/api/set-csrf-token/')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        runs = [self.run_once(options['path'], env) for _ in range(options['repeat'])]
+
+        self.stdout.write(f'Cold start for {options["path"]} over {len(runs)} runs (status {runs[0]["status"]})')
+        self.stdout.write(f'{"":<20} {"min":>10} {"median":>10} {"max":>10}')
+        for phase in PHASES:
+            values = [run[phase] for run in runs]
+            self.stdout.write(f'{phase:<20} {min(values):10.1f} {median(values):10.1f} {max(values):10.1f}')
+
+    def run_once(self, path, env):
+        result = subprocess.run(
+            [sys.executable, '-c', COLD_START_SCRIPT, path],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Cold start failed:\n{result.stderr}')
+
+        # Settings modules may print while loading, the timings are the last line
+        return json.loads(result.stdout.strip().splitlines()[-1])
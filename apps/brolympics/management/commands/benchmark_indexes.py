@@ -0,0 +1,142 @@
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from apps.brolympics.models import *
+
+User = get_user_model()
+
+INDEXED_MODELS = [
+    Team,
+    Competition_Team,
+    Competition_Ind,
+    Competition_H2H,
+    BracketMatchup,
+    EventRanking_Team,
+    EventRanking_Ind,
+    EventRanking_H2H,
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway dataset and reports query plans and timings for the hot competition '
+        'and ranking filters with and without the model indexes. Everything is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--brolympics', type=int, default=10)
+        parser.add_argument('--teams', type=int, default=12)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--plans', action='store_true', help='Print EXPLAIN output for every query')
+
+    def handle(self, *args, **options):
+        if not connection.features.can_rollback_ddl:
+            raise CommandError(f'{connection.vendor} cannot roll back index changes, run this against Postgres or SQLite.')
+
+        try:
+            with transaction.atomic():
+                user, events = self.seed(options['brolympics'], options['teams'])
+                queries = self.get_queries(user, events)
+
+                self.analyze()
+                with_indexes = self.report('With indexes', queries, options)
+
+                self.drop_indexes()
+                self.analyze()
+                without_indexes = self.report('Without indexes', queries, options)
+
+                self.summarize(with_indexes, without_indexes)
+                raise Rollback
+        except Rollback:
+            pass
+
+    ## Dataset ##
+    def seed(self, n_brolympics, n_teams):
+        owner = User.objects.create_user(uid='benchmark-owner', phone='0000000000', email='owner@benchmark.test', password='benchmark')
+        players = [
+            User.objects.create_user(uid=f'benchmark-{i}', phone=f'{i+1:010d}', email=f'player{i}@benchmark.test', password='benchmark')
+            for i in range(n_teams * 2)
+        ]
+        league = League.objects.create(name='Benchmark League', league_owner=owner)
+
+        events = []
+        for i in range(n_brolympics):
+            brolympics = Brolympics.objects.create(league=league, name=f'Benchmark {i+1}')
+            Team.objects.bulk_create([
+                Team(brolympics=brolympics, name=f'Team {j+1}', player_1=players[2*j], player_2=players[2*j+1])
+                for j in range(n_teams)
+            ])
+
+            h2h_event = Event_H2H.objects.create(brolympics=brolympics, name='h2h', n_matches=min(n_teams-1, 6))
+            ind_event = Event_IND.objects.create(brolympics=brolympics, name='ind')
+            team_event = Event_Team.objects.create(brolympics=brolympics, name='team')
+            for event in [h2h_event, ind_event, team_event]:
+                event.start()
+            events.append((h2h_event, ind_event, team_event))
+
+        self.stdout.write(f'Seeded {n_brolympics} brolympics with {n_teams} teams and three started events each')
+        return players[0], events
+
+    def get_queries(self, user, events):
+        h2h_event, ind_event, team_event = events[len(events) // 2]
+        team = team_event.brolympics.teams.order_by('id').first()
+
+        return {
+            'available h2h comps': lambda: h2h_event.find_available_comps(user)['std'],
+            'available bracket matchups': lambda: h2h_event.find_available_comps(user)['bracket'],
+            'available ind comps': lambda: ind_event.find_available_comps(user),
+            'available team comps': lambda: team_event.find_available_comps(user),
+            'active h2h comps': lambda: h2h_event.find_active_comps()['std'],
+            'incomplete ind comps': lambda: Competition_Ind.objects.filter(event=ind_event, is_complete=False),
+            'team completed comps': lambda: Competition_Team.objects.filter(event=team_event, team=team, is_complete=True),
+            'team h2h comps': lambda: Competition_H2H.objects.filter(Q(team_1=team) | Q(team_2=team), event=h2h_event),
+            'ranking by team': lambda: EventRanking_H2H.objects.filter(event=h2h_event, team=team),
+            'ranking by rank': lambda: EventRanking_Team.objects.filter(event=team_event, rank=1),
+        }
+
+    ## Measuring ##
+    def analyze(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def report(self, title, queries, options):
+        self.stdout.write(f'\n## {title} ##')
+        timings = {}
+        for name, get_queryset in queries.items():
+            start = perf_counter()
+            for _ in range(options['repeat']):
+                list(get_queryset())
+            timings[name] = (perf_counter() - start) / options['repeat'] * 1000
+
+            self.stdout.write(f'{name:<30} {timings[name]:8.3f} ms')
+            if options['plans']:
+                for line in get_queryset().explain().splitlines():
+                    self.stdout.write(f'    {line}')
+        return timings
+
+    def drop_indexes(self):
+        # Only what the models declare, the FK and uuid indexes Django adds are left alone
+        schema_editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    cursor.execute(str(index.remove_sql(model, schema_editor)))
+                # SQLite can only drop a unique constraint by rebuilding the table
+                if connection.vendor == 'postgresql':
+                    for constraint in model._meta.constraints:
+                        cursor.execute(str(constraint.remove_sql(model, schema_editor)))
+
+    def summarize(self, with_indexes, without_indexes):
+        self.stdout.write('\n## Speedup ##')
+        for name, indexed in with_indexes.items():
+            speedup = without_indexes[name] / indexed if indexed else 0
+            self.stdout.write(f'{name:<30} {speedup:6.2f}x')
@@ -0,0 +1,61 @@
+from statistics import median
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.brolympics.scheduler import schedule_round_robin
+
+
+class Command(BaseCommand):
+    help = (
+        'Times the round robin scheduler for a range of field sizes and checks every '
+        'schedule for repeated pairings, double booked rounds and home/away balance.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teams', type=int, nargs='+', default=[10, 50, 100, 250, 500, 1000])
+        parser.add_argument('--matches', type=int, default=6, help='Rounds per team, ignored with --full')
+        parser.add_argument('--full', action='store_true', help='Schedule a complete round robin')
+        parser.add_argument('--avoid', type=float, default=0, help='Fraction of the first round to mark as previous opponents')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"teams":>6} {"rounds":>6} {"pairings":>9} {"median ms":>10} {"max ms":>8} {"max h/a gap":>11}')
+        for n_teams in options['teams']:
+            n_rounds = n_teams - 1 if options['full'] else options['matches']
+            teams = list(range(n_teams))
+            avoid = self.get_avoid(teams, options['avoid'])
+
+            timings = []
+            for seed in range(options['repeat']):
+                start = perf_counter()
+                pairings = schedule_round_robin(teams, n_rounds, seed=seed, avoid=avoid)
+                timings.append((perf_counter() - start) * 1000)
+
+            gap = self.verify(pairings, n_teams)
+            rounds = max((pairing.round for pairing in pairings), default=0)
+            self.stdout.write(f'{n_teams:>6} {rounds:>6} {len(pairings):>9} {median(timings):>10.2f} {max(timings):>8.2f} {gap:>11}')
+
+    def get_avoid(self, teams, fraction):
+        # Neighbouring teams, as if they met in an earlier event
+        n_pairs = int(len(teams) // 2 * fraction)
+        return {frozenset([teams[2*i], teams[2*i+1]]) for i in range(n_pairs)}
+
+    def verify(self, pairings, n_teams):
+        seen = set()
+        booked = set()
+        home, games = [0] * n_teams, [0] * n_teams
+        for pairing in pairings:
+            pair = frozenset([pairing.team_1, pairing.team_2])
+            if pair in seen:
+                raise CommandError(f'{n_teams} teams: {sorted(pair)} are paired twice.')
+            seen.add(pair)
+
+            for team in pair:
+                if (pairing.round, team) in booked:
+                    raise CommandError(f'{n_teams} teams: team {team} plays twice in round {pairing.round}.')
+                booked.add((pairing.round, team))
+                games[team] += 1
+            home[pairing.team_1] += 1
+
+        return max((abs(2 * home[team] - games[team]) for team in range(n_teams)), default=0)
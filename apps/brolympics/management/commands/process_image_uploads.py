@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.brolympics.models import ImageUpload
+from apps.image_pipeline import image_pipeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Processes image uploads a worker never finished: pending ones lost to a restart, '
+        'failed ones under IMAGE_PIPELINE_MAX_ATTEMPTS and ones stuck processing. Meant to '
+        'run periodically, e.g. from cron every few minutes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='List the uploads without processing them')
+
+    def handle(self, *args, **options):
+        # Skip pending uploads young enough to still be queued on a live worker
+        cutoff = timezone.now() - timedelta(seconds=settings.IMAGE_PIPELINE_STALE_SECONDS)
+        uploads = ImageUpload.objects.filter(
+            Q(status='pending') | Q(status='failed') | Q(status='processing'),
+            updated_at__lt=cutoff,
+            attempts__lt=settings.IMAGE_PIPELINE_MAX_ATTEMPTS,
+        ).order_by('pk').values_list('pk', 'model_label', 'object_pk')
+
+        n_done, n_failed = 0, 0
+        for pk, model_label, object_pk in uploads:
+            self.stdout.write(f'{pk}: {model_label} {object_pk}')
+            if options['dry_run']:
+                continue
+
+            try:
+                if image_pipeline.process_upload(pk, retry=True) is not None:
+                    n_done += 1
+            except Exception as e:
+                n_failed += 1
+                self.stderr.write(f'{pk}: {e!r}')
+
+        if options['dry_run']:
+            self.stdout.write(f'Would process {len(uploads)} uploads')
+        else:
+            self.stdout.write(f'Processed {n_done} uploads, {n_failed} failed')
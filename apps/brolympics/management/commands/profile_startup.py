@@ -0,0 +1,106 @@
+from dataclasses import dataclass, field
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a worker does before it can serve: load the WSGI app and the URLconf with every view
+BOOT_SCRIPT = '''
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+application = get_wsgi_application()
+get_resolver().url_patterns
+'''
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+@dataclass
+class ImportNode:
+    name: str
+    self_us: int
+    cumulative_us: int
+    children: list = field(default_factory=list)
+
+    @property
+    def cumulative_ms(self):
+        return self.cumulative_us / 1000
+
+    def find(self, prefixes):
+        # Yields the import chain down to every module under one of the prefixes
+        if any(self.name == prefix or self.name.startswith(prefix + '.') for prefix in prefixes):
+            yield [self.name]
+            return
+        for child in self.children:
+            for chain in child.find(prefixes):
+                yield [self.name] + chain
+
+
+def parse_importtime(lines):
+    '''
+    Builds the import tree from -X importtime output. A module is printed after
+    everything it imported, one indent level deeper than it.
+    '''
+    pending = {}
+    for line in lines:
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        depth = len(indent) // 2
+        node = ImportNode(name, int(self_us), int(cumulative_us), pending.pop(depth + 1, []))
+        pending.setdefault(depth, []).append(node)
+    return pending.get(0, [])
+
+
+class Command(BaseCommand):
+    help = (
+        'Profiles the imports a worker makes at boot with -X importtime, prints the heaviest '
+        'branches and fails when the total exceeds the budget or a lazy module is imported.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget-ms', type=float, default=settings.STARTUP_IMPORT_BUDGET_MS)
+        parser.add_argument('--lazy', nargs='*', default=settings.STARTUP_LAZY_MODULES, help='Modules that must not be imported at boot')
+        parser.add_argument('--threshold-ms', type=float, default=10, help='Hide imports cheaper than this')
+        parser.add_argument('--depth', type=int, default=3)
+
+    def handle(self, *args, **options):
+        roots = self.profile()
+        total_ms = sum(root.cumulative_ms for root in roots)
+
+        for root in sorted(roots, key=lambda root: root.cumulative_us, reverse=True):
+            self.write_node(root, 0, options)
+        self.stdout.write(f'\nTotal import time {total_ms:.1f} ms (budget {options["budget_ms"]:.0f} ms)')
+
+        errors = []
+        if total_ms > options['budget_ms']:
+            errors.append(f'Import time {total_ms:.1f} ms is over the {options["budget_ms"]:.0f} ms budget.')
+        for root in roots:
+            for chain in root.find(options['lazy']):
+                errors.append(f'{chain[-1]} is imported at boot: {" -> ".join(chain)}')
+        if errors:
+            raise CommandError('\n'.join(errors))
+
+    def profile(self):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Boot failed:\n{result.stderr}')
+        return parse_importtime(result.stderr.splitlines())
+
+    def write_node(self, node, depth, options):
+        if node.cumulative_ms < options['threshold_ms'] or depth >= options['depth']:
+            return
+        self.stdout.write(f'{node.cumulative_ms:9.1f} ms  {"  " * depth}{node.name}')
+        for child in sorted(node.children, key=lambda child: child.cumulative_us, reverse=True):
+            self.write_node(child, depth + 1, options)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.brolympics.current_comp import get_active_comps, get_stale_candidates, repair_current_comp
+
+
+class Command(BaseCommand):
+    help = (
+        "Repairs users' current competition pointers and availability against the active "
+        'competitions. Meant to run periodically, e.g. from cron every few minutes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report stale users without changing them')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            active = get_active_comps()
+            n_checked, n_repaired = 0, 0
+
+            for user in get_stale_candidates(active).select_for_update():
+                n_checked += 1
+                if repair_current_comp(user, active, commit=not options['dry_run']):
+                    n_repaired += 1
+                    self.stdout.write(f'{user.uid}: {active.get(user.uid, "no active competition")}')
+
+        verb = 'would repair' if options['dry_run'] else 'repaired'
+        self.stdout.write(f'Checked {n_checked} users, {verb} {n_repaired}')
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.2 on 2026-10-18 06:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brolympics', '0025_alter_event_h2h_location_alter_event_ind_location_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='brolympics',
+            name='img_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='league',
+            name='img_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='img_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
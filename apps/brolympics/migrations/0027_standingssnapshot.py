@@ -0,0 +1,24 @@
+# Generated by Django 4.2.2 on 2026-10-18 06:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brolympics', '0026_brolympics_img_variants_league_img_variants_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StandingsSnapshot',
+            fields=[
+                ('uuid', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('data', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('brolympics', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='standings_snapshot', to='brolympics.brolympics')),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.2 on 2026-10-18 07:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brolympics', '0027_standingssnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='brolympics',
+            name='revised_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='brolympics',
+            name='revision',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
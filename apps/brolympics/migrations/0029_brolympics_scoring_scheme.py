@@ -0,0 +1,23 @@
+# Generated by Django 4.2.2 on 2026-10-18 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brolympics', '0028_brolympics_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='brolympics',
+            name='points_table',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='brolympics',
+            name='scoring_scheme',
+            field=models.CharField(choices=[('bonus', 'Bonus'), ('linear', 'Linear'), ('f1', 'F1'), ('custom', 'Custom')], default='bonus', max_length=12),
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 4.2.2 on 2026-10-18 07:14
+
+from django.db import migrations, models
+
+
+def remove_duplicate_rankings(apps, schema_editor):
+    # Keep the oldest ranking per (event, team) so the unique constraints can be added
+    for model_name in ['EventRanking_H2H', 'EventRanking_Ind', 'EventRanking_Team']:
+        model = apps.get_model('brolympics', model_name)
+        seen = set()
+        duplicates = []
+        for pk, event_id, team_id in model.objects.order_by('id').values_list('id', 'event_id', 'team_id'):
+            if (event_id, team_id) in seen:
+                duplicates.append(pk)
+            seen.add((event_id, team_id))
+        model.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brolympics', '0029_brolympics_scoring_scheme'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bracketmatchup',
+            index=models.Index(fields=['team_1', 'event', 'is_complete'], name='bracket_team_1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bracketmatchup',
+            index=models.Index(fields=['team_2', 'event', 'is_complete'], name='bracket_team_2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bracketmatchup',
+            index=models.Index(condition=models.Q(('is_complete', False)), fields=['event'], name='bracket_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bracketmatchup',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['event'], name='bracket_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='competition_h2h',
+            index=models.Index(fields=['team_1', 'event', 'is_complete'], name='h2h_comp_team_1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='competition_h2h',
+            index=models.Index(fields=['team_2', 'event', 'is_complete'], name='h2h_comp_team_2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='competition_h2h',
+            index=models.Index(condition=models.Q(('is_complete', False)), fields=['event'], name='h2h_comp_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='competition_h2h',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['event'], name='h2h_comp_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='competition_ind',
+            index=models.Index(fields=['team', 'event', 'is_complete'], name='ind_comp_team_event_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='competition_ind',
+            index=models.Index(condition=models.Q(('is_complete', False)), fields=['event'], name='ind_comp_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='competition_ind',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['event'], name='ind_comp_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='competition_team',
+            index=models.Index(fields=['team', 'event', 'is_complete'], name='team_comp_team_event_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='competition_team',
+            index=models.Index(condition=models.Q(('is_complete', False)), fields=['event'], name='team_comp_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='competition_team',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['event'], name='team_comp_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventranking_h2h',
+            index=models.Index(fields=['event', 'rank'], name='h2h_ranking_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventranking_ind',
+            index=models.Index(fields=['event', 'rank'], name='ind_ranking_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventranking_team',
+            index=models.Index(fields=['event', 'rank'], name='team_ranking_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(fields=['player_1', 'is_available'], name='team_player_1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(fields=['player_2', 'is_available'], name='team_player_2_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_rankings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='eventranking_h2h',
+            constraint=models.UniqueConstraint(fields=('event', 'team'), name='unique_h2h_ranking_event_team'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventranking_ind',
+            constraint=models.UniqueConstraint(fields=('event', 'team'), name='unique_ind_ranking_event_team'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventranking_team',
+            constraint=models.UniqueConstraint(fields=('event', 'team'), name='unique_team_ranking_event_team'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.2 on 2026-10-18 07:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def get_status(comp):
+    if comp.is_complete:
+        return 'complete'
+    if comp.is_active:
+        return 'active'
+    if comp.start_time is None:
+        return 'upcoming'
+    return 'paused'
+
+
+def backfill_participations(apps, schema_editor):
+    CompetitionParticipation = apps.get_model('brolympics', 'CompetitionParticipation')
+    comp_models = [
+        ('h2h', 'Competition_H2H', ['team_1', 'team_2']),
+        ('bracket', 'BracketMatchup', ['team_1', 'team_2']),
+        ('ind', 'Competition_Ind', ['team']),
+        ('team', 'Competition_Team', ['team']),
+    ]
+
+    for comp_type, model_name, team_fields in comp_models:
+        model = apps.get_model('brolympics', model_name)
+        participations = []
+        for comp in model.objects.select_related(*team_fields).iterator():
+            for field in team_fields:
+                team = getattr(comp, field)
+                if team is None:
+                    continue
+                for user_id in {team.player_1_id, team.player_2_id} - {None}:
+                    participations.append(CompetitionParticipation(
+                        user_id=user_id,
+                        team=team,
+                        brolympics_id=team.brolympics_id,
+                        comp_type=comp_type,
+                        comp_id=comp.pk,
+                        comp_uuid=comp.uuid,
+                        status=get_status(comp),
+                    ))
+        CompetitionParticipation.objects.bulk_create(participations, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('brolympics', '0030_competition_ranking_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompetitionParticipation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('comp_type', models.CharField(choices=[('h2h', 'Head to Head'), ('bracket', 'Bracket'), ('ind', 'Individual'), ('team', 'Team')], max_length=8)),
+                ('comp_id', models.PositiveBigIntegerField()),
+                ('comp_uuid', models.UUIDField()),
+                ('status', models.CharField(choices=[('upcoming', 'Upcoming'), ('active', 'Active'), ('paused', 'Paused'), ('complete', 'Complete')], default='upcoming', max_length=8)),
+                ('brolympics', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participations', to='brolympics.brolympics')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participations', to='brolympics.team')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'status'], name='participation_status_idx'), models.Index(fields=['comp_type', 'comp_id'], name='participation_comp_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='competitionparticipation',
+            constraint=models.UniqueConstraint(fields=('comp_type', 'comp_id', 'team', 'user'), name='unique_participation'),
+        ),
+        migrations.RunPython(backfill_participations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.2 on 2026-10-18 07:33
+
+import apps.brolympics.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brolympics', '0031_competitionparticipation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event_h2h',
+            name='rules',
+            field=apps.brolympics.fields.RichTextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='event_ind',
+            name='rules',
+            field=apps.brolympics.fields.RichTextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='event_team',
+            name='rules',
+            field=apps.brolympics.fields.RichTextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.2 on 2026-10-18 07:39
+
+from django.db import migrations, models
+
+
+def number_legacy_matchups(apps, schema_editor):
+    # Existing brackets are all the four team layout: two semifinals, the final and the third place match
+    Bracket_4 = apps.get_model('brolympics', 'Bracket_4')
+    BracketMatchup = apps.get_model('brolympics', 'BracketMatchup')
+
+    for bracket in Bracket_4.objects.select_related('championship'):
+        positions = {}
+        if bracket.championship_id:
+            positions[bracket.championship.left_id] = (0, 'winners', 1)
+            positions[bracket.championship.right_id] = (1, 'winners', 1)
+            positions[bracket.championship_id] = (2, 'winners', 2)
+        if bracket.loser_bracket_finals_id:
+            positions[bracket.loser_bracket_finals_id] = (3, 'third', 1)
+        positions.pop(None, None)
+
+        matchups = list(BracketMatchup.objects.filter(bracket=bracket).order_by('id'))
+        extra_index = 4
+        for matchup in matchups:
+            if matchup.pk in positions:
+                matchup.index, matchup.side, matchup.round = positions[matchup.pk]
+            else:
+                matchup.index = extra_index
+                extra_index += 1
+        BracketMatchup.objects.bulk_update(matchups, ['index', 'side', 'round'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brolympics', '0032_lazy_rich_text_field'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bracket_4',
+            name='is_double_elimination',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='bracketmatchup',
+            name='index',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bracketmatchup',
+            name='is_bye',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='bracketmatchup',
+            name='round',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='bracketmatchup',
+            name='side',
+            field=models.CharField(choices=[('winners', 'Winners'), ('losers', 'Losers'), ('third', 'Third Place'), ('final', 'Grand Final')], default='winners', max_length=7),
+        ),
+        migrations.AddField(
+            model_name='event_h2h',
+            name='bracket_type',
+            field=models.CharField(choices=[('single', 'Single Elimination'), ('double', 'Double Elimination')], default='single', max_length=6),
+        ),
+        migrations.RunPython(number_legacy_matchups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='bracketmatchup',
+            constraint=models.UniqueConstraint(fields=('bracket', 'index'), name='unique_bracket_matchup_index'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.2 on 2026-10-18 07:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brolympics', '0033_bracket_engine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competition_h2h',
+            name='round',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
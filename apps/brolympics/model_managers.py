@@ -1,2 +1,36 @@
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
+
+def percent(part, total):
+    if total == 0:
+        return 0
+    return round((part / total) * 100)
+
+
+class EventQuerySet(models.QuerySet):
+    def _count_comps(self, related_name, **filters):
+        comp_model = self.model._meta.get_field(related_name).related_model
+        comps = (
+            comp_model.objects.filter(event=OuterRef('pk'), **filters)
+            .order_by()
+            .values('event')
+            .annotate(n=Count('pk'))
+            .values('n')
+        )
+        return Coalesce(Subquery(comps, output_field=IntegerField()), 0)
+
+    def with_completion_counts(self):
+        '''
+        Annotates n_comps and n_comps_complete on every event in the same query, so
+        get_percent_complete is free at serialization time.
+        '''
+        n_comps, n_comps_complete = None, None
+        for related_name in self.model.completion_relations:
+            total = self._count_comps(related_name)
+            complete = self._count_comps(related_name, is_complete=True)
+            n_comps = total if n_comps is None else n_comps + total
+            n_comps_complete = complete if n_comps_complete is None else n_comps_complete + complete
+
+        return self.annotate(n_comps=n_comps, n_comps_complete=n_comps_complete)
@@ -3,20 +3,89 @@ from django.db import models
 from django.contrib.auth import get_user_model
 import random
 from django.utils import timezone
-from django.db.models import Q, Avg, Sum
+from django.db.models import Q, Avg, Sum, Count
 from uuid import uuid4
-from django.db.models.signals import pre_delete
-from django.dispatch import receiver
+from django.db.models.signals import pre_delete, post_save, post_delete
+from django.dispatch import receiver, Signal
 from django.db import transaction
 from collections import defaultdict, Counter
 from typing import Callable
+from functools import wraps
+from threading import local
 from django.db.models import F, ExpressionWrapper, FloatField
-from ckeditor.fields import RichTextField
 
 from apps.custom_storage import FirebaseStorage
+from apps.brolympics.fields import RichTextField
+from apps.brolympics.tie_breaker import TieBreaker
+from apps.brolympics.bracket_engine import BRACKET_SIDES, BRACKET_TYPES, WINNERS, plan_bracket
+from apps.brolympics.scheduler import schedule_round_robin
+from apps.brolympics.model_managers import EventQuerySet, percent
+from apps.brolympics.points import SCORING_SCHEMES, DEFAULT_SCORING_SCHEME, get_brolympics_points_table, invalidate_n_teams
 
 User = get_user_model()
 
+H2H_RANKING_UPDATE_FIELDS = [
+    'wins', 
+    'losses', 
+    'ties', 
+    'win_rate', 
+    'score_for', 
+    'score_against', 
+    'sos_wins', 
+    'sos_losses', 
+    'sos_ties', 
+    'rank', 
+    'points',
+]
+
+TEAM_SCORE_FIELDS = ['team_total_score', 'team_avg_score']
+IND_SCORE_FIELDS = [
+    'player_1_total_score',
+    'player_1_avg_score',
+    'player_2_total_score',
+    'player_2_avg_score',
+] + TEAM_SCORE_FIELDS
+TEAM_RANKING_UPDATE_FIELDS = TEAM_SCORE_FIELDS + ['rank', 'points']
+IND_RANKING_UPDATE_FIELDS = IND_SCORE_FIELDS + ['rank', 'points']
+
+OVERALL_EVENT_FIELDS = ['total_points', 'event_wins', 'event_podiums']
+OVERALL_RECORD_FIELDS = ['wins', 'losses', 'ties']
+
+REVISION_FIELDS = ('revision', 'revised_at')
+
+_revision_state = local()
+
+# Sent once per outermost state change, feeds the live update stream
+revision_bumped = Signal()
+
+def bumps_revision(get_brolympics_id):
+    '''
+    Bumps the owning brolympics revision once the decorated method returns. Nested
+    state changes (comp.end -> event.finalize -> ...) only bump once, from the outermost call.
+    '''
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            depth = getattr(_revision_state, 'depth', 0)
+            _revision_state.depth = depth + 1
+            try:
+                result = method(self, *args, **kwargs)
+            finally:
+                _revision_state.depth = depth
+
+            if depth == 0:
+                brolympics_id = get_brolympics_id(self)
+                Brolympics.bump_revision(brolympics_id)
+                revision_bumped.send(
+                    sender=type(self),
+                    instance=self,
+                    action=method.__name__,
+                    brolympics_id=brolympics_id,
+                )
+            return result
+        return wrapper
+    return decorator
+
 # Create your models here.
 def get_default_image(path, max=8):
     i = random.randint(1,max)
@@ -32,6 +101,7 @@ class League(models.Model):
     founded = models.DateTimeField(auto_now_add=True)
     uuid = models.UUIDField(unique=True, editable=False, default=uuid4)
     img = models.ImageField(storage=FirebaseStorage(), null=True)
+    img_variants = models.JSONField(default=dict, blank=True)
 
     players = models.ManyToManyField(User, related_name='leagues', blank=True)
 
@@ -80,14 +150,40 @@ class Brolympics(models.Model):
 
     uuid = models.UUIDField(unique=True, editable=False, default=uuid4)
     img = models.ImageField(storage=FirebaseStorage(), null=True)
+    img_variants = models.JSONField(default=dict, blank=True)
 
     players = models.ManyToManyField(User, related_name='brolympics', blank=True,)
 
+    # Rank -> points for every event, custom uses points_table (first place first)
+    scoring_scheme = models.CharField(max_length=12, choices=SCORING_SCHEMES, default=DEFAULT_SCORING_SCHEME)
+    points_table = models.JSONField(default=list, blank=True)
+
+    # Bumped by every state change, read views build their ETag/Last-Modified from it
+    revision = models.PositiveBigIntegerField(default=0)
+    revised_at = models.DateTimeField(default=timezone.now)
+
+    @bumps_revision(lambda brolympics: brolympics.pk)
     def save(self, *args, **kwargs):
         if not self.img:
             self.img = get_default_image('default_league', 8)
+
+        # The revision is only ever moved by bump_revision, a stale instance must not write it back
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in REVISION_FIELDS
+            ]
         super().save(*args, **kwargs)
 
+    @classmethod
+    def bump_revision(cls, brolympics_id):
+        if brolympics_id is None:
+            return
+        cls.objects.filter(pk=brolympics_id).update(
+            revision=F('revision') + 1,
+            revised_at=timezone.now(),
+        )
+
     def get_available_teams(self):
         return self.teams.filter(is_available=True)
     
@@ -116,40 +212,76 @@ class Brolympics(models.Model):
         return (team_1, team_2) in pairs_set or (team_2, team_1) in pairs_set
     
             
-    def update_ranks(self):
-        overall_rankings = self.overall_ranking.all()
+    def update_ranks(self, overall_rankings=None, changed_fields=()):
+        if overall_rankings is None:
+            overall_rankings = list(self.overall_ranking.all())
         points_map = self._group_by_score(overall_rankings)
         ordered_teams = self._order_by_score(points_map)
-        self._set_rankings(ordered_teams)
+        self._set_rankings(ordered_teams, changed_fields)
 
-    def force_full_rankings_update(self):
-        all_events = self.get_all_events()
-
-        new_scores = defaultdict(int)
-        for h2h_event in all_events['h2h']:
-            for team_ranking in h2h_event.event_h2h_event_rankings.all():
-                new_scores[team_ranking.team] += team_ranking.points
-
-        for ind_event in all_events['ind']:
-            for team_ranking in ind_event.event_ind_event_rankings.all():
-                new_scores[team_ranking.team] += team_ranking.points
-
-        for team_event in all_events['team']:
-            for team_ranking in team_event.event_team_event_rankings.all():
-                new_scores[team_ranking.team] += team_ranking.points
+        from apps.brolympics.snapshots import rebuild_standings_snapshot
+        rebuild_standings_snapshot(self)
 
-        overall_rankings = self.overall_ranking.all()
+    def force_full_rankings_update(self):
+        # Points count every event ranking, wins/podiums/records only count finalized events
+        totals = defaultdict(lambda: defaultdict(float))
+        final = Q(is_final=True)
+        for ranking_model, is_h2h in [(EventRanking_H2H, True), (EventRanking_Ind, False), (EventRanking_Team, False)]:
+            aggregates = {
+                'total_points': Sum('points'),
+                'event_wins': Count('pk', filter=final & Q(rank=1)),
+                'event_podiums': Count('pk', filter=final & Q(rank__lte=3)),
+            }
+            if is_h2h:
+                aggregates.update({
+                    'wins': Sum('wins', filter=final),
+                    'losses': Sum('losses', filter=final),
+                    'ties': Sum('ties', filter=final),
+                })
+
+            team_totals = ranking_model.objects.filter(
+                event__brolympics=self
+            ).values('team').annotate(**aggregates).order_by()
+
+            for team_total in team_totals:
+                team_id = team_total.pop('team')
+                for field, value in team_total.items():
+                    totals[team_id][field] += value or 0
+
+        overall_rankings = list(self.overall_ranking.all())
         for ranking in overall_rankings:
-            ranking.total_points = new_scores[ranking.team]
-            ranking.save()
+            team_totals = totals[ranking.team_id]
+            ranking.total_points = team_totals['total_points']
+            for field in OVERALL_EVENT_FIELDS[1:] + OVERALL_RECORD_FIELDS:
+                setattr(ranking, field, int(team_totals[field]))
     
-        self.update_ranks()
-
+        self.update_ranks(overall_rankings, OVERALL_EVENT_FIELDS + OVERALL_RECORD_FIELDS)
 
+    def add_event_to_overall_rankings(self, event_rankings, include_record=False):
+        team_to_event_ranking = {
+            event_ranking.team_id: event_ranking
+            for event_ranking in event_rankings
+        }
 
+        overall_rankings = list(self.overall_ranking.all())
+        for ranking in overall_rankings:
+            event_ranking = team_to_event_ranking.get(ranking.team_id)
+            if event_ranking is None:
+                continue
 
+            if event_ranking.rank <= 3:
+                ranking.event_podiums += 1
+            if event_ranking.rank == 1:
+                ranking.event_wins += 1
 
+            if include_record:
+                ranking.wins += event_ranking.wins
+                ranking.losses += event_ranking.losses
+                ranking.ties += event_ranking.ties
+            ranking.total_points += event_ranking.points
 
+        changed_fields = OVERALL_EVENT_FIELDS + (OVERALL_RECORD_FIELDS if include_record else [])
+        self.update_ranks(overall_rankings, changed_fields)
 
     def _group_by_score(self, overall_rankings):
         score_to_team = {}
@@ -166,14 +298,17 @@ class Brolympics(models.Model):
         sorted_scores = sorted(score_map.keys(), reverse=True)
         return [score_map[score] for score in sorted_scores]
     
-    def _set_rankings(self, ordered_teams):
+    def _set_rankings(self, ordered_teams, changed_fields=()):
         rank_counter = 1
+        rankings = []
         for ranking_group in ordered_teams:
             for team in ranking_group:
                 team.rank=rank_counter
-                team.save()
+                rankings.append(team)
 
             rank_counter += len(ranking_group)
+
+        OverallBrolympicsRanking.objects.bulk_update(rankings, ['rank', *changed_fields])
    
 
     def _create_ranking_objs(self):
@@ -202,6 +337,12 @@ class Brolympics(models.Model):
         )
 
 
+    @bumps_revision(lambda brolympics: brolympics.pk)
+    def apply_score_batch(self, results):
+        from apps.brolympics.score_batch import ScoreBatch
+        return ScoreBatch(self, results).apply()
+
+    @bumps_revision(lambda brolympics: brolympics.pk)
     def start(self):
         self.start_time = timezone.now()
         self.is_registration_open = False
@@ -209,6 +350,7 @@ class Brolympics(models.Model):
         self._create_ranking_objs()
         self.save()
 
+    @bumps_revision(lambda brolympics: brolympics.pk)
     def end(self):
         self.end_time = timezone.now()
         self.is_active = False
@@ -242,6 +384,59 @@ class OverallBrolympicsRanking(models.Model):
     def __str__(self):
         return self.team.name + ' - ' + self.brolympics.name
 
+
+class StandingsSnapshot(models.Model):
+    # Keyed by the brolympics uuid so the standings endpoint is a single primary key read
+    uuid = models.UUIDField(primary_key=True, editable=False)
+    brolympics = models.OneToOneField(
+        Brolympics,
+        on_delete=models.CASCADE,
+        related_name='standings_snapshot'
+    )
+
+    version = models.PositiveIntegerField(default=0)
+    data = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def etag(self):
+        return f'"{self.uuid}-{self.version}"'
+
+    def __str__(self):
+        return self.brolympics.name + ' Standings v' + str(self.version)
+
+class ImageUpload(models.Model):
+    '''
+    A raw image waiting on the image pipeline, saved with the request so a restart does
+    not lose it. process_image_uploads retries whatever was left pending or failed.
+    '''
+    STATUSES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('superseded', 'Superseded'),
+    )
+
+    model_label = models.CharField(max_length=64)
+    object_pk = models.CharField(max_length=150)
+    field_name = models.CharField(max_length=32, default='img')
+
+    raw = models.BinaryField()
+    status = models.CharField(max_length=10, choices=STATUSES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='image_upload_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.model_label} {self.object_pk} {self.field_name} - {self.status}'
+
 score_type = (
     ('B', 'Binary'),
     ('I', 'Integer'),
@@ -279,9 +474,20 @@ class EventAbstactBase(models.Model):
     location = models.CharField(max_length=260,null=True, blank=True)
     rules = RichTextField(null=True, blank=True)
 
+    objects = EventQuerySet.as_manager()
+
     class Meta:
         abstract = True
 
+    @bumps_revision(lambda event: event.brolympics_id)
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+    @bumps_revision(lambda event: event.brolympics_id)
+    def delete(self, *args, **kwargs):
+        return super().delete(*args, **kwargs)
+
+    @bumps_revision(lambda event: event.brolympics_id)
     def start(self):
         self.start_time = timezone.now()
         self.is_active = True
@@ -290,25 +496,10 @@ class EventAbstactBase(models.Model):
         self.save()
 
     def _get_score_to_rank(self, team_n_override=None):
-        score_map = defaultdict()
-        n_teams = len(self.brolympics.teams.all())
-        if team_n_override:
-            n_teams = team_n_override
-
-        for i in range(n_teams):
-            rank = i+1
-            score = n_teams - i
-            if rank == 1:
-                score += 4
-            if rank == 2:
-                score += 2
-            if rank == 3:
-                score += 1
-            
-            score_map[rank] = score         
-
-        return score_map
+        # Memoized per (n_teams, scheme), the roster size is cached until a team is added or removed
+        return get_brolympics_points_table(self.brolympics, team_n_override or None)
 
+    @bumps_revision(lambda event: event.brolympics_id)
     def finalize(self):
         self.end_time = timezone.now()
         self.is_active = False
@@ -318,6 +509,8 @@ class EventAbstactBase(models.Model):
         self.save()
 
     def get_percent_complete(self):
+        if hasattr(self, 'n_comps'):
+            return percent(self.n_comps_complete, self.n_comps)
         return self._get_percent_complete()
     
 
@@ -340,6 +533,9 @@ class EventAbstactBase(models.Model):
 
 
 class Event_Team(EventAbstactBase):
+    # Reverse relations counted by EventQuerySet.with_completion_counts
+    completion_relations = ('comp',)
+
     display_avg_scores = models.BooleanField(default=True)
     
     n_competitions = models.PositiveIntegerField(default=1)
@@ -349,11 +545,7 @@ class Event_Team(EventAbstactBase):
     ## Initialization  ##
     def _get_percent_complete(self):
         all_comps = Competition_Team.objects.filter(event=self)
-        total_count = all_comps.count()
-        if total_count == 0:
-            return 0
-        completed_count = all_comps.filter(is_complete=True).count()
-        return round((completed_count / total_count) * 100)
+        return percent(all_comps.filter(is_complete=True).count(), all_comps.count())
 
     def create_child_objects(self):
         self._create_competitions_and_ranking_objs_team()
@@ -367,6 +559,7 @@ class Event_Team(EventAbstactBase):
             rankings.append(EventRanking_Team(event=self, team=team))
 
         Competition_Team.objects.bulk_create(competitions)
+        CompetitionParticipation.sync(competitions)
         EventRanking_Team.objects.bulk_create(rankings)
 
     ## End of Initialization ##
@@ -375,12 +568,9 @@ class Event_Team(EventAbstactBase):
 
     def find_available_comps(self, user):
         comps = Competition_Team.objects.filter(
-            Q(event=self),
-            Q(is_complete=False),
-            (
-                Q(team__is_available=True, team__player_1=user) |
-                Q(team__is_available=True, team__player_2=user)
-            )
+            event=self,
+            is_complete=False,
+            pk__in=CompetitionParticipation.comp_ids(user, 'team', available=True),
         )
 
         return comps
@@ -435,29 +625,30 @@ class Event_Team(EventAbstactBase):
         return uncompleted_competitions.first()
  
     def update_event_rankings_team(self):
-        team_rankings = self.event_team_event_rankings.all()
+        # One aggregate, ranks and points in memory, one bulk_update
+        team_rankings = list(self.event_team_event_rankings.order_by('id'))
         self._update_average_score(team_rankings)
-        #get the new updated scores
-        team_rankings = self.event_team_event_rankings.all()
 
         score_to_team_map = self._group_by_score(team_rankings)
         ordered_grouped_teams = self._order_by_score(score_to_team_map)
-        self._set_rankings_and_points(ordered_grouped_teams)   
+        self._set_rankings_and_points(ordered_grouped_teams, TEAM_RANKING_UPDATE_FIELDS)
+        return ordered_grouped_teams
 
     def _update_average_score(self, team_rankings):
         competitions = self.comp.filter(is_complete=True)
 
-        averages = competitions.values('team').annotate(
-            team_avg_score=Avg('team_score')
+        totals = competitions.values('team').annotate(
+            team_total_score=Sum('team_score'),
+            team_avg_score=Avg('team_score'),
         )
 
-        averages_dict = {avg['team']: avg for avg in averages}
+        totals_dict = {total['team']: total for total in totals}
 
         for ranking in team_rankings:
-            avg = averages_dict.get(ranking.team.id)
-            if avg:
-                ranking.team_avg_score = avg['team_avg_score']
-                ranking.save()
+            total = totals_dict.get(ranking.team_id)
+            if total:
+                ranking.team_total_score = total['team_total_score']
+                ranking.team_avg_score = total['team_avg_score']
     
     def _group_by_score(self, team_rankings):
         score_to_team = {}
@@ -476,7 +667,7 @@ class Event_Team(EventAbstactBase):
 
         return [score_map[score] for score in sorted_scores]
     
-    def _set_rankings_and_points(self, ordered_teams):
+    def _set_rankings_and_points(self, ordered_teams, update_fields=('rank', 'points')):
         score_map = self._get_score_to_rank()
         rank_counter = 1
 
@@ -494,16 +685,17 @@ class Event_Team(EventAbstactBase):
             for team in ranking_group:
                 team.points = points_per_team
                 team.rank = rank_counter
-                team.save()
 
             rank_counter += n_teams_in_group
 
+        all_rankings = [ranking for ranking_group in ordered_teams for ranking in ranking_group]
+        EventRanking_Team.objects.bulk_update(all_rankings, update_fields)
+
     def check_for_completion(self):
         if self.start_time == None or self.is_complete:
             return None
         
-        uncompleted = self.comp.filter(is_complete=False)
-        if len(uncompleted) == 0:
+        if not self.comp.filter(is_complete=False).exists():
             self.is_complete = True
             self.is_active = False
             self.is_available = False
@@ -526,25 +718,14 @@ class Event_Team(EventAbstactBase):
         self.event_team_event_rankings.all().update(is_final=True)
 
     def update_overall_rankings(self):
-        overall_rankings = self.brolympics.overall_ranking.all()
-        for ranking in overall_rankings:
-            event_ranking = EventRanking_Team.objects.get(
-                event=self,
-                team=ranking.team
-            )
-            if event_ranking.rank <= 3:
-                ranking.event_podiums += 1
-            if event_ranking.rank == 1:
-                ranking.event_wins += 1
-
-            ranking.total_points += event_ranking.points
-            ranking.save()
-
-        self.brolympics.update_ranks()
+        self.brolympics.add_event_to_overall_rankings(self.event_team_event_rankings.all())
 
     ## End of Clean Up
 
 class Event_IND(EventAbstactBase):
+    # Reverse relations counted by EventQuerySet.with_completion_counts
+    completion_relations = ('comp',)
+
     display_avg_scores = models.BooleanField(default=True)
     
     n_competitions = models.PositiveIntegerField(default=1)
@@ -565,6 +746,7 @@ class Event_IND(EventAbstactBase):
             rankings.append(EventRanking_Ind(event=self, team=team))
 
         Competition_Ind.objects.bulk_create(competitions)
+        CompetitionParticipation.sync(competitions)
         EventRanking_Ind.objects.bulk_create(rankings)
    
     ## End of Initialization ##
@@ -572,12 +754,9 @@ class Event_IND(EventAbstactBase):
     ## Event Utility ##
     def find_available_comps(self, user):
         comps = Competition_Ind.objects.filter(
-            Q(event=self),
-            Q(is_complete=False),
-            (
-                Q(team__is_available=True, team__player_1=user) |
-                Q(team__is_available=True, team__player_2=user)
-            )
+            event=self,
+            is_complete=False,
+            pk__in=CompetitionParticipation.comp_ids(user, 'ind', available=True),
         )
 
         return comps
@@ -591,11 +770,7 @@ class Event_IND(EventAbstactBase):
     
     def _get_percent_complete(self):
         all_comps = Competition_Ind.objects.filter(event=self)
-        total_count = all_comps.count()
-        if total_count == 0:
-            return 0
-        completed_count = all_comps.filter(is_complete=True).count()
-        return round((completed_count / total_count) * 100)
+        return percent(all_comps.filter(is_complete=True).count(), all_comps.count())
 
     def full_update_event_rankings_ind(self):
         team_rankings = list(self.event_ind_event_rankings.all())
@@ -645,34 +820,34 @@ class Event_IND(EventAbstactBase):
         return uncompleted_competitions.first()
     
     def update_event_rankings_ind(self):
-        team_rankings = self.event_ind_event_rankings.all()
+        # One aggregate, ranks and points in memory, one bulk_update
+        team_rankings = list(self.event_ind_event_rankings.order_by('id'))
         self._update_average_score(team_rankings)
-        #get the new updated scores
-        team_rankings = self.event_ind_event_rankings.all()
 
         score_to_team_map = self._group_by_score(team_rankings)
         ordered_grouped_teams = self._order_by_score(score_to_team_map)
-        self._set_rankings_and_points(ordered_grouped_teams)
+        self._set_rankings_and_points(ordered_grouped_teams, IND_RANKING_UPDATE_FIELDS)
         return ordered_grouped_teams
         
     def _update_average_score(self, team_rankings):
         competitions = self.comp.filter(is_complete=True)
 
-        averages = competitions.values('team').annotate(
+        totals = competitions.values('team').annotate(
+            player_1_total_score=Sum('player_1_score'),
             player_1_avg_score=Avg('player_1_score'),
+            player_2_total_score=Sum('player_2_score'),
             player_2_avg_score=Avg('player_2_score'),
-            team_avg_score=Avg('team_score')
+            team_total_score=Sum('team_score'),
+            team_avg_score=Avg('team_score'),
         )
 
-        averages_dict = {avg['team']: avg for avg in averages}
+        totals_dict = {total['team']: total for total in totals}
 
         for ranking in team_rankings:
-            avg = averages_dict.get(ranking.team.id)
-            if avg:
-                ranking.player_1_avg_score = avg['player_1_avg_score']
-                ranking.player_2_avg_score = avg['player_2_avg_score']
-                ranking.team_avg_score = avg['team_avg_score']
-                ranking.save()
+            total = totals_dict.get(ranking.team_id)
+            if total:
+                for field in IND_SCORE_FIELDS:
+                    setattr(ranking, field, total[field])
 
 
     def _group_by_score(self, team_rankings):
@@ -692,7 +867,7 @@ class Event_IND(EventAbstactBase):
 
         return [score_map[score] for score in sorted_scores]
     
-    def _set_rankings_and_points(self, ordered_teams):
+    def _set_rankings_and_points(self, ordered_teams, update_fields=('rank', 'points')):
         score_map = self._get_score_to_rank()
         rank_counter = 1
 
@@ -710,16 +885,17 @@ class Event_IND(EventAbstactBase):
             for team in ranking_group:
                 team.points = points_per_team
                 team.rank = rank_counter
-                team.save()
 
             rank_counter += n_teams_in_group
 
+        all_rankings = [ranking for ranking_group in ordered_teams for ranking in ranking_group]
+        EventRanking_Ind.objects.bulk_update(all_rankings, update_fields)
+
     def check_for_completion(self):
         if self.start_time == None or self.is_complete:
             return None
         
-        uncompleted = self.comp.filter(is_complete=False)
-        if len(uncompleted) == 0:
+        if not self.comp.filter(is_complete=False).exists():
             self.is_complete = True
             self.is_available = False
             self.is_active = False
@@ -742,30 +918,20 @@ class Event_IND(EventAbstactBase):
         self.event_ind_event_rankings.all().update(is_final=True)
 
     def update_overall_rankings(self):
-        overall_rankings = self.brolympics.overall_ranking.all()
-        for ranking in overall_rankings:
-            event_ranking = EventRanking_Ind.objects.get(
-                event=self,
-                team=ranking.team
-            )
-            if event_ranking.rank <= 3:
-                ranking.event_podiums += 1
-            if event_ranking.rank == 1:
-                ranking.event_wins += 1
-
-            ranking.total_points += event_ranking.points
-            ranking.save()
-
-        self.brolympics.update_ranks()
+        self.brolympics.add_event_to_overall_rankings(self.event_ind_event_rankings.all())
 
 
     ## End of Life Cylce ##               
             
 class Event_H2H(EventAbstactBase):
+    # Reverse relations counted by EventQuerySet.with_completion_counts
+    completion_relations = ('competition_h2h_set', 'bracketmatchup_set')
+
     #add validation that it's an even number and no more than n_teams-1
     n_matches = models.PositiveIntegerField(null=False, blank=False, default=4)
     n_active_limit = models.PositiveIntegerField(blank=True, null=True)
     n_bracket_teams = models.PositiveIntegerField(default=4)
+    bracket_type = models.CharField(max_length=6, choices=BRACKET_TYPES, default='single')
 
     is_available = models.BooleanField(default=False)
     is_round_robin_complete = models.BooleanField(default=False)
@@ -776,63 +942,38 @@ class Event_H2H(EventAbstactBase):
         self.create_competition_objs_h2h()
         self.create_event_ranking_h2h()
         self.create_bracket()
+        # A single team has no round robin games, nothing would ever complete it
+        self.check_for_round_robin_completion()
 
     def create_competition_objs_h2h(self):
-        pairs = self._create_team_pairs()
+        teams = list(self.brolympics.teams.order_by('pk'))
         competitions = [
-            Competition_H2H(event=self, team_1=pair[0], team_2=pair[1])
-            for pair in pairs
+            Competition_H2H(event=self, team_1=pairing.team_1, team_2=pairing.team_2, round=pairing.round)
+            for pairing in self.create_matchups(teams)
         ]
         Competition_H2H.objects.bulk_create(competitions)
-
-    def create_competition_objs_h2h(self):
-        teams = list(self.brolympics.teams.all())
-        random.shuffle(teams)
-        matchups = self.create_matchups(teams)
-        
-        competitions = []
-        for team1, team2 in matchups:
-            competitions.append(Competition_H2H(event=self, team_1=team1, team_2=team2))
-        
-        Competition_H2H.objects.bulk_create(competitions)
-
+        CompetitionParticipation.sync(competitions)
 
     def create_matchups(self, teams):
-        n_team = len(teams)
-        left_overs = []
-        matchups_per_round = n_team//2
-        n_matches = self.n_matches
-
-        matchups = []
-        for i in range(n_matches):
-            top = [-1] * matchups_per_round
-            bottom = [-1] * matchups_per_round
-            on_top = True
-            count = 0
-
-            for team in teams:
-                if on_top and count >= matchups_per_round:
-                    count = 0
-                    on_top = False
-                elif not on_top and count >= matchups_per_round:
-                    left_overs.append(team)
-                    break
-
-                if on_top:
-                    top[count] = team
-                else:
-                    bottom[matchups_per_round-1-count] = team
-
-                count += 1
-
-            teams = [teams[-1]] + teams[:-1]
-            round = [comp for comp in zip(top, bottom)]
-            matchups.extend(round)
-
-        for i in range(0, len(left_overs), 2):
-            matchups.append((left_overs[i], left_overs[i+1]))
-
-        return matchups
+        # Seeded from the event so a reschedule gives the same draw
+        return schedule_round_robin(
+            teams,
+            self.n_matches,
+            seed=self.uuid.int,
+            avoid=self._get_previous_opponents(teams),
+        )
+
+    def _get_previous_opponents(self, teams):
+        # Pairs that already met in another H2H event of the brolympics
+        team_map = {team.pk: team for team in teams}
+        pairs = Competition_H2H.objects.filter(
+            event__brolympics_id=self.brolympics_id,
+        ).exclude(event=self).values_list('team_1_id', 'team_2_id')
+        return {
+            frozenset([team_map[team_1_id], team_map[team_2_id]])
+            for team_1_id, team_2_id in pairs
+            if team_1_id in team_map and team_2_id in team_map
+        }
 
     def create_event_ranking_h2h(self):
         ranking_objs = [
@@ -842,7 +983,11 @@ class Event_H2H(EventAbstactBase):
         EventRanking_H2H.objects.bulk_create(ranking_objs)
 
     def create_bracket(self):
-        bracket_obj = Bracket_4.objects.create(event=self)
+        bracket_obj = Bracket_4.objects.create(
+            event=self,
+            n_player=min(self.n_bracket_teams, self.brolympics.teams.count()),
+            is_double_elimination=self.bracket_type == 'double',
+        )
         bracket_obj.create_matchups()
 
 
@@ -854,21 +999,22 @@ class Event_H2H(EventAbstactBase):
         all_h2h_comps = Competition_H2H.objects.filter(event=self)
         all_bracket_comps = BracketMatchup.objects.filter(event=self)
         total_count = all_h2h_comps.count() + all_bracket_comps.count()
-        
-        if total_count == 0:
-            return 0
-        
         completed_count = all_h2h_comps.filter(is_complete=True).count() + all_bracket_comps.filter(is_complete=True).count()
-
-        return round((completed_count / total_count) * 100)
+        return percent(completed_count, total_count)
 
     def full_update_event_rankings_h2h(self):
+        self._wipe_win_loss_sos_h2h(self.event_h2h_event_rankings.all())
         team_rankings = list(self.event_h2h_event_rankings.all())
+        ranking_map = {ranking.team_id: ranking for ranking in team_rankings}
 
-        self._wipe_win_loss_sos_h2h(team_rankings)
-        
-        #need a loop through and updated wins
-        self._update_sos(team_rankings)
+        completed_comps = list(self._get_completed_event_comps_h2h()) + list(self.bracketmatchup_set.filter(is_complete=True))
+        for comp in completed_comps:
+            for team_id in [comp.team_1_id, comp.team_2_id]:
+                if team_id in ranking_map:
+                    ranking_map[team_id].add_result(comp)
+
+        self.update_event_rankings_h2h(team_rankings)
+        return team_rankings
        
 
     def _get_completed_event_comps_h2h(self):
@@ -936,23 +1082,13 @@ class Event_H2H(EventAbstactBase):
     
     def find_available_comps(self, user):
         comps = Competition_H2H.objects.filter(
-            Q(event=self) & Q(is_complete=False) & Q(team_1__isnull=False) & Q(team_2__isnull=False) &
-            (
-                Q(team_1__is_available=True, team_1__player_1=user) |
-                Q(team_1__is_available=True, team_1__player_2=user) |
-                Q(team_2__is_available=True, team_2__player_1=user) |
-                Q(team_2__is_available=True, team_2__player_2=user)
-            )
+            Q(event=self) & Q(is_complete=False) & Q(team_1__isnull=False) & Q(team_2__isnull=False),
+            pk__in=CompetitionParticipation.comp_ids(user, 'h2h', available=True),
         )
 
         bracket = BracketMatchup.objects.filter(
-            Q(event=self) & Q(is_complete=False) & Q(team_1__isnull=False) & Q(team_2__isnull=False) &
-            (
-                Q(team_1__is_available=True, team_1__player_1=user) |
-                Q(team_1__is_available=True, team_1__player_2=user) |
-                Q(team_2__is_available=True, team_2__player_1=user) |
-                Q(team_2__is_available=True, team_2__player_2=user)
-            )
+            Q(event=self) & Q(is_complete=False) & Q(team_1__isnull=False) & Q(team_2__isnull=False),
+            pk__in=CompetitionParticipation.comp_ids(user, 'bracket', available=True),
         )
 
         return {'std': comps, 'bracket': bracket}
@@ -971,121 +1107,96 @@ class Event_H2H(EventAbstactBase):
         return {'std': comps, 'bracket': bracket}      
 
 
-    def update_event_rankings_h2h(self, team_rankings=None):
+    def update_event_rankings_h2h(self, team_rankings=None, competition=None):
         if team_rankings == None:
             team_rankings = list(self.event_h2h_event_rankings.all())
-        team_rankings = sorted(team_rankings, key=lambda x: x.win_rate, reverse=True)
 
-        self._update_sos(team_rankings)
+        if competition is None or not self._apply_sos_delta(team_rankings, competition):
+            self._update_sos(team_rankings)
+
+        team_rankings = sorted(team_rankings, key=lambda x: x.win_rate, reverse=True)
         tie_broken_teams = self.break_ties(team_rankings)
         self._set_rankings_and_points(tie_broken_teams)
-        self._update_bracket()
+        self._update_bracket(tie_broken_teams)
 
-        update_fields = ['rank', 'points']
-        EventRanking_H2H.objects.bulk_update(team_rankings, update_fields)
+        EventRanking_H2H.objects.bulk_update(team_rankings, H2H_RANKING_UPDATE_FIELDS)
         
-
     def _update_sos(self, team_rankings):
-        team_to_wlt = {
-            team_ranking.team: {
-                'wins': team_ranking.wins,
-                'losses': team_ranking.losses,
-                'ties': team_ranking.ties,
-            } 
+        team_to_ranking = {
+            team_ranking.team_id: team_ranking
             for team_ranking in team_rankings
         }
-
         for team_ranking in team_rankings:
-            team = team_ranking.team
-            team_completed_competitions = Competition_H2H.objects.filter(
-                Q(team_1=team) | Q(team_2=team), 
-                event=self, 
-                is_complete=True
-            )
-            
-            team_ranking.sos_wins = 0
-            team_ranking.sos_losses = 0
-            team_ranking.sos_ties = 0
-            for comp in team_completed_competitions:
-                if comp.team_1 == team:
-                    opponent = comp.team_2
-                else:
-                    opponent = comp.team_1
+            self._set_sos(team_ranking, 0, 0, 0)
+
+        completed_comps = self._get_completed_event_comps_h2h().values_list('team_1_id', 'team_2_id')
+        for team_1_id, team_2_id in completed_comps:
+            for team_id, opponent_id in [(team_1_id, team_2_id), (team_2_id, team_1_id)]:
+                team_ranking = team_to_ranking.get(team_id)
+                opponent = team_to_ranking.get(opponent_id)
+                if team_ranking is None or opponent is None:
+                    continue
 
-                team_ranking.sos_wins += team_to_wlt[opponent]['wins']
-                team_ranking.sos_losses += team_to_wlt[opponent]['losses']
-                team_ranking.sos_ties += team_to_wlt[opponent]['ties']
+                self._add_sos(team_ranking, opponent.wins, opponent.losses, opponent.ties)
 
-            team_ranking.save()
+    def _apply_sos_delta(self, team_rankings, competition):
+        # Applies one newly completed competition to strength of schedule without a full recompute.
+        # Relies on every other ranking already being up to date, returns False if it can't apply.
+        team_to_ranking = {
+            team_ranking.team_id: team_ranking
+            for team_ranking in team_rankings
+        }
+        team_ids = [competition.team_1_id, competition.team_2_id]
+        if not all(team_id in team_to_ranking for team_id in team_ids):
+            return False
 
-    def break_ties(self, team_rankings: list[EventRanking_H2H]):
-        return self.mergeSort(team_rankings)
-    
-    def mergeSort(self, teams):
-        if len(teams) <= 1:
-            return teams
-        
-        mid = len(teams)//2
-        left = self.mergeSort(teams[:mid])
-        right = self.mergeSort(teams[mid:])
+        deltas = {
+            team_id: self._get_result_delta(competition, team_id)
+            for team_id in team_ids
+        }
 
-        return self.merge(left, right)
+        # Everyone who already played either team sees that team's record change
+        past_comps = self._get_completed_event_comps_h2h().filter(
+            Q(team_1_id__in=team_ids) | Q(team_2_id__in=team_ids)
+        ).exclude(pk=competition.pk).values_list('team_1_id', 'team_2_id')
+
+        for team_1_id, team_2_id in past_comps:
+            for team_id, opponent_id in [(team_1_id, team_2_id), (team_2_id, team_1_id)]:
+                if team_id in deltas and opponent_id in team_to_ranking:
+                    self._add_sos(team_to_ranking[opponent_id], *deltas[team_id])
+
+        # The two teams add each other's full record for the new game
+        team_1 = team_to_ranking[competition.team_1_id]
+        team_2 = team_to_ranking[competition.team_2_id]
+        self._add_sos(team_1, team_2.wins, team_2.losses, team_2.ties)
+        self._add_sos(team_2, team_1.wins, team_1.losses, team_1.ties)
+
+        return True
+
+    def _get_result_delta(self, comp, team_id):
+        if comp.winner_id == team_id:
+            return 1, 0, 0
+        if comp.loser_id == team_id:
+            return 0, 1, 0
+        return 0, 0, 1
+
+    def _set_sos(self, team_ranking, wins, losses, ties):
+        team_ranking.sos_wins = wins
+        team_ranking.sos_losses = losses
+        team_ranking.sos_ties = ties
+
+    def _add_sos(self, team_ranking, wins, losses, ties):
+        team_ranking.sos_wins += wins
+        team_ranking.sos_losses += losses
+        team_ranking.sos_ties += ties
 
-    def merge(self, left, right):
-        l, r = 0, 0
+    def break_ties(self, team_rankings: list[EventRanking_H2H]):
+        return TieBreaker(self).break_tie(team_rankings)
 
-        new_team_order = []
-        while l < len(left) and r < len(right):
-            if self.isTeam1AboveTeam2(left[l], right[r]):
-                new_team_order.append(left[l])
-                l += 1
-            else:
-                new_team_order.append(right[r])
-                r += 1
-        if l < len(left):
-            new_team_order.extend(left[l:])
-        if r < len(right):
-            new_team_order.extend(right[r:])
-        return new_team_order
-
-    def isTeam1AboveTeam2(self, team1: EventRanking_H2H, team2: EventRanking_H2H):
-        # 0) Win rate
-        if team1.win_rate != team2.win_rate:
-            return team1.win_rate > team2.win_rate
-
-        # 1) Head to head wins
-        h2h_comps = self.competition_h2h_set.filter(
-            is_complete=True,
-            team_1__in=[team1.team, team2.team],
-            team_2__in=[team1.team, team2.team]
-        )
-        team1_h2h_wins = sum(1 for comp in h2h_comps if comp.winner == team1.team)
-        team2_h2h_wins = sum(1 for comp in h2h_comps if comp.winner == team2.team)
-        if team1_h2h_wins != team2_h2h_wins:
-            return team1_h2h_wins > team2_h2h_wins
-
-        # 2) Won games total
-        if team1.wins != team2.wins:
-            return team1.wins > team2.wins
-
-        # 3) Victory margin
-        team1_margin = team1.score_for - team1.score_against
-        team2_margin = team2.score_for - team2.score_against
-        if team1_margin != team2_margin:
-            return team1_margin > team2_margin
-
-        # 4) Strength of schedule
-        team1_sos = (team1.sos_wins + team1.sos_ties * 0.5) / (team1.sos_wins + team1.sos_losses + team1.sos_ties) if (team1.sos_wins + team1.sos_losses + team1.sos_ties) > 0 else 0
-        team2_sos = (team2.sos_wins + team2.sos_ties * 0.5) / (team2.sos_wins + team2.sos_losses + team2.sos_ties) if (team2.sos_wins + team2.sos_losses + team2.sos_ties) > 0 else 0
-        if team1_sos != team2_sos:
-            return team1_sos > team2_sos
-
-        # 5) Strength of schedule wins
-        if team1.sos_wins != team2.sos_wins:
-            return team1.sos_wins > team2.sos_wins
-
-        # 6) Randomized
-        return random.random() < 0.5
+    def isTeam1AboveTeam2(self, team1: EventRanking_H2H, team2: EventRanking_H2H, tie_breaker: TieBreaker=None):
+        if tie_breaker is None:
+            tie_breaker = TieBreaker(self)
+        return tie_breaker.is_above(team1, team2)
 
     
     def _set_rankings_and_points(self, team_rankings):
@@ -1135,34 +1246,31 @@ class Event_H2H(EventAbstactBase):
                 self._update_bracket()
 
             self.save()
+            if not self.bracket_4.get_plan().nodes:
+                # Under two bracket teams there is no championship, the round robin decides
+                self.bracket_4.finalize({})
             return True
         return False
         
 
-    def _update_bracket(self):
-        top_4_rankings = self.event_h2h_event_rankings.all().order_by('rank')[:self.n_bracket_teams]
-        self.bracket_4.update_teams(top_4_rankings)
+    def _update_bracket(self, team_rankings=None):
+        if team_rankings is None:
+            team_rankings = self.event_h2h_event_rankings.all().order_by('rank')
+        self.bracket_4.update_teams(team_rankings[:self.n_bracket_teams])
         
     ## End of Life Cycle ##
 
     ## Event Clean Up ##
     def finalize_rankings(self): #used by parent for finalize()
         team_rankings = list(self.event_h2h_event_rankings.all().order_by('rank'))
+        ranking_map = {ranking.team_id: ranking for ranking in team_rankings}
 
-        bracket_teams = [
-            self.bracket_4.championship.winner,
-            self.bracket_4.championship.loser,
-            self.bracket_4.loser_bracket_finals.winner,
-            self.bracket_4.loser_bracket_finals.loser,
-        ]
-        back_half_teams = team_rankings[self.n_bracket_teams:]
-
-
-        bracket_team_rankings = [
-            EventRanking_H2H.objects.get(event=self, team=team) 
-            for team in bracket_teams
-        ]
-        final_rankings = bracket_team_rankings  + back_half_teams
+        # Bracket teams by where they finished, then everyone else in round robin order
+        bracket_team_ids = [team.pk for team in self.bracket_4.get_final_order()]
+        bracket_team_rankings = [ranking_map[team_id] for team_id in bracket_team_ids if team_id in ranking_map]
+        placed = set(bracket_team_ids)
+        back_half_teams = [ranking for ranking in team_rankings if ranking.team_id not in placed]
+        final_rankings = bracket_team_rankings + back_half_teams
 
         with transaction.atomic():
             self._set_event_rankings_final(final_rankings)
@@ -1180,27 +1288,7 @@ class Event_H2H(EventAbstactBase):
         self.event_h2h_event_rankings.all().update(is_final=True)
 
     def _update_overall_rankings(self):
-        overall_rankings = self.brolympics.overall_ranking.all()
-        for ranking in overall_rankings:
-            event_ranking = EventRanking_H2H.objects.get(
-                event=self,
-                team=ranking.team
-            )
-
-            if event_ranking.rank <= 3:
-                ranking.event_podiums += 1
-            if event_ranking.rank == 1:
-                ranking.event_wins += 1
-
-            ranking.wins += event_ranking.wins
-            ranking.losses += event_ranking.losses
-            ranking.ties += event_ranking.ties
-            ranking.total_points += event_ranking.points
-
-            ranking.save()
-
-
-        self.brolympics.update_ranks()
+        self.brolympics.add_event_to_overall_rankings(self.event_h2h_event_rankings.all(), include_record=True)
 
     ## End of Event Clean Up
 
@@ -1244,13 +1332,43 @@ class Team(models.Model):
 
     uuid = models.UUIDField(unique=True, editable=False, default=uuid4)
     img = models.ImageField(storage=FirebaseStorage(), null=True)
+    img_variants = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['player_1', 'is_available'], name='team_player_1_idx'),
+            models.Index(fields=['player_2', 'is_available'], name='team_player_2_idx'),
+        ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._standings_values = instance.get_standings_values()
+        return instance
+
+    def get_standings_values(self):
+        # What the standings snapshot shows of a team, read from __dict__ to skip deferred fields
+        img = self.__dict__.get('img')
+        return (self.__dict__.get('name'), getattr(img, 'name', img), self.__dict__.get('img_variants'))
+
+    @bumps_revision(lambda team: team.brolympics_id)
     def save(self, *args, **kwargs):
         if not self.img:
             self.img = get_default_image('default_league', 8)
+        adding = self._state.adding
         super().save(*args, **kwargs)
 
+        standings_values = self.get_standings_values()
+        if not adding and standings_values != getattr(self, '_standings_values', None):
+            from apps.brolympics.snapshots import rebuild_standings_snapshot_on_commit
+            rebuild_standings_snapshot_on_commit(self.brolympics_id)
+        self._standings_values = standings_values
 
+    @bumps_revision(lambda team: team.brolympics_id)
+    def delete(self, *args, **kwargs):
+        return super().delete(*args, **kwargs)
+
+    @bumps_revision(lambda team: team.brolympics_id)
     def add_player(self, player):
         if player == self.player_1 or player == self.player_2:
             raise ValueError("This player is already on this team.")
@@ -1258,15 +1376,18 @@ class Team(models.Model):
         if self.player_1 is None:
             self.player_1 = player
             self.save()
+            CompetitionParticipation.sync_team(self)
             return
         
         if self.player_2 is None:
             self.player_2 = player
             self.save()
+            CompetitionParticipation.sync_team(self)
             return
         
         raise ValueError("Both player slots are already filled.")
     
+    @bumps_revision(lambda team: team.brolympics_id)
     def remove_player(self, player):
         if self.player_1 == player:
             self.player_1 = self.player_2
@@ -1281,25 +1402,30 @@ class Team(models.Model):
 
         if self._is_empty_team():
             self.delete()
+        else:
+            CompetitionParticipation.sync_team(self)
+
+    def start_comp(self, comp=None):
+        comp_type = CompetitionParticipation.get_comp_type(comp) if comp is not None else None
+        comp_uuid = comp.uuid if comp is not None else None
 
-    def start_comp(self):
         self.is_available = False
-        if self.player_1:
-            self.player_1.is_available = False
-            self.player_1.save()
-        if self.player_2:
-            self.player_2.is_available = False
-            self.player_2.save()
+        for player in [self.player_1, self.player_2]:
+            if player:
+                player.is_available = False
+                player.current_comp_type = comp_type
+                player.current_comp_uuid = comp_uuid
+                player.save()
         self.save()
 
     def end_comp(self):
         self.is_available = True
-        if self.player_1:
-            self.player_1.is_available = True
-            self.player_1.save()
-        if self.player_2:
-            self.player_2.is_available = True
-            self.player_2.save()
+        for player in [self.player_1, self.player_2]:
+            if player:
+                player.is_available = True
+                player.current_comp_type = None
+                player.current_comp_uuid = None
+                player.save()
         self.save()      
 
     
@@ -1308,8 +1434,47 @@ class Team(models.Model):
     
     def __str__(self):
         return self.name + ' - ' + str(self.brolympics.name)
+
+
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def invalidate_roster_size(sender, instance, created=True, **kwargs):
+    if not created:
+        return
+
+    try:
+        invalidate_n_teams(instance.brolympics)
+    except Brolympics.DoesNotExist:
+        # The whole brolympics is being deleted
+        pass
     
-class Competition_Team(models.Model):
+class TracksParticipation:
+    '''
+    Keeps CompetitionParticipation in step with a competition. A save that leaves the
+    teams alone only updates the status of its rows, a change of teams rewrites them.
+    '''
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._participation_teams = instance.get_participation_team_ids()
+        return instance
+
+    def get_participation_team_ids(self):
+        # Read from __dict__ so a deferred team field never costs a query
+        return tuple(self.__dict__.get(field) for field in self.participation_team_fields)
+
+    def get_participation_teams(self):
+        teams = [getattr(self, field[:-3]) for field in self.participation_team_fields]
+        return [team for team in teams if team is not None]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        CompetitionParticipation.sync_competition(self)
+
+
+class Competition_Team(TracksParticipation, models.Model):
+    participation_team_fields = ('team_id',)
+
     event = models.ForeignKey(
         Event_Team,
         on_delete=models.CASCADE,
@@ -1333,15 +1498,24 @@ class Competition_Team(models.Model):
 
     uuid = models.UUIDField(unique=True, editable=False, default=uuid4)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['team', 'event', 'is_complete'], name='team_comp_team_event_idx'),
+            models.Index(fields=['event'], condition=Q(is_complete=False), name='team_comp_open_idx'),
+            models.Index(fields=['event'], condition=Q(is_active=True), name='team_comp_active_idx'),
+        ]
+
+    @bumps_revision(lambda comp: comp.event.brolympics_id)
     def start(self):
         if not self.team.is_available:
             raise ValueError("This team is not currently available")
         
         self.start_time = timezone.now()
         self.is_active = True
-        self.team.start_comp()
+        self.team.start_comp(self)
         self.save()
 
+    @bumps_revision(lambda comp: comp.event.brolympics_id)
     def cancel(self):
         if self.is_complete:
             raise ValueError('This event has already been completed.')
@@ -1350,7 +1524,8 @@ class Competition_Team(models.Model):
         self.is_active = False
         self.save()
 
-    def admin_end(self, team_score):
+    @bumps_revision(lambda comp: comp.event.brolympics_id)
+    def admin_end(self, team_score, defer_update=False):
         team_score = float(team_score)
 
         self.team_score = team_score
@@ -1360,12 +1535,14 @@ class Competition_Team(models.Model):
         self.team.end_comp()
         self.save()
 
-        team_ranking = EventRanking_Team.objects.get(event=self.event, team=self.team)
-        team_ranking.update_scores()
+        # Score batches recompute each affected event once after every result is in
+        if defer_update:
+            return
 
         self.event.update_event_rankings_team()
         self.event.check_for_completion()
 
+    @bumps_revision(lambda comp: comp.event.brolympics_id)
     def end(self, team_score):
         self.end_time = timezone.now()
 
@@ -1377,9 +1554,6 @@ class Competition_Team(models.Model):
         self.team.end_comp()
         self.save()
 
-        team_ranking = EventRanking_Team.objects.get(event=self.event, team=self.team)
-        team_ranking.update_scores()
-
         self.event.update_event_rankings_team()
         self.event.check_for_completion()
 
@@ -1387,7 +1561,9 @@ class Competition_Team(models.Model):
         return self.event.name + ' - ' + self.team.name
         
 
-class Competition_Ind(models.Model):
+class Competition_Ind(TracksParticipation, models.Model):
+    participation_team_fields = ('team_id',)
+
     event = models.ForeignKey(
         Event_IND,
         on_delete=models.CASCADE,
@@ -1415,6 +1591,14 @@ class Competition_Ind(models.Model):
 
     uuid = models.UUIDField(unique=True, editable=False, default=uuid4)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['team', 'event', 'is_complete'], name='ind_comp_team_event_idx'),
+            models.Index(fields=['event'], condition=Q(is_complete=False), name='ind_comp_open_idx'),
+            models.Index(fields=['event'], condition=Q(is_active=True), name='ind_comp_active_idx'),
+        ]
+
+    @bumps_revision(lambda comp: comp.event.brolympics_id)
     def start(self):
         if not self.team.is_available:
             raise ValueError("This team is not currently available")
@@ -1422,9 +1606,10 @@ class Competition_Ind(models.Model):
         self.start_time = timezone.now()
         self.is_active = True
 
-        self.team.start_comp()
+        self.team.start_comp(self)
         self.save()
 
+    @bumps_revision(lambda comp: comp.event.brolympics_id)
     def cancel(self):
         if self.is_complete:
             raise ValueError('This event has already been completed.')
@@ -1433,7 +1618,8 @@ class Competition_Ind(models.Model):
         self.is_active = False
         self.save()
 
-    def admin_end(self, player_1_score, player_2_score):
+    @bumps_revision(lambda comp: comp.event.brolympics_id)
+    def admin_end(self, player_1_score, player_2_score, defer_update=False):
         player_1_score = float(player_1_score)
         player_2_score = float(player_2_score)
 
@@ -1450,12 +1636,13 @@ class Competition_Ind(models.Model):
         self.team.end_comp()
         self.save()
 
-        team_ranking = EventRanking_Ind.objects.get(event=self.event, team=self.team)
-        team_ranking.update_scores()
+        if defer_update:
+            return
 
         self.event.update_event_rankings_ind()
         self.event.check_for_completion()
 
+    @bumps_revision(lambda comp: comp.event.brolympics_id)
     def end(self, player_1_score, player_2_score):
         self.end_time = timezone.now()
         player_1_score = float(player_1_score)
@@ -1474,9 +1661,6 @@ class Competition_Ind(models.Model):
         self.team.end_comp()
         self.save()
 
-        team_ranking = EventRanking_Ind.objects.get(event=self.event, team=self.team)
-        team_ranking.update_scores()
-
         self.event.update_event_rankings_ind()
         self.event.check_for_completion()
 
@@ -1487,7 +1671,9 @@ class Competition_Ind(models.Model):
 
 
 
-class Competition_H2H_Base(models.Model):
+class Competition_H2H_Base(TracksParticipation, models.Model):
+    participation_team_fields = ('team_1_id', 'team_2_id')
+
     event = models.ForeignKey(
         Event_H2H,
         on_delete=models.CASCADE,
@@ -1542,6 +1728,7 @@ class Competition_H2H_Base(models.Model):
         abstract = True
     
 
+    @bumps_revision(lambda comp: comp.event.brolympics_id)
     def start(self):
         if not self.team_1.is_available:
             raise ValueError(f"{self.team_1.name} is not currently available")
@@ -1549,8 +1736,8 @@ class Competition_H2H_Base(models.Model):
         if not self.team_2.is_available:
             raise ValueError(f"{self.team_2.name} is not currently available")
 
-        self.team_1.start_comp()
-        self.team_2.start_comp()
+        self.team_1.start_comp(self)
+        self.team_2.start_comp(self)
 
         self.start_time = timezone.now()
         self.is_active = True
@@ -1558,6 +1745,7 @@ class Competition_H2H_Base(models.Model):
 
         self.save()
 
+    @bumps_revision(lambda comp: comp.event.brolympics_id)
     def cancel(self):
         if self.is_complete:
             raise ValueError('This event has already been completed.')
@@ -1568,6 +1756,7 @@ class Competition_H2H_Base(models.Model):
         self.save()
 
 
+    @bumps_revision(lambda comp: comp.event.brolympics_id)
     def admin_end(self, team_1_score, team_2_score):
         team_1_score = float(team_1_score)
         team_2_score = float(team_2_score)
@@ -1586,6 +1775,7 @@ class Competition_H2H_Base(models.Model):
         self.team_2.end_comp()
 
 
+    @bumps_revision(lambda comp: comp.event.brolympics_id)
     def end(self, team_1_score, team_2_score):
         team_1_score = float(team_1_score)
         team_2_score = float(team_2_score)
@@ -1600,23 +1790,8 @@ class Competition_H2H_Base(models.Model):
         team_1_ranking = EventRanking_H2H.objects.get(event=self.event, team=self.team_1)
         team_2_ranking = EventRanking_H2H.objects.get(event=self.event, team=self.team_2)
 
-        if team_1_ranking.team == winner:
-            team_1_ranking.wins += 1
-            team_2_ranking.losses += 1
-        elif team_2_ranking.team == winner:
-            team_1_ranking.losses += 1
-            team_2_ranking.wins += 1
-        else:
-            team_1_ranking.ties += 1
-            team_2_ranking.ties += 1
-
-        team_1_ranking.score_for += team_1_score
-        team_1_ranking.score_against += team_2_score
-        team_2_ranking.score_for += team_2_score
-        team_2_ranking.score_against += team_1_score
-        
-        team_1_ranking.win_rate = team_1_ranking.get_win_rate()
-        team_2_ranking.win_rate = team_2_ranking.get_win_rate()
+        team_1_ranking.add_result(self)
+        team_2_ranking.add_result(self)
 
         team_1_ranking.save()
         team_2_ranking.save()
@@ -1648,22 +1823,30 @@ class Competition_H2H_Base(models.Model):
         return name
 
 class Competition_H2H(Competition_H2H_Base):
+    # Round robin round from the scheduler, see scheduler.py
+    round = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['team_1', 'event', 'is_complete'], name='h2h_comp_team_1_idx'),
+            models.Index(fields=['team_2', 'event', 'is_complete'], name='h2h_comp_team_2_idx'),
+            models.Index(fields=['event'], condition=Q(is_complete=False), name='h2h_comp_open_idx'),
+            models.Index(fields=['event'], condition=Q(is_active=True), name='h2h_comp_active_idx'),
+        ]
+
+    @bumps_revision(lambda comp: comp.event.brolympics_id)
     def end(self, team_1_score, team_2_score):
         super().end(team_1_score, team_2_score)
-        self.event.update_event_rankings_h2h()
+        self.event.update_event_rankings_h2h(competition=self)
         self.event.check_for_round_robin_completion()
 
-    def admin_end(self, team_1_score, team_2_score):
+    @bumps_revision(lambda comp: comp.event.brolympics_id)
+    def admin_end(self, team_1_score, team_2_score, defer_update=False):
         super().admin_end(team_1_score, team_2_score)
-        team_1_ranking = EventRanking_H2H.objects.filter(team=self.team_1, event=self.event)
-        if team_1_ranking.exists():
-            team_1_ranking.first().recalculate_wl_sf()
-        
-        team_2_ranking = EventRanking_H2H.objects.filter(team=self.team_2, event=self.event)
-        if team_2_ranking.exists():
-            team_2_ranking.first().recalculate_wl_sf()
-
-        self.event.update_event_rankings_h2h()
+        if defer_update:
+            return
+        # Admin edits can rewrite history so everything is recomputed from scratch
+        self.event.full_update_event_rankings_h2h()
         self.event.check_for_round_robin_completion()
 
 class EventRankingAbstractBase(models.Model):
@@ -1704,26 +1887,27 @@ class EventRanking_Team(models.Model):
     is_final = models.BooleanField(default=False)
     uuid = models.UUIDField(unique=True, editable=False, default=uuid4)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'team'], name='unique_team_ranking_event_team'),
+        ]
+        indexes = [
+            models.Index(fields=['event', 'rank'], name='team_ranking_rank_idx'),
+        ]
+
     def update_scores(self):
-        all_completed_comps = Competition_Team.objects.filter(
-            event=self.event,
-            team=self.team,
+        totals = Competition_Team.objects.filter(
+            event_id=self.event_id,
+            team_id=self.team_id,
             is_complete=True,
+        ).aggregate(
+            team_total_score=Sum('team_score'),
+            team_avg_score=Avg('team_score'),
         )
 
-        team_total_score = 0
-        counter = 0
-        for comp in all_completed_comps:
-            score = comp.team_score
-            if score is not None:
-                team_total_score += score
-                counter += 1
-
-        team_avg_score = team_total_score / counter if counter != 0 else None
-        self.team_total_score = team_total_score
-        self.team_avg_score = team_avg_score
-
-        self.save()
+        self.team_total_score = totals['team_total_score'] or 0
+        self.team_avg_score = totals['team_avg_score']
+        self.save(update_fields=['team_total_score', 'team_avg_score'])
 
     def __str__(self):
         return self.event.name + ' Ranking: ' + self.team.name
@@ -1756,39 +1940,32 @@ class EventRanking_Ind(models.Model):
     is_final = models.BooleanField(default=False)
     uuid = models.UUIDField(unique=True, editable=False, default=uuid4)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'team'], name='unique_ind_ranking_event_team'),
+        ]
+        indexes = [
+            models.Index(fields=['event', 'rank'], name='ind_ranking_rank_idx'),
+        ]
+
     def update_scores(self):
-        all_completed_comps = Competition_Ind.objects.filter(
-            event=self.event,
-            team=self.team,
+        totals = Competition_Ind.objects.filter(
+            event_id=self.event_id,
+            team_id=self.team_id,
             is_complete=True,
-        )
-
-        team_total_score = 0
-        team_avg_total_score = 0
-        counter = 0
-        for comp in all_completed_comps:
-            score = comp.team_score
-            avg_score = comp.avg_score
-            if score is not None:
-                team_total_score += score
-                team_avg_total_score += avg_score
-                counter += 1
-
-        team_avg_score = team_avg_total_score / counter if counter != 0 else None
-        self.team_total_score = team_total_score
-        self.team_avg_score = team_avg_score
-
-        aggregates = all_completed_comps.aggregate(
+        ).aggregate(
             player_1_total_score=Sum('player_1_score'),
             player_1_avg_score=Avg('player_1_score'),
             player_2_total_score=Sum('player_2_score'),
             player_2_avg_score=Avg('player_2_score'),
+            team_total_score=Sum('team_score'),
+            team_avg_score=Avg('team_score'),
         )
 
-        for key, value in aggregates.items():
-            setattr(self, key, value or None)
-
-        self.save()
+        for key, value in totals.items():
+            setattr(self, key, value)
+        self.team_total_score = self.team_total_score or 0
+        self.save(update_fields=list(totals))
 
     def __str__(self):
         return self.event.name + ' Ranking: ' + self.team.name
@@ -1824,6 +2001,31 @@ class EventRanking_H2H(models.Model):
     is_final = models.BooleanField(default=False)
     uuid = models.UUIDField(unique=True, editable=False, default=uuid4)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'team'], name='unique_h2h_ranking_event_team'),
+        ]
+        indexes = [
+            models.Index(fields=['event', 'rank'], name='h2h_ranking_rank_idx'),
+        ]
+
+    def add_result(self, comp):
+        if self.team_id == comp.winner_id:
+            self.wins += 1
+        elif self.team_id == comp.loser_id:
+            self.losses += 1
+        else:
+            self.ties += 1
+
+        if self.team_id == comp.team_1_id:
+            self.score_for += comp.team_1_score
+            self.score_against += comp.team_2_score
+        else:
+            self.score_for += comp.team_2_score
+            self.score_against += comp.team_1_score
+
+        self.win_rate = self.get_win_rate()
+
     def get_win_rate(self):
         if (self.wins + self.ties + self.losses) > 0:
             win_rate = (self.wins + (0.5 * self.ties)) / (self.wins + self.ties + self.losses)
@@ -1873,6 +2075,8 @@ class EventRanking_H2H(models.Model):
         return self.event.name + ' Ranking: ' + self.team.name
 
 
+BRACKET_ADVANCE_FIELDS = ['team_1', 'team_2', 'team_1_seed', 'team_2_seed', 'winner', 'loser', 'is_complete', 'is_bye']
+
 class BracketMatchup(Competition_H2H_Base):
     bracket = models.ForeignKey(
         'Bracket_4',
@@ -1912,18 +2116,37 @@ class BracketMatchup(Competition_H2H_Base):
     
     team_1_seed = models.PositiveIntegerField(null=True, blank=True)
     team_2_seed = models.PositiveIntegerField(null=True, blank=True)
+
+    # Position in the bracket's plan, see bracket_engine
+    index = models.PositiveIntegerField(default=0)
+    side = models.CharField(max_length=7, choices=BRACKET_SIDES, default=WINNERS)
+    round = models.PositiveIntegerField(default=1)
+    is_bye = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bracket', 'index'], name='unique_bracket_matchup_index'),
+        ]
+        indexes = [
+            models.Index(fields=['team_1', 'event', 'is_complete'], name='bracket_team_1_idx'),
+            models.Index(fields=['team_2', 'event', 'is_complete'], name='bracket_team_2_idx'),
+            models.Index(fields=['event'], condition=Q(is_complete=False), name='bracket_open_idx'),
+            models.Index(fields=['event'], condition=Q(is_active=True), name='bracket_active_idx'),
+        ]
     
     def update_teams(self, higher_seed, lower_seed):
         self.team_1 = higher_seed
         self.team_2 = lower_seed
         self.save()
 
+    @bumps_revision(lambda comp: comp.event.brolympics_id)
     def start(self):
         if self.bracket.is_active:
             super().start()
         else:
             raise ValueError('Bracket is not active yet.')
         
+    @bumps_revision(lambda comp: comp.event.brolympics_id)
     def end(self, team_1_score, team_2_score):
         team_1_score = float(team_1_score)
         team_2_score = float(team_2_score)
@@ -1931,54 +2154,16 @@ class BracketMatchup(Competition_H2H_Base):
             raise Exception
 
         super().end(team_1_score, team_2_score)
+        self.bracket.advance(self)
 
-        if self.winner_node is None:
-            if self._check_for_completion_during_end():
-                self.bracket.finalize()
-            return
-        
-        if self == self.bracket.championship or self == self.bracket.loser_bracket_finals:
-            return
-
-
-        if self == self.bracket.championship.left:
-            self.winner_node.team_1 = self.winner
-            self.loser_node.team_1 = self.loser
-
-            if self.winner == self.team_1:
-                self.winner_node.team_1_seed = self.team_1_seed
-                self.loser_node.team_1_seed = self.team_2_seed
-            else:
-                self.winner_node.team_1_seed = self.team_2_seed
-                self.loser_node.team_1_seed = self.team_1_seed
-        else:
-            self.winner_node.team_2 = self.winner
-            self.loser_node.team_2 = self.loser
-
-            if self.winner == self.team_1:
-                self.winner_node.team_2_seed = self.team_1_seed
-                self.loser_node.team_2_seed = self.team_2_seed
-            else:
-                self.winner_node.team_2_seed = self.team_2_seed
-                self.loser_node.team_2_seed = self.team_1_seed
-
-
-
-
-        self.winner_node.save()
-        self.loser_node.save()
-        self.save()
-
-    def _check_for_completion_during_end(self):
-        if self.bracket.championship == self and self.bracket.loser_bracket_finals.is_complete:
-            return True
-        elif self.bracket.loser_bracket_finals == self and self.bracket.championship.is_complete:
-            return True
-        return False
-
-            
 
 class Bracket_4(models.Model):
+    '''
+    An H2H event's elimination bracket. Named for the original four team layout, the
+    matchups now come from a bracket_engine plan of any size, single or double
+    elimination. championship is the final and loser_bracket_finals the third place
+    match, or the losers bracket final in double elimination.
+    '''
     event = models.OneToOneField(Event_H2H, on_delete=models.CASCADE)
 
     n_player = models.PositiveIntegerField(default=4)
@@ -2000,15 +2185,29 @@ class Bracket_4(models.Model):
     is_active = models.BooleanField(default=False)
     is_complete = models.BooleanField(default=False)
     is_losers_bracket = models.BooleanField(default=True)
+    is_double_elimination = models.BooleanField(default=False)
     uuid = models.UUIDField(unique=True, editable=False, default=uuid4)
 
-    def finalize(self):
-        c_win_bool = self.championship.winner is not None
-        c_lose_bool = self.championship.loser is not None
-        l_win_bool = self.loser_bracket_finals.winner is not None
-        l_lose_bool = self.loser_bracket_finals.loser is not None
+    def get_plan(self):
+        return plan_bracket(self.n_player, double_elimination=self.is_double_elimination, third_place=self.is_losers_bracket)
+
+    def get_matchups(self):
+        # The whole tree in one query, keyed by plan index
+        matchups = self.bracketmatchup_set.select_related('team_1', 'team_2', 'winner', 'loser')
+        return {matchup.index: matchup for matchup in matchups}
+
+    def save_matchups(self, matchups):
+        if not matchups:
+            return
+        BracketMatchup.objects.bulk_update(matchups, BRACKET_ADVANCE_FIELDS)
+        CompetitionParticipation.sync(matchups)
+
+    @bumps_revision(lambda bracket: bracket.event.brolympics_id)
+    def finalize(self, matchups=None):
+        if matchups is None:
+            matchups = self.get_matchups()
 
-        if c_win_bool and c_lose_bool and l_win_bool and l_lose_bool:
+        if self.get_plan().is_complete(matchups):
             self.is_active=False
             self.is_complete=True
             self.save()
@@ -2016,64 +2215,199 @@ class Bracket_4(models.Model):
             self.event.finalize()
 
     def create_matchups(self):
-        championship = BracketMatchup.objects.create(
-            bracket=self, event=self.event
-        )
-        loser_bracket_finals = BracketMatchup.objects.create(
-            bracket=self, event=self.event
-        )
-
-        one_four = BracketMatchup.objects.create(
-            bracket=self, 
-            event=self.event,
-            team_1_seed=1, 
-            team_2_seed=4, 
-            winner_node=championship,
-            loser_node=loser_bracket_finals
-        )
-        
-        two_three = BracketMatchup.objects.create(
-            bracket=self,
-            event=self.event,
-            team_1_seed=3, 
-            team_2_seed=2,
-            winner_node=championship,
-            loser_node=loser_bracket_finals
-        )
+        plan = self.get_plan()
+        matchups = [
+            BracketMatchup(
+                bracket=self,
+                event=self.event,
+                index=node.index,
+                side=node.side,
+                round=node.round,
+                team_1_seed=node.seeds[0] if node.seeds else None,
+                team_2_seed=node.seeds[1] if node.seeds else None,
+            )
+            for node in plan.nodes
+        ]
+        BracketMatchup.objects.bulk_create(matchups)
+        if matchups and matchups[0].pk is None:
+            # Backends that can't return ids from a bulk insert
+            matchups = list(self.bracketmatchup_set.order_by('index'))
+
+        sources = plan.get_sources()
+        for node, matchup in zip(plan.nodes, matchups):
+            matchup.winner_node = matchups[node.winner_to[0]] if node.winner_to else None
+            matchup.loser_node = matchups[node.loser_to[0]] if node.loser_to else None
+
+            fed_by = {slot: index for slot, (index, result) in sources[node.index].items() if result == 'winner'}
+            matchup.left = matchups[fed_by[1]] if 1 in fed_by else None
+            matchup.right = matchups[fed_by[2]] if 2 in fed_by else None
+        BracketMatchup.objects.bulk_update(matchups, ['winner_node', 'loser_node', 'left', 'right'])
+
+        # Set by id so nothing holds on to these instances once results start changing them
+        if plan.root is not None:
+            self.championship_id = matchups[plan.root].pk
+        if plan.consolation is not None:
+            self.loser_bracket_finals_id = matchups[plan.consolation].pk
+        self.save()
 
-        championship.left = one_four
-        championship.right = two_three
+    def update_teams(self, playoff_teams):
+        matchups = self.get_matchups()
+        # Seeding follows the standings until the first bracket game is played
+        if any(matchup.start_time or (matchup.is_complete and not matchup.is_bye) for matchup in matchups.values()):
+            return
 
-        self.loser_bracket_finals = loser_bracket_finals
-        self.championship = championship #root
+        team_map = Team.objects.in_bulk([ranking.team_id for ranking in playoff_teams])
+        teams = [team_map[ranking.team_id] for ranking in playoff_teams]
 
-        self.championship.save()
-        self.loser_bracket_finals.save()
+        self.save_matchups(self.get_plan().seed(matchups, teams, resolve_byes=self.is_active))
         self.save()
 
-    def update_teams(self, playoff_teams):
-        seed_1 = playoff_teams[0].team
-        seed_2 = playoff_teams[1].team
-        seed_3 = playoff_teams[2].team
-        seed_4 = playoff_teams[3].team
+    def advance(self, matchup):
+        matchups = self.get_matchups()
+        matchups[matchup.index] = matchup
 
-        self.championship.left.team_1 = seed_1
-        self.championship.left.team_2 = seed_4
+        plan = self.get_plan()
+        self.save_matchups(plan.advance(matchups, matchup.index))
 
-        self.championship.right.team_1 = seed_3
-        self.championship.right.team_2 = seed_2
+        if plan.nodes[matchup.index].winner_to is None:
+            self.finalize(matchups)
 
-        self.championship.left.save()
-        self.championship.right.save()
-        self.save()
+    def get_final_order(self):
+        return self.get_plan().get_final_order(self.get_matchups())
         
     def __str__(self):
         return self.event.name + ' Bracket'
 
-    
 
+class CompetitionParticipation(models.Model):
+    '''
+    One row per player per competition so "my competitions" lookups are a single indexed
+    query instead of ORs joined through both team slots and both player slots.
+    '''
+    COMP_TYPES = (
+        ('h2h', 'Head to Head'),
+        ('bracket', 'Bracket'),
+        ('ind', 'Individual'),
+        ('team', 'Team'),
+    )
+    STATUSES = (
+        ('upcoming', 'Upcoming'),
+        ('active', 'Active'),
+        ('paused', 'Paused'),
+        ('complete', 'Complete'),
+    )
 
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='participations'
+    )
+    team = models.ForeignKey(
+        Team,
+        on_delete=models.CASCADE,
+        related_name='participations'
+    )
+    brolympics = models.ForeignKey(
+        Brolympics,
+        on_delete=models.CASCADE,
+        related_name='participations'
+    )
 
+    comp_type = models.CharField(max_length=8, choices=COMP_TYPES)
+    comp_id = models.PositiveBigIntegerField()
+    comp_uuid = models.UUIDField()
+    status = models.CharField(max_length=8, choices=STATUSES, default='upcoming')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['comp_type', 'comp_id', 'team', 'user'], name='unique_participation'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'status'], name='participation_status_idx'),
+            models.Index(fields=['comp_type', 'comp_id'], name='participation_comp_idx'),
+        ]
 
+    @staticmethod
+    def get_comp_type(comp):
+        if isinstance(comp, BracketMatchup):
+            return 'bracket'
+        if isinstance(comp, Competition_H2H):
+            return 'h2h'
+        if isinstance(comp, Competition_Ind):
+            return 'ind'
+        return 'team'
+
+    @staticmethod
+    def get_status(comp):
+        if comp.is_complete:
+            return 'complete'
+        if comp.is_active:
+            return 'active'
+        if comp.start_time is None:
+            return 'upcoming'
+        return 'paused'
+
+    @classmethod
+    def build(cls, comp):
+        comp_type = cls.get_comp_type(comp)
+        status = cls.get_status(comp)
+
+        participations = []
+        for team in comp.get_participation_teams():
+            for user_id in {team.player_1_id, team.player_2_id} - {None}:
+                participations.append(cls(
+                    user_id=user_id,
+                    team=team,
+                    brolympics_id=team.brolympics_id,
+                    comp_type=comp_type,
+                    comp_id=comp.pk,
+                    comp_uuid=comp.uuid,
+                    status=status,
+                ))
+        return participations
+
+    @classmethod
+    def sync(cls, comps):
+        comp_ids = defaultdict(list)
+        participations = []
+        for comp in comps:
+            comp_ids[cls.get_comp_type(comp)].append(comp.pk)
+            participations += cls.build(comp)
+            comp._participation_teams = comp.get_participation_team_ids()
+
+        for comp_type, ids in comp_ids.items():
+            cls.objects.filter(comp_type=comp_type, comp_id__in=ids).delete()
+        cls.objects.bulk_create(participations)
+
+    @classmethod
+    def sync_competition(cls, comp):
+        if getattr(comp, '_participation_teams', None) == comp.get_participation_team_ids():
+            cls.objects.filter(
+                comp_type=cls.get_comp_type(comp),
+                comp_id=comp.pk,
+            ).update(status=cls.get_status(comp))
+            return
+        cls.sync([comp])
+
+    @classmethod
+    def sync_team(cls, team):
+        comps = []
+        for model in [Competition_H2H, BracketMatchup]:
+            comps += model.objects.filter(Q(team_1=team) | Q(team_2=team)).select_related('team_1', 'team_2')
+        for model in [Competition_Ind, Competition_Team]:
+            comps += model.objects.filter(team=team).select_related('team')
+        cls.sync(comps)
+
+    @classmethod
+    def comp_ids(cls, user, comp_type, available=False, **filters):
+        '''
+        Subquery of the ids of user's competitions of one type. With available=True only
+        competitions where the user's own team is free count, like find_available_comps.
+        '''
+        participations = cls.objects.filter(user=user, comp_type=comp_type, **filters)
+        if available:
+            participations = participations.filter(team__is_available=True)
+        return participations.values('comp_id')
 
+    def __str__(self):
+        return f'{self.user} - {self.comp_type} {self.comp_id}'
@@ -0,0 +1,92 @@
+from __future__ import annotations
+from functools import lru_cache
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+SCORING_SCHEMES = (
+    ('bonus', 'Bonus'),
+    ('linear', 'Linear'),
+    ('f1', 'F1'),
+    ('custom', 'Custom'),
+)
+DEFAULT_SCORING_SCHEME = 'bonus'
+
+PODIUM_BONUS = {1: 4, 2: 2, 3: 1}
+F1_POINTS = (25, 18, 15, 12, 10, 8, 6, 4, 2, 1)
+
+
+def bonus_points(rank, n_teams, table):
+    return n_teams - rank + 1 + PODIUM_BONUS.get(rank, 0)
+
+def linear_points(rank, n_teams, table):
+    return n_teams - rank + 1
+
+def f1_points(rank, n_teams, table):
+    return F1_POINTS[rank-1] if rank <= len(F1_POINTS) else 0
+
+def custom_points(rank, n_teams, table):
+    return table[rank-1] if rank <= len(table) else 0
+
+SCHEME_FUNCTIONS = {
+    'bonus': bonus_points,
+    'linear': linear_points,
+    'f1': f1_points,
+    'custom': custom_points,
+}
+
+
+@lru_cache(maxsize=512)
+def get_points_table(n_teams, scheme=DEFAULT_SCORING_SCHEME, table=()):
+    '''
+    Read only {rank: points} for n_teams under a scoring scheme, built once per
+    (n_teams, scheme, table) and shared by every caller.
+    '''
+    points_for = SCHEME_FUNCTIONS.get(scheme, bonus_points)
+    return MappingProxyType({rank: points_for(rank, n_teams, table) for rank in range(1, n_teams+1)})
+
+
+def clean_points_table(points_table):
+    if not isinstance(points_table, (list, tuple)):
+        raise ValueError('Points table must be a list of points, first place first.')
+
+    for points in points_table:
+        if isinstance(points, bool) or not isinstance(points, (int, float)) or points < 0:
+            raise ValueError('Points must be non-negative numbers.')
+
+    return tuple(points_table)
+
+
+## Roster size ##
+def get_n_teams_key(brolympics):
+    return f'brolympics-n-teams:{brolympics.uuid}'
+
+
+def get_n_teams(brolympics):
+    # Dropped whenever a team is added or removed, the timeout bounds a missed drop
+    key = get_n_teams_key(brolympics)
+    n_teams = cache.get(key)
+    if n_teams is None:
+        n_teams = brolympics.teams.count()
+        cache.set(key, n_teams, settings.ROSTER_SIZE_CACHE_SECONDS)
+    return n_teams
+
+
+def invalidate_n_teams(brolympics):
+    key = get_n_teams_key(brolympics)
+    cache.delete(key)
+    # Again once committed, a count read before then is the old roster
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def get_brolympics_points_table(brolympics, n_teams=None):
+    if n_teams is None:
+        n_teams = get_n_teams(brolympics)
+
+    table = ()
+    if brolympics.scoring_scheme == 'custom':
+        table = clean_points_table(brolympics.points_table or ())
+    return get_points_table(n_teams, brolympics.scoring_scheme, table)
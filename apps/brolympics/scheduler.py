@@ -0,0 +1,201 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from random import Random
+
+
+@dataclass(frozen=True)
+class Pairing:
+    round: int
+    team_1: object
+    team_2: object
+
+
+def get_circle_round(slots, r):
+    '''
+    Round r of the circle method (Berger tables): the last slot stays put and the rest
+    rotate one step a round, so over len(slots)-1 rounds everyone meets once.
+    '''
+    m = len(slots) - 1
+    pairs = [(slots[-1], slots[r])]
+    for i in range(1, len(slots) // 2):
+        pairs.append((slots[(r + i) % m], slots[(r - i) % m]))
+    return [(a, b) for a, b in pairs if a is not None and b is not None]
+
+
+def orient_home_away(rounds):
+    '''
+    Picks home and away for every pair so each team ends within one home game of its
+    away games. Teams with an odd number of games are joined to a dummy so every degree
+    is even, then each closed walk through the unused pairs is hosted by the team the
+    walk leaves from, one home and one away every time it passes through a team.
+    '''
+    edges = [(round_index, pair_index) for round_index, pairs in enumerate(rounds) for pair_index in range(len(pairs))]
+    adjacency = {}
+    for edge_id, (round_index, pair_index) in enumerate(edges):
+        for team in rounds[round_index][pair_index]:
+            adjacency.setdefault(team, []).append(edge_id)
+
+    dummy = object()
+    odd = [team for team, edge_ids in adjacency.items() if len(edge_ids) % 2]
+    for team in odd:
+        edges.append((None, team))
+        adjacency[team].append(len(edges) - 1)
+        adjacency.setdefault(dummy, []).append(len(edges) - 1)
+
+    used = [False] * len(edges)
+    next_edge = {team: 0 for team in adjacency}
+    for start in adjacency:
+        team = start
+        while True:
+            edge_ids = adjacency[team]
+            while next_edge[team] < len(edge_ids) and used[edge_ids[next_edge[team]]]:
+                next_edge[team] += 1
+            if next_edge[team] == len(edge_ids):
+                break
+
+            edge_id = edge_ids[next_edge[team]]
+            used[edge_id] = True
+            round_index, pair_index = edges[edge_id]
+            if round_index is None:
+                team = dummy if team is not dummy else pair_index
+                continue
+
+            team_1, team_2 = rounds[round_index][pair_index]
+            opponent = team_2 if team == team_1 else team_1
+            rounds[round_index][pair_index] = (team, opponent)
+            team = opponent
+
+
+class RoundRobinScheduler:
+    '''
+    Partial round robin of n_rounds circle method rounds, so no pairing repeats and
+    every team plays once a round. Teams are shuffled with a seeded Random, the same
+    seed always gives the same schedule.
+
+    avoid is a set of frozenset pairs that should not meet, say opponents from other
+    events. It is a soft constraint: rounds with the fewest avoided pairs are picked,
+    the rest are repaired by trading opponents, and a few shuffles are tried before
+    settling for the schedule with the fewest left.
+
+    With an odd count the empty slot is the fixed one, so the team sitting out round r
+    is slots[r]. Teams that sat out meet in a final make up round, earliest against
+    latest, which for a run of rounds are pairs the circle has not used yet.
+    '''
+    attempts = 8
+
+    def __init__(self, teams, n_rounds, seed=None, avoid=(), balance_home_away=True):
+        self.teams = list(teams)
+        self.seed = seed
+        self.avoid = avoid
+        self.balance_home_away = balance_home_away
+
+        self.n_available = max(len(self.teams) - 1 + len(self.teams) % 2, 0)
+        self.n_rounds = min(n_rounds, self.n_available)
+
+    def schedule(self):
+        rng = Random(self.seed)
+        best = None
+        n_attempts = self.attempts if self.avoid else 1
+        for attempt in range(n_attempts):
+            slots = list(self.teams)
+            rng.shuffle(slots)
+            if len(slots) % 2:
+                slots.append(None)
+
+            # A run of rounds always leaves a full make up round, the fallback for odd counts
+            picked = self.pick_rounds(slots, rng, run=attempt == n_attempts - 1)
+            rounds = [get_circle_round(slots, r) for r in picked]
+            if slots and slots[-1] is None:
+                rounds.append(self.make_up_round(rounds, [slots[r] for r in picked]))
+
+            # A team a game short is worse than meeting an old opponent
+            score = (self.count_short(rounds), self.repair(rounds) if self.avoid else 0)
+            if best is None or score < best[0]:
+                best = (score, rounds)
+            if best[0] <= (len(self.teams) * self.n_rounds % 2, 0):
+                break
+
+        rounds = best[1]
+        if self.balance_home_away:
+            orient_home_away(rounds)
+
+        return [
+            Pairing(round_number, team_1, team_2)
+            for round_number, pairs in enumerate(rounds, 1)
+            for team_1, team_2 in pairs
+        ]
+
+    def pick_rounds(self, slots, rng, run=False):
+        # Circle rounds to play, in circle order
+        if not self.avoid or run:
+            return list(range(self.n_rounds))
+
+        order = list(range(self.n_available))
+        rng.shuffle(order)
+
+        clean, conflicted = [], []
+        for r in order:
+            n_conflicts = sum(frozenset(pair) in self.avoid for pair in get_circle_round(slots, r))
+            if n_conflicts:
+                conflicted.append((n_conflicts, r))
+                continue
+            clean.append(r)
+            if len(clean) == self.n_rounds:
+                break
+
+        conflicted.sort()
+        return sorted(clean + [r for _, r in conflicted[:self.n_rounds - len(clean)]])
+
+    def repair(self, rounds):
+        '''
+        Breaks up avoided pairs by trading opponents with another pair of the round,
+        (a, b), (c, d) -> (a, d), (c, b). A new pair must not appear anywhere else in
+        the schedule, which keeps pairings unique. Returns how many avoided pairs are left.
+        '''
+        taken = {frozenset(pair) for pairs in rounds for pair in pairs}
+        n_conflicts = 0
+        for pairs in rounds:
+            for i, (a, b) in enumerate(pairs):
+                if frozenset([a, b]) not in self.avoid:
+                    continue
+                for j, (c, d) in enumerate(pairs):
+                    swapped = [frozenset([a, d]), frozenset([c, b])]
+                    if j == i or any(pair in taken or pair in self.avoid for pair in swapped):
+                        continue
+                    pairs[i], pairs[j] = (a, d), (c, b)
+                    taken.difference_update([frozenset([a, b]), frozenset([c, d])])
+                    taken.update(swapped)
+                    break
+                else:
+                    n_conflicts += 1
+        return n_conflicts
+
+    def make_up_round(self, rounds, sat_out):
+        # Sitting out every round means playing them all, nothing to make up
+        if len(sat_out) >= self.n_available:
+            return []
+
+        played = {frozenset(pair) for pairs in rounds for pair in pairs}
+        make_up = []
+        short = list(sat_out)
+        while short:
+            team = short.pop(0)
+            for opponent in reversed(short):
+                if frozenset([team, opponent]) not in played:
+                    short.remove(opponent)
+                    make_up.append((team, opponent))
+                    break
+        return make_up
+
+    def count_short(self, rounds):
+        games = {}
+        for pairs in rounds:
+            for pair in pairs:
+                for team in pair:
+                    games[team] = games.get(team, 0) + 1
+        target = min(self.n_rounds, len(self.teams) - 1)
+        return sum(games.get(team, 0) < target for team in self.teams)
+
+
+def schedule_round_robin(teams, n_rounds, seed=None, avoid=(), balance_home_away=True):
+    return RoundRobinScheduler(teams, n_rounds, seed, avoid, balance_home_away).schedule()
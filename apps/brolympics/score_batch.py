@@ -0,0 +1,158 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from uuid import UUID
+import logging
+
+from django.db import transaction
+
+from apps.brolympics.models import (
+    BracketMatchup,
+    Competition_H2H,
+    Competition_Ind,
+    Competition_Team,
+)
+
+logger = logging.getLogger(__name__)
+
+COMP_MODELS = {
+    'h2h': Competition_H2H,
+    'ind': Competition_Ind,
+    'team': Competition_Team,
+    'bracket': BracketMatchup,
+}
+
+COMP_RELATED = {
+    'h2h': ['event', 'team_1', 'team_2'],
+    'ind': ['event', 'team'],
+    'team': ['event', 'team'],
+    'bracket': ['event', 'bracket', 'team_1', 'team_2', 'winner_node', 'loser_node'],
+}
+
+SCORE_FIELDS = {
+    'h2h': ['team_1_score', 'team_2_score'],
+    'ind': ['player_1_score', 'player_2_score'],
+    'team': ['team_score'],
+    'bracket': ['team_1_score', 'team_2_score'],
+}
+
+SCORE_LABELS = {
+    'team_1_score': 'team 1',
+    'team_2_score': 'team 2',
+    'player_1_score': 'player 1',
+    'player_2_score': 'player 2',
+    'team_score': 'the team',
+}
+
+
+@dataclass
+class ScoreItem:
+    index: int
+    type: str
+    uuid: str
+    scores: list = field(default_factory=list)
+    comp: object = None
+    error: str = None
+
+    def as_result(self):
+        if self.error:
+            return {'uuid': self.uuid, 'type': self.type, 'status': 'error', 'error': self.error}
+        return {'uuid': self.uuid, 'type': self.type, 'status': 'applied'}
+
+
+class ScoreBatch:
+    '''
+    Applies many admin results for one brolympics in a single transaction. Every item
+    gets its own savepoint so a bad item is reported instead of aborting the batch, and
+    rankings/completion are recomputed once per affected event instead of once per result.
+    Bracket results go last, in bracket order, once the round robins they seed from are settled.
+    '''
+    def __init__(self, brolympics, results):
+        self.brolympics = brolympics
+        self.items = [self._parse(index, result) for index, result in enumerate(results)]
+
+    def _parse(self, index, result):
+        if not isinstance(result, dict):
+            return ScoreItem(index, None, None, error='Result must be an object.')
+
+        item = ScoreItem(index, result.get('type'), result.get('uuid'))
+        if item.type not in COMP_MODELS:
+            item.error = f'Unknown competition type {item.type}.'
+            return item
+
+        try:
+            UUID(str(item.uuid))
+        except ValueError:
+            item.error = 'Competition not found.'
+            return item
+
+        for score_field in SCORE_FIELDS[item.type]:
+            score = result.get(score_field)
+            if score == '' or score is None:
+                item.error = f'Must enter a score for {SCORE_LABELS[score_field]}.'
+                return item
+            item.scores.append(score)
+        return item
+
+    def _load_comps(self, comp_type):
+        items = [item for item in self.items if item.type == comp_type and not item.error]
+        if not items:
+            return []
+
+        comps = COMP_MODELS[comp_type].objects.filter(
+            event__brolympics=self.brolympics,
+            uuid__in=[item.uuid for item in items],
+        ).select_related(*COMP_RELATED[comp_type])
+        comps = {str(comp.uuid): comp for comp in comps}
+
+        for item in items:
+            item.comp = comps.get(str(item.uuid))
+            if item.comp is None:
+                item.error = 'Competition not found.'
+        return [item for item in items if not item.error]
+
+    def _apply_item(self, item, apply):
+        try:
+            with transaction.atomic():
+                apply(item)
+            return True
+        except Exception as e:
+            logger.info(f'Score batch item {item.uuid} failed: {e}')
+            item.error = str(e) or 'Could not apply this result.'
+            return False
+
+    def apply(self):
+        with transaction.atomic():
+            touched = {}
+
+            for comp_type in ['h2h', 'ind', 'team']:
+                for item in self._load_comps(comp_type):
+                    if self._apply_item(item, lambda item: item.comp.admin_end(*item.scores, defer_update=True)):
+                        touched[(comp_type, item.comp.event_id)] = item.comp.event
+
+            for (comp_type, _), event in touched.items():
+                self._update_event(comp_type, event)
+
+            # Loaded after the round robins settle so the seeded teams are current
+            bracket_items = self._load_comps('bracket')
+            bracket_items.sort(key=lambda item: (item.comp.bracket_id, item.comp.index))
+            for item in bracket_items:
+                self._apply_item(item, self._end_bracket_matchup)
+
+        return [item.as_result() for item in self.items]
+
+    def _end_bracket_matchup(self, item):
+        # Earlier items in this batch may have just advanced teams into this matchup
+        item.comp.refresh_from_db()
+        item.comp.end(*item.scores)
+
+    def _update_event(self, comp_type, event):
+        if comp_type == 'h2h':
+            event.full_update_event_rankings_h2h()
+            event.check_for_round_robin_completion()
+            return
+
+        if comp_type == 'ind':
+            event.update_event_rankings_ind()
+        else:
+            event.update_event_rankings_team()
+        event.check_for_completion()
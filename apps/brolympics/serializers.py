@@ -2,8 +2,11 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from apps.brolympics.models import *
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 import datetime
+from apps.image_pipeline import image_pipeline, ImageVariantsField
+from apps.brolympics.points import clean_points_table
 
 User = get_user_model()
 
@@ -32,10 +35,11 @@ class AllLeaguesSerializer(serializers.ModelSerializer):
     is_owner = serializers.SerializerMethodField()
     founded = serializers.SerializerMethodField()
     league_owner = serializers.SerializerMethodField()
+    img_variants = ImageVariantsField()
 
     class Meta:
         model = League
-        fields = ['uuid', 'name', 'img' ,'is_owner', 'founded', 'league_owner']
+        fields = ['uuid', 'name', 'img', 'img_variants', 'is_owner', 'founded', 'league_owner']
 
     def get_is_owner(self, obj):
         request = self.context.get('request')
@@ -84,10 +88,11 @@ class TeamSerializer(serializers.ModelSerializer):
     player_1 = PlayerSerializer(required=False)
     player_2 = PlayerSerializer(required=False)
     brolympics_uuid = serializers.UUIDField(write_only=True)
+    img_variants = ImageVariantsField()
 
     class Meta:
         model = Team
-        fields = ['name', 'player_1', 'player_2', 'is_available', 'wins', 'losses', 'ties', 'uuid', 'img', 'brolympics_uuid']
+        fields = ['name', 'player_1', 'player_2', 'is_available', 'wins', 'losses', 'ties', 'uuid', 'img', 'img_variants', 'brolympics_uuid']
 
     def create(self, validated_data):
         player_1_uid = validated_data.pop('player_1', None)
@@ -116,12 +121,7 @@ class TeamSerializer(serializers.ModelSerializer):
                 pass 
 
         if img_data:
-            team.img = img_data
-            team.save()
-
-        if img_data:
-            team.img = img_data
-            team.save()
+            image_pipeline.submit(team, img_data.read())
 
         return team
 
@@ -162,7 +162,7 @@ class EventBasicSerializer_H2h(serializers.ModelSerializer):
     class Meta:
         model = Event_H2H
         fields = [
-            'n_matches', 'n_active_limit', 'n_bracket_teams', 'is_available', 'is_round_robin_complete', 'type', 'decimal_places'
+            'n_matches', 'n_active_limit', 'n_bracket_teams', 'bracket_type', 'is_available', 'is_round_robin_complete', 'type', 'decimal_places'
             ] + eventAbstractFields
 
     def get_decimal_places(self, obj):
@@ -219,10 +219,39 @@ class BrolympicsSerializer(serializers.ModelSerializer):
     is_owner = serializers.SerializerMethodField()
     user_team = serializers.SerializerMethodField()
     league_owner = serializers.SerializerMethodField()
+    img_variants = ImageVariantsField()
 
     class Meta:
         model = Brolympics
-        fields = ['name', 'is_registration_open', 'projected_start_date', 'projected_end_date', 'start_time', 'end_time', 'is_complete', 'winner', 'uuid', 'img', 'teams', 'events', 'is_owner', 'is_active', 'user_team', 'league_owner']
+        fields = ['name', 'is_registration_open', 'projected_start_date', 'projected_end_date', 'start_time', 'end_time', 'is_complete', 'winner', 'uuid', 'img', 'img_variants', 'teams', 'events', 'is_owner', 'is_active', 'user_team', 'league_owner', 'scoring_scheme', 'points_table']
+
+    @classmethod
+    def get_queryset(cls, queryset=None):
+        '''
+        Everything this serializer touches, loaded up front so a list of brolympics
+        serializes in the same number of queries as one.
+        '''
+        if queryset is None:
+            queryset = Brolympics.objects.all()
+        return queryset.select_related('league__league_owner').prefetch_related(
+            Prefetch('teams', queryset=Team.objects.select_related('player_1', 'player_2')),
+            'event_h2h_set',
+            'event_ind_set',
+            'event_team_set',
+        )
+
+    def get_user_teams(self):
+        # {brolympics_id: team} for the requesting user, shared by every brolympics in the request
+        if 'user_teams' not in self.context:
+            user_teams = {}
+            request = self.context.get('request')
+            if request and request.user.is_authenticated:
+                user = request.user
+                teams = Team.objects.filter(Q(player_1=user) | Q(player_2=user)).select_related('player_1', 'player_2').order_by('id')
+                for team in teams:
+                    user_teams.setdefault(team.brolympics_id, team)
+            self.context['user_teams'] = user_teams
+        return self.context['user_teams']
 
     def get_teams(self, obj):
         return TeamSerializer(obj.teams.all(), many=True, context=self.context).data
@@ -241,11 +270,9 @@ class BrolympicsSerializer(serializers.ModelSerializer):
         return False
     
     def get_user_team(self, obj):
-        request = self.context.get('request')
-        user = request.user
-        team = Team.objects.filter(Q(player_1=user) | Q(player_2=user), brolympics=obj)
-        if team.exists():
-            return TeamSerializer(team.first(), context=self.context).data
+        team = self.get_user_teams().get(obj.id)
+        if team is not None:
+            return TeamSerializer(team, context=self.context).data
         return None
     
     def get_league_owner(self, obj):
@@ -257,27 +284,49 @@ class LeagueInfoSerializer(serializers.ModelSerializer):
     founded = serializers.SerializerMethodField()
     completed_brolympics = serializers.SerializerMethodField()
     upcoming_brolympics = serializers.SerializerMethodField()
+    img_variants = ImageVariantsField()
 
     class Meta:
         model = League
-        fields = ['name', 'uuid', 'img', 'founded', 'upcoming_brolympics', 'completed_brolympics', 'league_owner']
+        fields = ['name', 'uuid', 'img', 'img_variants', 'founded', 'upcoming_brolympics', 'completed_brolympics', 'league_owner']
+
+    @classmethod
+    def get_queryset(cls, queryset=None):
+        if queryset is None:
+            queryset = League.objects.all()
+        return queryset.select_related('league_owner').prefetch_related(
+            Prefetch('brolympics_set', queryset=BrolympicsSerializer.get_queryset().order_by('id'))
+        )
 
     def get_founded(self, obj):
         return str(obj.founded.year)
     
     def get_completed_brolympics(self, obj):
-        completed = obj.brolympics_set.filter(is_complete=True)
+        completed = [brolympics for brolympics in obj.brolympics_set.all() if brolympics.is_complete]
         return BrolympicsSerializer(completed, many=True, context=self.context).data
 
     def get_upcoming_brolympics(self, obj):
-        upcoming = obj.brolympics_set.filter(is_complete=False)
+        upcoming = [brolympics for brolympics in obj.brolympics_set.all() if not brolympics.is_complete]
         return BrolympicsSerializer(upcoming, many=True, context=self.context).data
 
 
 class BrolympicsCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Brolympics
-        fields = ['league', 'name', 'projected_start_date', 'projected_end_date','img']
+        fields = ['league', 'name', 'projected_start_date', 'projected_end_date','img', 'scoring_scheme', 'points_table']
+
+    def validate_points_table(self, value):
+        try:
+            return list(clean_points_table(value))
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+    def validate(self, data):
+        scoring_scheme = data.get('scoring_scheme', getattr(self.instance, 'scoring_scheme', None))
+        points_table = data.get('points_table', getattr(self.instance, 'points_table', None))
+        if scoring_scheme == 'custom' and not points_table:
+            raise serializers.ValidationError({'points_table': 'A custom scoring scheme needs a points table.'})
+        return data
 
 class EventTeamCreateAllSerializer(serializers.ModelSerializer):
     class Meta:
@@ -334,6 +383,12 @@ h2h_comp_fields = [
     'winner', 'loser', 'start_time', 'end_time', 'is_complete', 'uuid', 'is_active', 'is_bracket', 'type', 'team_1_record', 'team_2_record'
 ]         
 
+def format_record(wins, losses, ties):
+    record = f'{wins}-{losses}'
+    record += f'-{ties}' if ties != 0 else ''
+    return record
+
+
 class BaseCompetitionSerializer(serializers.ModelSerializer):
     team_1 = TeamSerializer()
     team_1_record = serializers.SerializerMethodField()
@@ -347,23 +402,30 @@ class BaseCompetitionSerializer(serializers.ModelSerializer):
         model = Competition_H2H
         fields = [] + h2h_comp_fields
 
+    def _get_record(self, obj, slot):
+        records = self.context.get('h2h_records')
+        if records is not None:
+            record = records.get((obj.event_id, getattr(obj, f'{slot}_id')))
+            if record is None:
+                return None
+            return format_record(*record)
+
+        if hasattr(obj, f'{slot}_wins'):
+            wins = getattr(obj, f'{slot}_wins')
+            if wins is None:
+                return None
+            return format_record(wins, getattr(obj, f'{slot}_losses'), getattr(obj, f'{slot}_ties'))
+
+        ranking = EventRanking_H2H.objects.filter(team=getattr(obj, slot), event=obj.event).first()
+        if ranking is None:
+            return None
+        return format_record(ranking.wins, ranking.losses, ranking.ties)
+
     def get_team_1_record(self, obj):
-        ranking = EventRanking_H2H.objects.filter(team=obj.team_1, event=obj.event)
-        record = None
-        if ranking.exists():
-            ranking = ranking.first()
-            record = f'{ranking.wins}-{ranking.losses}'
-            record += f'-{ranking.ties}' if ranking.ties != 0 else ''
-        return record
+        return self._get_record(obj, 'team_1')
     
     def get_team_2_record(self, obj):
-        ranking = EventRanking_H2H.objects.filter(team=obj.team_2, event=obj.event)
-        record = None
-        if ranking.exists():
-            ranking = ranking.first()
-            record = f'{ranking.wins}-{ranking.losses}'
-            record += f'-{ranking.ties}' if ranking.ties != 0 else ''
-        return record
+        return self._get_record(obj, 'team_2')
 
     def to_representation(self, instance):
         self.fields['team_1'].context.update(self.context)
@@ -383,7 +445,7 @@ class BaseCompetitionSerializer(serializers.ModelSerializer):
 class CompetitionSerializer_H2h(BaseCompetitionSerializer):
     type = serializers.SerializerMethodField()
     class Meta(BaseCompetitionSerializer.Meta):
-        fields = ['type'] + BaseCompetitionSerializer.Meta.fields
+        fields = ['type', 'round'] + BaseCompetitionSerializer.Meta.fields
 
     def get_type(self, obj):
         return 'h2h'
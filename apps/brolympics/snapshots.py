@@ -0,0 +1,99 @@
+from __future__ import annotations
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Q
+
+from apps.brolympics.models import (
+    Event_H2H,
+    Event_IND,
+    Event_Team,
+    EventRanking_H2H,
+    EventRanking_Ind,
+    EventRanking_Team,
+    StandingsSnapshot,
+)
+from apps.brolympics.active_serializers import OverallRankingSerializer, SmallTeamSerializer
+from apps.brolympics.live import get_standings_diff, publish
+
+
+PODIUM_PLACES = {1: 'first', 2: 'second', 3: 'third'}
+
+
+def get_podiums(brolympics, event_model, ranking_model, rankings_name):
+    # Events count as soon as their rankings are final, finalize() saves is_complete afterwards
+    events = list(
+        event_model.objects.filter(
+            Q(is_complete=True) | Q(**{f'{rankings_name}__is_final': True}),
+            brolympics=brolympics,
+        ).distinct()
+    )
+
+    podium_rankings = ranking_model.objects.filter(
+        event__in=events,
+        rank__lte=3,
+    ).select_related('team').order_by('event_id', 'rank', 'id')
+
+    event_to_places = defaultdict(lambda: defaultdict(list))
+    for ranking in podium_rankings:
+        event_to_places[ranking.event_id][ranking.rank].append(ranking.team)
+
+    event_data = []
+    for event in events:
+        podium_data = {'event': event.name}
+        for rank, place in PODIUM_PLACES.items():
+            teams = event_to_places[event.id][rank]
+            podium_data[place] = SmallTeamSerializer(teams, many=True).data
+        event_data.append(podium_data)
+
+    return event_data
+
+
+def build_standings(brolympics):
+    all_rankings = brolympics.overall_ranking.select_related('team').order_by('id')
+
+    podiums = (
+        get_podiums(brolympics, Event_H2H, EventRanking_H2H, 'event_h2h_event_rankings') +
+        get_podiums(brolympics, Event_IND, EventRanking_Ind, 'event_ind_event_rankings') +
+        get_podiums(brolympics, Event_Team, EventRanking_Team, 'event_team_event_rankings')
+    )
+
+    return {
+        'standings': OverallRankingSerializer(all_rankings, many=True).data,
+        'podiums': podiums,
+    }
+
+
+def rebuild_standings_snapshot(brolympics):
+    data = build_standings(brolympics)
+
+    with transaction.atomic():
+        snapshot, _ = StandingsSnapshot.objects.select_for_update().get_or_create(
+            uuid=brolympics.uuid,
+            defaults={'brolympics': brolympics},
+        )
+        if snapshot.version and snapshot.data == data:
+            return snapshot
+
+        old_data = snapshot.data
+        snapshot.data = data
+        snapshot.version += 1
+        snapshot.save()
+
+    publish(brolympics.pk, get_standings_diff(old_data, data, snapshot.version))
+
+    return snapshot
+
+
+def rebuild_standings_snapshot_on_commit(brolympics_id):
+    # Only snapshots already built, the standings view builds a missing one itself
+    def rebuild():
+        snapshot = StandingsSnapshot.objects.select_related('brolympics').filter(brolympics_id=brolympics_id).first()
+        if snapshot is not None:
+            rebuild_standings_snapshot(snapshot.brolympics)
+
+    transaction.on_commit(rebuild)
+
+
+def get_standings_snapshot(brolympics_uuid):
+    snapshot = StandingsSnapshot.objects.filter(pk=brolympics_uuid).only('uuid', 'version', 'data').first()
+    return snapshot
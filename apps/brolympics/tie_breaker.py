@@ -1,76 +1,116 @@
 from __future__ import annotations
 from collections import defaultdict
-from functools import partial
 import random
 
 
 class TieBreaker:
-    def __init__(self, event):
+    '''
+    Orders an event's EventRanking_H2H objects. Completed competitions are loaded
+    once into a head to head matrix, every comparison after that is pure python.
+
+    Tie break order inside a group with the same win rate:
+        1) Head to head wins (only if every team in the group played each other equally)
+        2) Won games total
+        3) Victory margin
+        4) Strength of schedule
+        5) Strength of schedule wins
+        6) Seeded draw, reproducible for the same event and teams
+    '''
+    def __init__(self, event, seed=None):
         self.event = event
-    
-    def break_tie(self, team_rankings):
-        grouped_teams = self._group_by_win_rate(team_rankings)
-        tie_break_order = [
+        self.seed = str(event.uuid) if seed is None else str(seed)
+
+        self.h2h_wins = defaultdict(int)
+        self.h2h_games = defaultdict(int)
+        self._load_head_to_head()
+
+        self.tie_breakers = [
             self._break_head_to_head_wins,
             self._break_won_games_total,
             self._break_victory_margin,
             self._break_strength_of_schedule,
             self._break_strength_of_schedule_wins,
+            self._break_seeded_draw,
         ]
 
-        return [team for group in grouped_teams for team in self._tie_break_group(group, tie_break_order)]
+    def _load_head_to_head(self):
+        completed_comps = self.event.competition_h2h_set.filter(
+            is_complete=True
+        ).values_list('team_1_id', 'team_2_id', 'winner_id')
+
+        for team_1_id, team_2_id, winner_id in completed_comps:
+            self.h2h_games[frozenset((team_1_id, team_2_id))] += 1
+            if winner_id is not None:
+                loser_id = team_2_id if winner_id == team_1_id else team_1_id
+                self.h2h_wins[(winner_id, loser_id)] += 1
 
-    def _group_by_win_rate(self, tied_teams, tie_breakers):       
-        if len(tied_teams) == 1:
+    ## Ordering ##
+    def break_tie(self, team_rankings):
+        grouped_teams = self._group_by_win_rate(team_rankings)
+        return [team for group in grouped_teams for team in self._tie_break_group(group)]
+
+    def is_above(self, team1, team2):
+        return self.break_tie([team1, team2])[0] is team1
+
+    def _tie_break_group(self, tied_teams):
+        if len(tied_teams) <= 1:
             return tied_teams
 
-        for tie_breaker in tie_breakers:
+        for tie_breaker in self.tie_breakers:
             subgroups = self._apply_tie_breaker(tied_teams, tie_breaker)
             if len(subgroups) > 1:
-                return [team for subgroup in subgroups for team in self._tie_break_group(subgroup, tie_breakers)]
+                return [team for subgroup in subgroups for team in self._tie_break_group(subgroup)]
 
-        random.shuffle(tied_teams)
         return tied_teams
-    
+
     def _apply_tie_breaker(self, teams, tie_breaker):
         values = tie_breaker(teams)
         return self._group_by_value(teams, values)
-    
+
     @staticmethod
     def _group_by_value(teams, values):
         groups = defaultdict(list)
         for team, value in zip(teams, values):
             groups[value].append(team)
         return [groups[value] for value in sorted(groups, reverse=True)]
-    
+
     @staticmethod
     def _group_by_win_rate(teams):
         return TieBreaker._group_by_value(teams, [team.win_rate for team in teams])
-    
+
+    ## Tie Breakers ##
     def _break_head_to_head_wins(self, teams):
-        head_to_head_comps = self._get_head_to_head_comps(teams)
-        wins = defaultdict(int)
-        games_played = defaultdict(int)
+        team_ids = [team.team_id for team in teams]
+        games_played = [
+            sum(self.h2h_games[frozenset((team_id, other_id))] for other_id in team_ids if other_id != team_id)
+            for team_id in team_ids
+        ]
+        if len(set(games_played)) > 1:
+            return [0] * len(teams)  # Return zeros if not all teams played each other equally
 
-        for comp in head_to_head_comps:
-            if comp.winner:
-                wins[comp.winner] += 1
-            games_played[comp.team_1] += 1
-            games_played[comp.team_2] += 1
+        return [
+            sum(self.h2h_wins[(team_id, other_id)] for other_id in team_ids if other_id != team_id)
+            for team_id in team_ids
+        ]
 
-        if len(set(games_played.values())) > 1:
-            return [0] * len(teams)  # Return zeros if not all teams played each other equally
+    def _break_won_games_total(self, teams):
+        return [team.wins for team in teams]
+
+    def _break_victory_margin(self, teams):
+        return [team.score_for - team.score_against for team in teams]
+
+    def _break_strength_of_schedule(self, teams):
+        return [self.get_sos(team) for team in teams]
 
-        return [wins[team.team] for team in teams]
-    
-    def _get_head_to_head_comps(self, teams):
-        team_ids = [team.team.id for team in teams]
-        return Competition_H2H.objects.filter(
-            event=self.event,
-            is_complete=True,
-            team_1__in=team_ids,
-            team_2__in=team_ids
-        )
-        
-    
+    def _break_strength_of_schedule_wins(self, teams):
+        return [team.sos_wins for team in teams]
 
+    def _break_seeded_draw(self, teams):
+        return [random.Random(f'{self.seed}:{team.team_id}').random() for team in teams]
+
+    @staticmethod
+    def get_sos(team):
+        sos_games = team.sos_wins + team.sos_losses + team.sos_ties
+        if sos_games == 0:
+            return 0
+        return (team.sos_wins + team.sos_ties * 0.5) / sos_games
@@ -27,6 +27,7 @@ urlpatterns = [
     path('update-comp-ind/', UpdateCompInd.as_view(), name='update_comp_ind'),
     path('update-comp-team/', UpdateCompTeam.as_view(), name='updated_comp_team'),
     path('update-bracket-comp/', UpdateBracketComp.as_view(), name='update_bracket_comp'),
+    path('update-comps-batch/', UpdateCompBatch.as_view(), name='update_comps_batch'),
     path('update-team-image/', UpdateTeamImage.as_view(), name='update_team_img'),
 
 
@@ -73,4 +74,7 @@ urlpatterns = [
 
         #Standings
     path('get-standings-info/<uuid:uuid>', GetStandingsInfo.as_view(), name='get_standings_info'),
+
+        #Live
+    path('live/<uuid:uuid>', LiveUpdates.as_view(), name='live_updates'),
 ]
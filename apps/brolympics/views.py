@@ -3,60 +3,29 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
 from apps.brolympics.models import *
 from apps.brolympics.serializers import *
 from apps.brolympics.active_serializers import EventCompSerailizer_h2h, EventCompSerailizer_ind, EventCompSerailizer_Team, BracketSerializer
-import base64
 from django.shortcuts import get_object_or_404
 from rest_framework.exceptions import PermissionDenied
 from django.db.models import Q
-from PIL import Image
-from io import BytesIO
+from apps.image_pipeline import image_pipeline, decode_base64_image
+from apps.brolympics.loaders import H2H_RELATED, TEAM_COMP_RELATED, with_h2h_records, load_h2h_records, load_bracket_matchups
+from apps.brolympics.conditional import conditional_on_revision, owned_brolympics_revision, upcoming_revision
 
 
 User = get_user_model()
 
-def convert_to_img_file(base_64_img, quality=85):
-    if base_64_img is None:
-        return None
-    
-    format, imgstr = base_64_img.split(';base64,')
-    ext = format.split('/')[-1]
-    decoded_img = base64.b64decode(imgstr)
-
-    # Compress the image
-    img = Image.open(BytesIO(decoded_img))
-
-    # Depending on the extension apply compression
-    buffer = BytesIO()
-
-    if ext.lower() in ['jpeg', 'jpg']:
-        img.save(buffer, format="JPEG", quality=quality)  # You can adjust the quality parameter
-    elif ext.lower() == 'png':
-        img.save(buffer, format="PNG", compress_level=5)  # compress_level range is 0-9
-    else:
-        # If not jpg or png, save with original decoded content
-        return ContentFile(decoded_img, name='temp.' + ext)
-
-    img_compressed = buffer.getvalue()
-    
-    return ContentFile(img_compressed, name='temp.' + ext)
-
-
-
 # Create your views here.
 class CreateAllLeagueView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
         league_data = request.data.get('league')
-        league_img_b64 = league_data.get('img')
-        league_data['img'] = convert_to_img_file(league_img_b64)
+        league_img = decode_base64_image(league_data.pop('img', None))
 
         brolympics_data = request.data.get('brolympics')
-        brolympics_img_b64 = brolympics_data.get('img')
-        brolympics_data['img'] = convert_to_img_file(brolympics_img_b64)
+        brolympics_img = decode_base64_image(brolympics_data.pop('img', None))
 
         h2h_event_data = request.data.get('h2h_events')
         ind_event_data = request.data.get('ind_events')
@@ -67,12 +36,14 @@ class CreateAllLeagueView(APIView):
 
         if league_serializer.is_valid():
             league = league_serializer.save()
+            image_pipeline.submit(league, league_img)
         else:
             return Response(league_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         brolympics_data['league'] = league.id
         if brolympics_serializer.is_valid():
             brolympics = brolympics_serializer.save()
+            image_pipeline.submit(brolympics, brolympics_img)
         else:
             return Response(brolympics_serializer.errors, status=400)
 
@@ -119,8 +90,7 @@ class CreateBrolympics(APIView):
             return Response(status=status.HTTP_401_UNAUTHORIZED)
         
         brolympics_data = request.data.get('brolympics')
-        brolympics_img_b64 = brolympics_data.get('img')
-        brolympics_data['img'] = convert_to_img_file(brolympics_img_b64)
+        brolympics_img = decode_base64_image(brolympics_data.pop('img', None))
 
         h2h_event_data = request.data.get('h2h_events')
         ind_event_data = request.data.get('ind_events')
@@ -131,6 +101,7 @@ class CreateBrolympics(APIView):
 
         if brolympics_serializer.is_valid():
             brolympics = brolympics_serializer.save()
+            image_pipeline.submit(brolympics, brolympics_img)
         else:
             print(brolympics_serializer.errors)
             return Response(brolympics_serializer.errors, status=400)
@@ -232,7 +203,7 @@ class GetLeagueInfo(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, uuid):
-        league = get_object_or_404(League, uuid=uuid)
+        league = get_object_or_404(self.serializer_class.get_queryset(), uuid=uuid)
         serializer = self.serializer_class(league, context={'request' : request})
 
 
@@ -245,7 +216,7 @@ class GetBrolympicsHome(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, uuid):
-        brolympics = get_object_or_404(Brolympics, uuid=uuid)
+        brolympics = get_object_or_404(self.serializer_class.get_queryset(), uuid=uuid)
         serializer = self.serializer_class(brolympics, context={'request':request})
 
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -253,43 +224,44 @@ class GetBrolympicsHome(APIView):
 class GetUpcoming(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_on_revision(upcoming_revision)
     def get(self, request):
         user = request.user
         
         brolympics = Brolympics.objects.filter(
             Q(players__in=[user]) | Q(league__league_owner=user)
         )
-        upcoming_bro = brolympics.filter(is_active=False, is_complete=False)
-        current_bro = Brolympics.objects.filter(is_active=True, is_complete=False)
+        upcoming_bro = BrolympicsSerializer.get_queryset(brolympics.filter(is_active=False, is_complete=False))
+        current_bro = BrolympicsSerializer.get_queryset(Brolympics.objects.filter(is_active=True, is_complete=False))
 
         upcoming_comp_h2h = Competition_H2H.objects.filter(
-            Q(team_1__player_1=user) | Q(team_1__player_2=user) | 
-            Q(team_2__player_1=user) | Q(team_2__player_2=user),
+            pk__in=CompetitionParticipation.comp_ids(user, 'h2h'),
             is_complete=False,
             start_time=None
-        )
+        ).select_related(*H2H_RELATED)
         upcoming_bracket_matchup = BracketMatchup.objects.filter(
-            Q(team_1__player_1=user) | Q(team_1__player_2=user) | 
-            Q(team_2__player_1=user) | Q(team_2__player_2=user),
+            pk__in=CompetitionParticipation.comp_ids(user, 'bracket'),
             is_complete=False,
             start_time=None
-        )
+        ).select_related(*H2H_RELATED)
         upcoming_comp_ind = Competition_Ind.objects.filter(
-            Q(team__player_1=user) | Q(team__player_2=user),
+            pk__in=CompetitionParticipation.comp_ids(user, 'ind'),
             is_complete=False,
             start_time=None
-        )
+        ).select_related(*TEAM_COMP_RELATED)
         upcoming_comp_team = Competition_Team.objects.filter(
-            Q(team__player_1=user) | Q(team__player_2=user),
+            pk__in=CompetitionParticipation.comp_ids(user, 'team'),
             is_complete=False,
             start_time=None
-        )
+        ).select_related(*TEAM_COMP_RELATED)
 
-        upcoming_bro_serializer = BrolympicsSerializer(upcoming_bro, context={'request':request}, many=True)
-        current_bro_serializer = BrolympicsSerializer(current_bro, context={'request':request}, many=True)
+        # One context so the user's teams are looked up once for both lists
+        context = {'request':request}
+        upcoming_bro_serializer = BrolympicsSerializer(upcoming_bro, context=context, many=True)
+        current_bro_serializer = BrolympicsSerializer(current_bro, context=context, many=True)
 
-        h2h_serializer = CompetitionSerializer_H2h(upcoming_comp_h2h, many=True)
-        bracket_serializer = BracketCompetitionSerializer_H2h(upcoming_bracket_matchup, many=True)
+        h2h_serializer = CompetitionSerializer_H2h(with_h2h_records(upcoming_comp_h2h), many=True)
+        bracket_serializer = BracketCompetitionSerializer_H2h(with_h2h_records(upcoming_bracket_matchup), many=True)
         ind_serializer = CompetitionSerializer_Ind(upcoming_comp_ind, many=True)
         team_serializer = CompetitionSerializer_Team(upcoming_comp_team, many=True)
 
@@ -323,7 +295,7 @@ class GetAllCompData(APIView):
         ind_events = all_events['ind']
         team_events = all_events['team']
 
-        h2h_event_data = EventCompSerailizer_h2h(h2h_events, many=True).data
+        h2h_event_data = EventCompSerailizer_h2h(h2h_events, many=True, context={'h2h_records': load_h2h_records(h2h_events)}).data
         ind_event_data = EventCompSerailizer_ind(ind_events, many=True).data
         team_event_data = EventCompSerailizer_Team(team_events, many=True).data
 
@@ -336,6 +308,7 @@ class GetAllCompData(APIView):
         return Response(data, status=status.HTTP_200_OK)
     
 class GetBracketData(APIView):
+    @conditional_on_revision(owned_brolympics_revision)
     def get(self, request, uuid):
         brolympics = get_object_or_404(Brolympics, uuid=uuid)
         if request.user != brolympics.league.league_owner:
@@ -346,8 +319,8 @@ class GetBracketData(APIView):
             brolympics=brolympics
         )
         
-        brackets = Bracket_4.objects.filter(event__in=h2h_events)
-        bracket_data = BracketSerializer(brackets, many=True).data
+        brackets = list(Bracket_4.objects.filter(event__in=h2h_events).select_related('event'))
+        bracket_data = BracketSerializer(brackets, many=True, context={'bracket_matchups': load_bracket_matchups(brackets)}).data
 
         return Response(bracket_data, status=status.HTTP_200_OK)
 
@@ -365,17 +338,13 @@ class UpdateBrolympics(APIView):
             return Response({"detail": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
         
         data = request.data
-        img_b64 = request.data.get('img')
-
-        if img_b64.startswith('data:image/') and ';base64,' in img_b64:
-            data['img'] = convert_to_img_file(img_b64)
-        else:
-            del data['img']
+        img = decode_base64_image(data.pop('img', None))
             
         serializer = BrolympicsCreateSerializer(brolympics, data=data, partial=True)
 
         if serializer.is_valid():
             serializer.save()
+            image_pipeline.submit(brolympics, img)
             return Response(serializer.data, status=status.HTTP_200_OK)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)    
@@ -436,10 +405,9 @@ class UpdateLeagueImage(APIView):
             return Response({'error': 'No image file provided'}, status=status.HTTP_400_BAD_REQUEST)
 
         image = request.FILES['image']
-        league.img = image
         try:
-            league.save()
-            return Response(LeagueInfoSerializer(league).data, status=status.HTTP_200_OK)
+            image_pipeline.submit(league, image.read())
+            return Response(LeagueInfoSerializer(league).data, status=status.HTTP_202_ACCEPTED)
         except Exception as e:
             return Response({'error': f"An error occurred: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
@@ -571,6 +539,24 @@ class UpdateBracketComp(APIView):
         
         return Response(status=status.HTTP_200_OK)
 
+class UpdateCompBatch(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request):
+        brolympics = get_object_or_404(Brolympics, uuid=request.data.get('uuid'))
+
+        if request.user != brolympics.league.league_owner:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+
+        results = request.data.get('results')
+        if not isinstance(results, list) or len(results) == 0:
+            return Response({'error':'Must enter at least one result.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        applied = brolympics.apply_score_batch(results)
+        n_errors = len([result for result in applied if result['status'] == 'error'])
+
+        return Response({'results': applied, 'n_errors': n_errors}, status=status.HTTP_200_OK)
+
 class UpdateTeamImage(APIView):
     def put(self, request):
         if 'image' not in request.FILES:
@@ -584,10 +570,9 @@ class UpdateTeamImage(APIView):
         if request.user != team.player_1 and request.user != team.player_2 and request.user != team.brolympics.league.league_owner:
             raise PermissionDenied("You do not have permission to remove this player from this team.")
 
-        team.img = image
-        team.save()
+        image_pipeline.submit(team, image.read())
 
-        return Response(status=status.HTTP_200_OK)
+        return Response(status=status.HTTP_202_ACCEPTED)
 
 
 ## Delete ##
@@ -736,7 +721,7 @@ class GetBrolympicsInvite(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, uuid):
-        broylmpics = get_object_or_404(Brolympics, uuid=uuid)
+        broylmpics = get_object_or_404(self.serializer_class.get_queryset(), uuid=uuid)
         serializer = self.serializer_class(broylmpics, context={'request':request})
 
         return Response(serializer.data, status=status.HTTP_200_OK)
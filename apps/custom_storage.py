@@ -4,16 +4,23 @@ import os
 from django.core.files.storage import Storage
 from django.utils.deconstruct import deconstructible
 from django.conf import settings
-from firebase_admin import storage
 from django.utils.crypto import get_random_string
 from urllib.parse import urljoin
 from django.conf import settings
+from django.utils.functional import cached_property
+
+from api.instrumentation import timed
+from apps.firebase_app import get_app
 
 @deconstructible
 class FirebaseStorage(Storage):
-    def __init__(self):
-        self.bucket = storage.bucket(settings.FIREBASE_STORAGE_BUCKET)
+    # Resolved on first use, every ImageField builds one of these at model import
+    @cached_property
+    def bucket(self):
+        from firebase_admin import storage
+        return storage.bucket(settings.FIREBASE_STORAGE_BUCKET, app=get_app())
 
+    @timed('storage')
     def _save(self, name, content):
         name = self.get_valid_name(name)
         blob = self.bucket.blob(name)
@@ -21,13 +28,16 @@ class FirebaseStorage(Storage):
         blob.make_public()  
         return name
 
+    @timed('storage')
     def _open(self, name, mode='rb'):
         blob = self.bucket.blob(name)
         return blob.download_as_bytes()
 
+    @timed('storage')
     def delete(self, name):
         self.bucket.blob(name).delete()
 
+    @timed('storage')
     def exists(self, name):
         return self.bucket.blob(name).exists()
 
@@ -42,9 +52,11 @@ class FirebaseStorage(Storage):
         new_name = f"{file_root}_{random_string}{file_ext}"
         return os.path.join(dir_name, new_name)
 
+    @timed('storage')
     def size(self, name):
         return self.bucket.blob(name).size
 
+    @timed('storage')
     def get_modified_time(self, name):
         return self.bucket.blob(name).updated
 
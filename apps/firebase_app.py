@@ -0,0 +1,23 @@
+from threading import Lock
+
+from django.conf import settings
+
+_lock = Lock()
+
+
+def get_app():
+    '''
+    The default Firebase app, created on first use from FIREBASE_CREDENTIALS (a service
+    account path or dict, None for application default credentials) instead of at
+    settings import, so workers boot without importing or touching Firebase.
+    '''
+    import firebase_admin
+    from firebase_admin import credentials
+
+    if not firebase_admin._apps:
+        with _lock:
+            if not firebase_admin._apps:
+                cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS) if settings.FIREBASE_CREDENTIALS else None
+                options = {'storageBucket': settings.FIREBASE_STORAGE_BUCKET} if settings.FIREBASE_STORAGE_BUCKET else None
+                firebase_admin.initialize_app(cred, options)
+    return firebase_admin.get_app()
@@ -0,0 +1,203 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+from threading import Lock
+from uuid import uuid4
+import base64
+import logging
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels for every variant we generate
+IMAGE_VARIANTS = {
+    'thumbnail': 160,
+    'card': 640,
+    'full': 1600,
+}
+MAIN_VARIANT = 'full'
+WEBP_QUALITY = 80
+
+
+def decode_base64_image(base_64_img):
+    if not base_64_img or ';base64,' not in base_64_img:
+        return None
+
+    _, imgstr = base_64_img.split(';base64,')
+    return base64.b64decode(imgstr)
+
+
+def render_variants(raw):
+    # Pillow is only needed by the workers, not to boot the app
+    from PIL import Image, ImageOps
+
+    img = Image.open(BytesIO(raw))
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+
+    variants = {}
+    for variant, size in IMAGE_VARIANTS.items():
+        resized = img.copy()
+        resized.thumbnail((size, size))
+
+        buffer = BytesIO()
+        resized.save(buffer, format='WEBP', quality=WEBP_QUALITY)
+        variants[variant] = buffer.getvalue()
+
+    return variants
+
+
+def get_upload_model():
+    return django_apps.get_model('brolympics', 'ImageUpload')
+
+
+class ImagePipeline:
+    '''
+    Saves the raw image bytes as an ImageUpload and returns straight away. A worker pool
+    renders the WebP variants, uploads them concurrently, and records them on the
+    model's img/img_variants fields. Set IMAGE_PIPELINE_SYNC to run inline.
+    '''
+    def __init__(self, storage=None):
+        self.storage = storage
+        self._lock = Lock()
+        self._executor = None
+        self._upload_executor = None
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_PIPELINE_WORKERS,
+                    thread_name_prefix='image-pipeline',
+                )
+            return self._executor
+
+    @property
+    def upload_executor(self):
+        with self._lock:
+            if self._upload_executor is None:
+                self._upload_executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_PIPELINE_WORKERS * len(IMAGE_VARIANTS),
+                    thread_name_prefix='image-upload',
+                )
+            return self._upload_executor
+
+    def submit(self, instance, raw, field_name='img'):
+        if raw is None:
+            return
+
+        # Saved with the request, a worker that dies leaves the row for process_image_uploads
+        upload = get_upload_model().objects.create(
+            model_label=instance._meta.label,
+            object_pk=str(instance.pk),
+            field_name=field_name,
+            raw=raw,
+        )
+        if settings.IMAGE_PIPELINE_SYNC:
+            self.process_upload(upload.pk)
+        else:
+            transaction.on_commit(lambda: self.executor.submit(self._run, upload.pk))
+        return upload
+
+    def _run(self, upload_pk):
+        try:
+            self.process_upload(upload_pk)
+        except Exception:
+            logger.exception(f'Image processing failed for upload {upload_pk}')
+        finally:
+            connection.close()
+
+    def process_upload(self, upload_pk, retry=False):
+        '''
+        Claims the upload and processes it. Fresh uploads are claimed while pending,
+        retries also take failed ones and ones left processing by a dead worker.
+        Returns the variants, or None when there was nothing to do.
+        '''
+        ImageUpload = get_upload_model()
+        claimable = Q(status='pending')
+        if retry:
+            stale = timezone.now() - timedelta(seconds=settings.IMAGE_PIPELINE_STALE_SECONDS)
+            retryable = Q(status='failed') | Q(status='processing', updated_at__lt=stale)
+            claimable |= retryable & Q(attempts__lt=settings.IMAGE_PIPELINE_MAX_ATTEMPTS)
+
+        claimed = ImageUpload.objects.filter(claimable, pk=upload_pk).update(
+            status='processing', attempts=F('attempts') + 1, updated_at=timezone.now(),
+        )
+        if not claimed:
+            return None
+
+        upload = ImageUpload.objects.get(pk=upload_pk)
+        newer = ImageUpload.objects.filter(
+            model_label=upload.model_label,
+            object_pk=upload.object_pk,
+            field_name=upload.field_name,
+            pk__gt=upload.pk,
+        )
+        if newer.exists():
+            # A later upload replaced this one, never let an old image win
+            ImageUpload.objects.filter(pk=upload_pk).update(status='superseded', raw=b'', updated_at=timezone.now())
+            return None
+
+        try:
+            variants = self.process(upload.model_label, upload.object_pk, upload.field_name, bytes(upload.raw))
+        except Exception as e:
+            ImageUpload.objects.filter(pk=upload_pk).update(status='failed', error=repr(e), updated_at=timezone.now())
+            raise
+
+        ImageUpload.objects.filter(pk=upload_pk).update(status='done', raw=b'', error='', updated_at=timezone.now())
+        return variants
+
+    def process(self, model_label, pk, field_name, raw):
+        rendered = render_variants(raw)
+
+        model = django_apps.get_model(model_label)
+        storage = self.storage or model._meta.get_field(field_name).storage
+        prefix = f'{model._meta.model_name}_images/{uuid4().hex}'
+
+        uploads = {
+            variant: self.upload_executor.submit(self._upload, storage, f'{prefix}_{variant}.webp', data)
+            for variant, data in rendered.items()
+        }
+        variants = {variant: upload.result() for variant, upload in uploads.items()}
+
+        instance = model.objects.get(pk=pk)
+        setattr(instance, field_name, variants[MAIN_VARIANT])
+        instance.img_variants = variants
+        instance.save(update_fields=[field_name, 'img_variants'])
+        return variants
+
+    @staticmethod
+    def _upload(storage, name, data):
+        content = ContentFile(data, name=name)
+        content.content_type = 'image/webp'
+        return storage.save(name, content)
+
+
+image_pipeline = ImagePipeline()
+
+
+class ImageVariantsField(serializers.Field):
+    '''
+    Read only {variant: url} for a model with img_variants, empty until the
+    pipeline has finished with the latest upload.
+    '''
+    def __init__(self, image_field='img', **kwargs):
+        self.image_field = image_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        variants = getattr(instance, 'img_variants', None) or {}
+        storage = instance._meta.get_field(self.image_field).storage
+        return {variant: storage.url(name) for variant, name in variants.items()}